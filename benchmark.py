@@ -0,0 +1,1291 @@
+"""
+Offline benchmarks for KnowBeforeGo.ai
+
+Every benchmark runs against local stub servers, so no API keys or network
+access are needed. Run from the project root:
+
+    python benchmark.py llm --summaries 16 --delay 0.5
+    python benchmark.py http --requests 500 --concurrency 20
+    python benchmark.py parse --fixtures path/to/saved/wikipedia/pages
+    python benchmark.py wiki --companies 20 --latency 0.05
+    python benchmark.py coalesce --requests 50
+    python benchmark.py stream
+    python benchmark.py faults --error-rate 1.0
+    python benchmark.py research --requests 200 --concurrency 16 --output baseline.json
+    python benchmark.py roles --queries 5000
+    python benchmark.py hits --requests 5000 --concurrency 16
+    python benchmark.py cpu --tasks 200 --workers 4
+    python benchmark.py overload --rate 30 --duration 15
+    python benchmark.py snapshot --companies 2000
+"""
+import os
+import argparse
+import asyncio
+import csv
+import glob
+import json
+import importlib
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+from aiohttp import web
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def format_ms(seconds: float) -> str:
+    return f"{seconds * 1000:.1f}ms"
+
+
+class StubServer:
+    """Serve a stub aiohttp app from its own thread and event loop
+
+    Keeping stubs off the loop under test means their work never shows up
+    in the measured latency, and a blocking client cannot deadlock them.
+    """
+
+    def __init__(self, app: web.Application):
+        self.app = app
+        self.url = None
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def _serve(self):
+        asyncio.set_event_loop(self._loop)
+        self._runner = web.AppRunner(self.app)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        self._loop.run_until_complete(site.start())
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start(self) -> str:
+        self._thread.start()
+        self._ready.wait()
+        return self.url
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+def load_app(env: Dict[str, str]):
+    """Import main.py with stub endpoints configured through the environment"""
+    os.environ.setdefault("GITHUB_TOKEN", "benchmark-token")
+    os.environ.update(env)
+    return importlib.import_module("main")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class AppServer:
+    """Run main.py under uvicorn in a subprocess, the way it is deployed
+
+    The app gets its own interpreter, so its event loop, memory and CPU are
+    measured without the load generator or the stubs mixed in.
+    """
+
+    def __init__(self, env: Dict[str, str]):
+        self.env = {**os.environ, "GITHUB_TOKEN": os.environ.get("GITHUB_TOKEN", "benchmark-token"), **env}
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.process: Optional[subprocess.Popen] = None
+
+    async def start(self, timeout: float = 60.0) -> str:
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(self.port),
+             "--log-level", "warning"],
+            cwd=PROJECT_DIR, env=self.env,
+        )
+        deadline = time.monotonic() + timeout
+        async with aiohttp.ClientSession() as session:
+            while time.monotonic() < deadline:
+                if self.process.poll() is not None:
+                    raise SystemExit(f"app exited during startup with code {self.process.returncode}")
+                try:
+                    async with session.get(self.url + "/health") as response:
+                        if response.status == 200:
+                            return self.url
+                except aiohttp.ClientError:
+                    pass
+                await asyncio.sleep(0.1)
+        self.stop()
+        raise SystemExit("app did not become healthy in time")
+
+    def memory(self) -> Dict[str, int]:
+        """Current and peak resident set size in bytes, read from /proc (Linux only)"""
+        memory = {}
+        try:
+            with open(f"/proc/{self.process.pid}/status") as f:
+                for line in f:
+                    if line.startswith(("VmRSS:", "VmHWM:")):
+                        memory[line.split(":")[0]] = int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return {"rss": memory.get("VmRSS", 0), "peak_rss": memory.get("VmHWM", 0)}
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+def parse_histogram(metrics_text: str, name: str) -> List[Tuple[float, float]]:
+    """Cumulative (upper bound, count) buckets of an unlabelled Prometheus histogram"""
+    buckets = []
+    prefix = f'{name}_bucket{{le="'
+    for line in metrics_text.splitlines():
+        if line.startswith(prefix):
+            bound, count = line[len(prefix):].split('"} ')
+            buckets.append((float(bound), float(count)))
+    return buckets
+
+
+def histogram_quantile(before: List[Tuple[float, float]], after: List[Tuple[float, float]], pct: float) -> float:
+    """Upper bound of the bucket holding a percentile of the observations made between two scrapes"""
+    counts = dict(before)
+    window = [(bound, count - counts.get(bound, 0.0)) for bound, count in after]
+    total = window[-1][1] if window else 0.0
+    for bound, count in window:
+        if total and count >= pct / 100 * total:
+            return bound
+    return 0.0
+
+
+class LoopLagProbe:
+    """Measure how late the event loop wakes up from short sleeps"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags: List[float] = []
+        self._task = None
+        self._tick_start = 0.0
+
+    async def _run(self):
+        while True:
+            self._tick_start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - self._tick_start - self.interval))
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        # Count the tick still pending, otherwise a loop blocked until now goes unrecorded
+        self.lags.append(max(0.0, time.perf_counter() - self._tick_start - self.interval))
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def report(self) -> str:
+        return (f"p50={format_ms(percentile(self.lags, 50))} "
+                f"p99={format_ms(percentile(self.lags, 99))} "
+                f"max={format_ms(max(self.lags, default=0.0))}")
+
+
+# Stub upstreams
+def make_llm_stub(delay: float) -> web.Application:
+    """OpenAI-compatible chat completions endpoint with a fixed delay"""
+    content = "# Stub Analysis\n\nBenchmark summary."
+
+    async def chat_completions(request: web.Request) -> web.StreamResponse:
+        request.app["stats"]["requests"] += 1
+        body = await request.json()
+        if body.get("stream"):
+            return await stream_completion(request, body)
+        await asyncio.sleep(delay)
+        return web.json_response({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "stub",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 800, "completion_tokens": 400, "total_tokens": 1200},
+        })
+
+    async def stream_completion(request: web.Request, body: Dict) -> web.StreamResponse:
+        """Server-sent chunks spreading the delay over the tokens, like a real model"""
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        tokens = content.split(" ")
+        for index, token in enumerate(tokens):
+            await asyncio.sleep(delay / len(tokens))
+            chunk = {
+                "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()), "model": "stub",
+                "choices": [{"index": 0, "delta": {"content": token if index == 0 else " " + token}, "finish_reason": None}],
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        if (body.get("stream_options") or {}).get("include_usage"):
+            chunk = {
+                "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()), "model": "stub",
+                "choices": [], "usage": {"prompt_tokens": 800, "completion_tokens": 400, "total_tokens": 1200},
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app["stats"] = {"requests": 0}
+    app.router.add_post("/chat/completions", chat_completions)
+    return app
+
+
+def make_news_stub(delay: float) -> web.Application:
+    """NewsAPI /v2/everything stand-in returning articles that mention the query"""
+    async def everything(request: web.Request) -> web.Response:
+        request.app["stats"]["requests"] += 1
+        await asyncio.sleep(delay)
+        name = request.query.get("q", "").replace('"', "").split(" OR ")[0].strip()
+        articles = [{
+            "source": {"id": None, "name": "Stub Wire"},
+            "title": f"{name} announces quarterly update {i}",
+            "description": f"{name} shared news about its products and hiring plans.",
+            "url": f"https://example.com/{i}",
+            "publishedAt": "2024-01-0{}T00:00:00Z".format(i + 1),
+        } for i in range(int(request.query.get("pageSize", 10)))]
+        return web.json_response({"status": "ok", "totalResults": len(articles), "articles": articles})
+
+    app = web.Application()
+    app["stats"] = {"requests": 0}
+    app.router.add_get("/v2/everything", everything)
+    return app
+
+
+def make_http_stub(delay: float) -> web.Application:
+    """Plain page endpoint that records which client connections it has seen"""
+    async def page(request: web.Request) -> web.Response:
+        request.app["connections"].add(request.transport.get_extra_info("peername"))
+        await asyncio.sleep(delay)
+        return web.Response(text="<html><body><p>stub page</p></body></html>", content_type="text/html")
+
+    app = web.Application()
+    app["connections"] = set()
+    app.router.add_get("/wiki/{title}", page)
+    return app
+
+
+def inject_faults(app: web.Application, error_rate: float = 0.0, status: int = 503,
+                  latency: float = 0.0, jitter: float = 0.0) -> web.Application:
+    """Make a stub slow and flaky like a real upstream; tune app["faults"] while it runs
+
+    Every request waits `latency` seconds scaled by a log-normal factor with
+    sigma `jitter` (so `latency` is the median), then fails with `status`
+    for a share `error_rate` of requests.
+    """
+    app["faults"] = {"error_rate": error_rate, "status": status, "latency": latency, "jitter": jitter,
+                     "requests": 0, "failed": 0, "rng": random.Random(0)}
+
+    @web.middleware
+    async def fault_middleware(request: web.Request, handler) -> web.StreamResponse:
+        faults = request.app["faults"]
+        faults["requests"] += 1
+        if faults["latency"]:
+            await asyncio.sleep(faults["latency"] * faults["rng"].lognormvariate(0, faults["jitter"]))
+        if faults["rng"].random() < faults["error_rate"]:
+            faults["failed"] += 1
+            return web.json_response({"error": {"message": "injected fault"}}, status=faults["status"])
+        return await handler(request)
+
+    app.middlewares.append(fault_middleware)
+    return app
+
+
+def synthetic_wiki_article(title: str, sections: int = 40, seed: int = 0) -> str:
+    """Wikipedia-shaped article HTML for when no saved pages are available"""
+    rng = random.Random(seed)
+    words = ("company market revenue products services growth engineering customers platform "
+             "global founded acquisition operations employees research technology").split()
+
+    def sentence(n=18):
+        return " ".join(rng.choice(words) for _ in range(n)).capitalize() + "."
+
+    def paragraph(n=6):
+        refs = "".join(f'<sup class="reference"><a href="#cite_note-{rng.randint(1, 99)}">[{rng.randint(1, 99)}]</a></sup>'
+                       for _ in range(2))
+        return f"<p>{' '.join(sentence() for _ in range(n))}{refs}</p>"
+
+    infobox_rows = "".join(
+        f'<tr><th scope="row" class="infobox-label">{label}</th>'
+        f'<td class="infobox-data"><a href="/wiki/X">{sentence(4)}</a><br/>{sentence(3)}</td></tr>'
+        for label in ("Type", "Industry", "Founded", "Founders", "Headquarters", "Key people", "Products",
+                      "Revenue", "Operating income", "Net income", "Number of employees", "Website")
+    )
+    body = [
+        '<div class="mw-parser-output">',
+        '<style data-mw-deduplicate="TemplateStyles:r1">.mw-parser-output .hatnote{font-style:italic}</style>',
+        '<p class="mw-empty-elt">\n</p>',
+        f'<table class="infobox vcard"><caption>{title}</caption><tbody>'
+        f'<tr><td colspan="2" class="infobox-image"><img src="logo.png"/></td></tr>{infobox_rows}</tbody></table>',
+        f"<p><b>{title}</b> is a multinational technology company. {paragraph()[3:]}",
+        paragraph(), "<!-- lead ends -->",
+        '<div id="toc" class="toc"><ul><li>History</li><li>Business</li></ul></div>',
+    ]
+    for index in range(sections):
+        heading = {0: "History", 3: "Business"}.get(index, f"Section_{index}")
+        body.append(f'<h2><span class="mw-headline" id="{heading}">{heading.replace("_", " ")}</span></h2>')
+        body.append('<div role="note" class="hatnote">Main article: elsewhere</div>')
+        body.extend(paragraph() for _ in range(rng.randint(2, 5)))
+        body.append('<ul>' + "".join(f"<li>{sentence(8)}</li>" for _ in range(5)) + '</ul>')
+    body.append('<div class="reflist"><ol class="references">'
+                + "".join(f"<li>{sentence(10)}</li>" for _ in range(300)) + "</ol></div></div>")
+    return (f"<!DOCTYPE html><html><head><title>{title} - Wikipedia</title>"
+            f"<script>var wgTitle='{title}';</script></head><body>{''.join(body)}</body></html>")
+
+
+def make_wiki_stub(articles: Dict[str, str], redirects: Dict[str, str]) -> web.Application:
+    """Wikipedia stand-in serving both rendered articles and MediaWiki API responses
+
+    Responses are derived from the same article HTML, so the HTML and API
+    sources can be compared on identical content. Bytes sent are counted.
+    """
+    import lxml.html
+    from functools import lru_cache
+    from urllib.parse import unquote_plus
+
+    def resolve(title: str) -> str:
+        title = title.replace("_", " ").strip()
+        title = title[:1].upper() + title[1:]
+        return redirects.get(title, title)
+
+    # Memoized per article, so serving stays cheap next to the app under test
+    @lru_cache(maxsize=None)
+    def intro_extract(html: str) -> str:
+        root = lxml.html.fromstring(html).xpath("//div[@class='mw-parser-output']")[0]
+        lines = []
+        for child in root:
+            if child.tag == "h2":
+                break
+            if child.tag == "p" and "mw-empty-elt" not in child.get("class", ""):
+                lines.append(child.text_content().strip())
+        return "\n".join(lines)
+
+    @lru_cache(maxsize=None)
+    def split_sections(html: str) -> List[str]:
+        body = html.split('<div class="mw-parser-output">', 1)[1]
+        parts = body.split("<h2>")
+        parts = parts[:1] + ["<h2>" + part for part in parts[1:]]
+        return ['<div class="mw-parser-output">' + part + "</div>" for part in parts]
+
+    @lru_cache(maxsize=None)
+    def section_list(html: str) -> List[Dict]:
+        root = lxml.html.fromstring(html)
+        return [{"toclevel": 1, "level": "2", "line": heading.text_content().strip(), "index": str(index)}
+                for index, heading in enumerate(root.iter("h2"), start=1)]
+
+    def respond(request: web.Request, body: str, content_type: str, status: int = 200) -> web.Response:
+        request.app["stats"]["bytes_sent"] += len(body.encode())
+        request.app["stats"]["requests"] += 1
+        return web.Response(text=body, content_type=content_type, status=status)
+
+    async def page(request: web.Request) -> web.Response:
+        title = resolve(unquote_plus(request.match_info["title"]))
+        if title not in articles:
+            return respond(request, "<html><body>Wikipedia does not have an article</body></html>", "text/html", 404)
+        return respond(request, articles[title], "text/html")
+
+    async def api(request: web.Request) -> web.Response:
+        params = request.query
+        if params.get("action") == "parse":
+            title = resolve(params["page"])
+            if title not in articles:
+                body = {"error": {"code": "missingtitle", "info": "The page you specified doesn't exist."}}
+            elif params.get("prop") == "sections":
+                body = {"parse": {"title": title, "sections": section_list(articles[title])}}
+            else:
+                text = split_sections(articles[title])[int(params["section"])]
+                body = {"parse": {"title": title, "text": text}}
+            return respond(request, json.dumps(body), "application/json")
+
+        if "pageprops" in params.get("prop", ""):
+            request.app["stats"]["title_queries"] += 1
+        query = {"normalized": [], "redirects": [], "pages": []}
+        seen = set()
+        for requested in params["titles"].split("|"):
+            title = requested.replace("_", " ")
+            title = title[:1].upper() + title[1:]
+            if title != requested:
+                query["normalized"].append({"from": requested, "to": title})
+            if title in redirects and params.get("redirects"):
+                query["redirects"].append({"from": title, "to": redirects[title]})
+                title = redirects[title]
+            if title in seen:
+                continue
+            seen.add(title)
+            if title not in articles:
+                query["pages"].append({"ns": 0, "title": title, "missing": True})
+            else:
+                query["pages"].append({"pageid": len(seen), "ns": 0, "title": title,
+                                       "extract": intro_extract(articles[title])})
+        return respond(request, json.dumps({"batchcomplete": True, "query": query}), "application/json")
+
+    app = web.Application()
+    app["stats"] = {"bytes_sent": 0, "requests": 0, "title_queries": 0}
+    app.router.add_get("/wiki/{title}", page)
+    app.router.add_get("/w/api.php", api)
+    return app
+
+
+SAMPLE_COMPANY_DATA = {
+    "company_name": "Stripe",
+    "company_info": {
+        "summary": "Stripe, Inc. is an Irish-American multinational financial services company. " * 4,
+        "details": {"Industry": "Financial services", "Founded": "2010", "Headquarters": "South San Francisco"},
+        "additional_info": {},
+        "status": "success",
+    },
+    "news": {"status": "success", "articles": []},
+    "reviews": [],
+}
+
+
+# How people actually type roles, labelled with the canonical role they mean (None: no canonical role)
+ROLE_VARIANTS = {
+    "Software Engineer": ["SWE", "Software Engineer", "software engineer II", "Sr. Software Engineer", "Software Dev",
+                          "software developer 3", "Senior SDE", "Software Engineer (Remote)",
+                          "New Grad Software Engineer", "Software Development Engineer I", "Sofware Engineer",
+                          "Softwrae Engineer", "Software Enginer"],
+    "Backend Engineer": ["Backend Dev", "Back-End Developer", "backend engineer", "Sr Backend Engineer"],
+    "Frontend Engineer": ["Frontend Dev", "Front End Engineer", "React Dev", "Sr. Front-End Developer", "Frontend Enginer"],
+    "Machine Learning Engineer": ["ML Engineer", "ML Eng", "Machine Learning Eng", "Senior MLE", "AI/ML Engineer",
+                                  "Machine Lerning Engineer"],
+    "Data Scientist": ["Data Scientist II", "Sr Data Scientist", "data scientist", "Data Scientst"],
+    "Product Manager": ["Product Mgr", "Sr. Product Manager", "Product Manager", "Product Manger", "Prodcut Manager"],
+    "DevOps Engineer": ["DevOps", "SRE", "Site Reliability Eng", "Platform Eng"],
+    "Product Designer": ["UX Designer", "UI/UX Designer", "Product Designer", "Senior UX Designer"],
+    "Software Engineering Intern": ["SWE Intern", "Sofware Engineer Intern"],
+    # Kept as typed: different jobs that share words or aliases with a canonical role, and ambiguous roles
+    None: ["Mechanical Engineer", "Nurse", "Lawyer", "Civil Engineer", "Chef", "Accounting Manager", "Data Entry",
+           "Analyst", "Sales Manager", "Operations Engineer", "Machine Learning Intern", "Data Engineering Manager",
+           "Be", "Business Analyst", "Account Manager", "Auditor", "Project Manager", "Systems Engineer",
+           "UX Researcher", "Product Marketing Manager", "Security Analyst", "Research Engineer", "Hardware Engineer",
+           "PM", "Web Dev", "Python Backend Developer", "Data Science Lead", "Product Manager - Payments",
+           "Produce Manager", "Waiter", "Software Tester"],
+}
+
+
+# Benchmarks
+async def bench_llm(args):
+    """Event-loop lag while summaries are in flight against a slow stub model"""
+    stub = StubServer(make_llm_stub(args.delay))
+    base_url = stub.start()
+    main = load_app({"LLM_BASE_URL": base_url, "LLM_MAX_CONCURRENCY": str(args.concurrency)})
+
+    if args.blocking:
+        # Reproduce the old behaviour: a synchronous client called inside the coroutine
+        from openai import OpenAI
+        sync_client = OpenAI(base_url=base_url, api_key="benchmark-token")
+
+        async def blocking_completion(messages, **kwargs):
+            return sync_client.chat.completions.create(messages=messages, model=main.LLM_MODEL, **kwargs)
+
+        main.create_chat_completion = blocking_completion
+
+    # Warm up the client so connection setup is not part of the measurement
+    await main.generate_company_summary_async(SAMPLE_COMPANY_DATA, "Warm-up Role")
+
+    probe = LoopLagProbe()
+    probe.start()
+    await asyncio.sleep(0.2)
+    idle = LoopLagProbe()
+    idle.lags = list(probe.lags)
+
+    start = time.perf_counter()
+    # A distinct role per call so every summary reaches the model instead of the summary cache
+    await asyncio.gather(*[
+        main.generate_company_summary_async(SAMPLE_COMPANY_DATA, f"Backend Engineer {i}")
+        for i in range(args.summaries)
+    ])
+    elapsed = time.perf_counter() - start
+    await probe.stop()
+    busy = probe.lags[len(idle.lags):]
+
+    mode = "blocking client" if args.blocking else "async client"
+    print(f"{mode}: {args.summaries} summaries in {elapsed:.2f}s (stub delay {args.delay}s)")
+    print(f"  loop lag idle : {idle.report()}")
+    probe.lags = busy
+    print(f"  loop lag busy : {probe.report()}")
+    stub.stop()
+
+
+async def bench_http(args):
+    """Connection reuse and latency: one session per call vs the shared pooled session"""
+    import aiohttp
+
+    stub = StubServer(make_http_stub(args.delay))
+    base_url = stub.start()
+    main = load_app({})
+
+    async def per_call_session(url):
+        async with aiohttp.ClientSession() as session:
+            return await main.make_async_request(session, url)
+
+    async def shared_session(url):
+        return await main.make_async_request(None, url)
+
+    for label, fetch in (("session per call", per_call_session), ("shared session", shared_session)):
+        stub.app["connections"].clear()
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies = []
+
+        async def timed(i):
+            async with semaphore:
+                start = time.perf_counter()
+                result = await fetch(f"{base_url}/wiki/Company_{i}")
+                latencies.append(time.perf_counter() - start)
+                assert result["status"] == "success", result
+
+        start = time.perf_counter()
+        await asyncio.gather(*[timed(i) for i in range(args.requests)])
+        elapsed = time.perf_counter() - start
+        print(f"{label}: {args.requests} requests in {elapsed:.2f}s, "
+              f"{len(stub.app['connections'])} connections opened, "
+              f"p50={format_ms(percentile(latencies, 50))} p99={format_ms(percentile(latencies, 99))}")
+
+    await main.close_http_session()
+    stub.stop()
+
+
+async def bench_parse(args):
+    """Extractor speed and output parity over saved (or synthetic) Wikipedia pages"""
+    main = load_app({})
+
+    paths = sorted(glob.glob(os.path.join(args.fixtures, "*.html"))) if args.fixtures else []
+    corpus = [(os.path.basename(path), open(path, encoding="utf-8").read()) for path in paths]
+    if not corpus:
+        print("No fixtures given, using synthetic Wikipedia-shaped articles")
+        corpus = [(f"synthetic-{seed}", synthetic_wiki_article(f"Company {seed}", seed=seed)) for seed in range(10)]
+
+    reference = {name: main.extract_wiki_page(html, "bs4") for name, html in corpus}
+    for engine in main.WIKI_EXTRACTORS:
+        if engine == "lxml" and main.lxml is None:
+            print("lxml: not installed, skipped")
+            continue
+        timings, mismatches = [], []
+        for name, html in corpus:
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                page = main.extract_wiki_page(html, engine)
+                timings.append(time.perf_counter() - start)
+            if page != reference[name]:
+                mismatches.append(name)
+        print(f"{engine}: {len(corpus)} pages, mean={format_ms(sum(timings) / len(timings))} "
+              f"p99={format_ms(percentile(timings, 99))}, "
+              f"parity {len(corpus) - len(mismatches)}/{len(corpus)}"
+              + (f" (differs: {', '.join(mismatches)})" if mismatches else ""))
+
+
+async def bench_wiki(args):
+    """Bytes and latency of the MediaWiki API source vs scraping rendered articles"""
+    articles = {f"Company {i}, Inc.": synthetic_wiki_article(f"Company {i}, Inc.", seed=i) for i in range(args.companies)}
+    redirects = {f"Company {i}": f"Company {i}, Inc." for i in range(args.companies)}
+    stub = StubServer(inject_faults(make_wiki_stub(articles, redirects), latency=args.latency))
+    base_url = stub.start()
+    main = load_app({"WIKI_BASE_URL": base_url})
+
+    for source in ("html", "api"):
+        main.WIKI_SOURCE = source
+        stats = stub.app["stats"]
+        stats["bytes_sent"] = stats["requests"] = 0
+        latencies, found = [], 0
+        for i in range(args.companies):
+            start = time.perf_counter()
+            info = await main.scrape_company_info_async(f"Company {i} Inc")
+            latencies.append(time.perf_counter() - start)
+            found += info["status"] == "success" and bool(info["details"])
+        print(f"{source}: {found}/{args.companies} articles found, "
+              f"{stats['requests']} upstream requests, {stats['bytes_sent'] / 1024:.0f} KiB transferred, "
+              f"p50={format_ms(percentile(latencies, 50))} p99={format_ms(percentile(latencies, 99))}")
+
+    await main.close_http_session()
+    stub.stop()
+
+
+def start_stub_upstreams(news_delay: float, llm_delay: float, faults: bool = False, env: Optional[Dict[str, str]] = None):
+    """Start stub Wikipedia (with a Stripe article), NewsAPI and model servers and load the app against them
+
+    With faults, each stub is wrapped by inject_faults so its error rate can
+    be changed while the benchmark runs. Returns (main, stubs).
+    """
+    wrap = inject_faults if faults else (lambda app: app)
+    article = synthetic_wiki_article("Stripe, Inc.")
+    stubs = {
+        "wikipedia": StubServer(wrap(make_wiki_stub({"Stripe, Inc.": article}, {"Stripe": "Stripe, Inc."}))),
+        "newsapi": StubServer(wrap(make_news_stub(news_delay))),
+        "llm": StubServer(wrap(make_llm_stub(llm_delay))),
+    }
+    main = load_app({
+        "WIKI_BASE_URL": stubs["wikipedia"].start(),
+        "NEWS_API_URL": stubs["newsapi"].start() + "/v2/everything",
+        "NEWS_API_KEY": "benchmark-key",
+        "LLM_BASE_URL": stubs["llm"].start(),
+        **(env or {}),
+    })
+    return main, stubs
+
+
+def clear_caches(main):
+    for cache in main.CACHE_TIERS.values():
+        cache._entries.clear()
+        cache.bytes = 0
+
+
+async def bench_coalesce(args):
+    """Check that N simultaneous identical /research calls, and N identical streams, do the upstream work once"""
+    main, stubs = start_stub_upstreams(args.delay, args.delay)
+
+    def upstream_counts() -> Dict[str, int]:
+        return {
+            # One batched title lookup per Wikipedia fetch; the follow-up section calls are not counted
+            "wikipedia lookups": stubs["wikipedia"].app["stats"]["title_queries"],
+            "news requests": stubs["newsapi"].app["stats"]["requests"],
+            "llm calls": stubs["llm"].app["stats"]["requests"],
+        }
+
+    async def read_stream() -> Dict:
+        async for line in main.stream_research("Stripe", "Backend Engineer", time.time()):
+            event = json.loads(line)
+        return event["data"]
+
+    request = main.CompanyRequest(company_name="Stripe", job_role="Backend Engineer")
+    failed = False
+    for label, call in (("requests", lambda: main.research_company(request)), ("streams", read_stream)):
+        clear_caches(main)
+        before = upstream_counts()
+        start = time.perf_counter()
+        results = await asyncio.gather(*[call() for _ in range(args.requests)])
+        elapsed = time.perf_counter() - start
+
+        summaries = {result.ai_summary if label == "requests" else result["ai_summary"] for result in results}
+        print(f"{args.requests} simultaneous {label} answered in {elapsed:.2f}s, {len(summaries)} distinct summaries")
+        for name, count in upstream_counts().items():
+            count -= before[name]
+            failed |= count != 1
+            print(f"  {name}: {count} {'ok' if count == 1 else 'FAILED (expected 1)'}")
+
+    await main.close_http_session()
+    for stub in stubs.values():
+        stub.stop()
+    if failed:
+        raise SystemExit(1)
+
+
+async def bench_stream(args):
+    """Time to first byte of /research/stream vs the full /research response"""
+    main, stubs = start_stub_upstreams(args.news_delay, args.llm_delay)
+
+    start = time.perf_counter()
+    await main.research_company(main.CompanyRequest(company_name="Stripe", job_role="Backend Engineer"))
+    print(f"/research: full response after {format_ms(time.perf_counter() - start)}")
+
+    clear_caches(main)
+    start = time.perf_counter()
+    first_event = first_summary = None
+    async for line in main.stream_research("Stripe", "Backend Engineer", time.time()):
+        event = json.loads(line)["event"]
+        elapsed = time.perf_counter() - start
+        if first_event is None:
+            first_event = elapsed
+            print(f"/research/stream: first section ({event}) after {format_ms(elapsed)}")
+        if event == "summary" and first_summary is None:
+            first_summary = elapsed
+            print(f"/research/stream: first summary text after {format_ms(elapsed)}")
+    print(f"/research/stream: done after {format_ms(time.perf_counter() - start)}")
+
+    await main.close_http_session()
+    for stub in stubs.values():
+        stub.stop()
+
+
+async def bench_faults(args):
+    """Research requests against failing upstreams, with and without circuit breakers"""
+    main, stubs = start_stub_upstreams(args.delay, args.delay, faults=True, env={
+        "NEWS_RATE_LIMIT": "0",
+        "WIKI_RATE_LIMIT": "0",
+        "BREAKER_RESET_TIMEOUT": str(args.reset_timeout),
+    })
+    threshold = main.BREAKER_FAILURE_THRESHOLD
+
+    async def run_phase(label: str, error_rate: float, breakers: bool):
+        for stub in stubs.values():
+            stub.app["faults"].update(error_rate=error_rate, requests=0, failed=0)
+        for upstream in main.UPSTREAMS.values():
+            upstream.breaker.failure_threshold = threshold if breakers else float("inf")
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies = []
+
+        async def one(index: int):
+            # A fresh company each time so no cache tier can answer
+            request = main.CompanyRequest(company_name=f"{label} Company {index}", job_role="Backend Engineer")
+            async with semaphore:
+                start = time.perf_counter()
+                await main.research_company(request)
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[one(index) for index in range(args.requests)])
+        elapsed = time.perf_counter() - start
+        calls = ", ".join(f"{name}={stub.app['faults']['requests']}" for name, stub in stubs.items())
+        states = ", ".join(f"{name}={upstream.breaker.state}" for name, upstream in main.UPSTREAMS.items())
+        print(f"{label:<12} {args.requests / elapsed:6.1f} req/s  p50={format_ms(percentile(latencies, 50))} "
+              f"p99={format_ms(percentile(latencies, 99))}")
+        print(f"{'':<12} upstream calls: {calls}")
+        print(f"{'':<12} breakers: {states}")
+
+    print(f"{args.requests} requests per phase, concurrency {args.concurrency}, "
+          f"upstreams failing {args.error_rate:.0%} of calls with HTTP 503")
+    await run_phase("no-breaker", args.error_rate, breakers=False)
+    for upstream in main.UPSTREAMS.values():
+        upstream.breaker.record_success()
+    await run_phase("breaker", args.error_rate, breakers=True)
+
+    # Upstreams come back; after the reset timeout the half-open trial calls close the breakers
+    await asyncio.sleep(args.reset_timeout)
+    await run_phase("recovered", 0.0, breakers=True)
+
+    await main.close_http_session()
+    for stub in stubs.values():
+        stub.stop()
+
+
+async def bench_research(args):
+    """Drive /research on a uvicorn-served app against slow, flaky stub upstreams"""
+    names = [f"Benchmark Company {index}" for index in range(args.companies)]
+    stubs = {
+        "wikipedia": StubServer(inject_faults(
+            make_wiki_stub({name: synthetic_wiki_article(name, seed=index) for index, name in enumerate(names)}, {}),
+            args.wiki_errors, latency=args.wiki_latency, jitter=args.jitter)),
+        "newsapi": StubServer(inject_faults(make_news_stub(0), args.news_errors, latency=args.news_latency, jitter=args.jitter)),
+        "llm": StubServer(inject_faults(make_llm_stub(0), args.llm_errors, latency=args.llm_latency, jitter=args.jitter)),
+    }
+    env = {
+        "WIKI_BASE_URL": stubs["wikipedia"].start(),
+        "NEWS_API_URL": stubs["newsapi"].start() + "/v2/everything",
+        "NEWS_API_KEY": "benchmark-key",
+        "LLM_BASE_URL": stubs["llm"].start(),
+        "CACHE_BACKEND": "memory",
+        # The stubs have no quotas, so only measure rate limiting when asked to through --env
+        "WIKI_RATE_LIMIT": "0",
+        "NEWS_RATE_LIMIT": "0",
+    }
+    env.update(setting.split("=", 1) for setting in args.env)
+    app = AppServer(env)
+    url = await app.start()
+
+    # Popular companies are asked about far more often than the long tail
+    rng = random.Random(args.seed)
+    weights = [1 / (rank + 1) ** args.zipf for rank in range(len(names))]
+    roles = [None, "Software Engineer", "Product Manager", "Data Scientist"]
+    workload = iter([(rng.choices(names, weights)[0], rng.choice(roles)) for _ in range(args.requests)])
+
+    latencies, failures = [], 0
+    peak_rss = 0
+
+    async def sample_memory():
+        nonlocal peak_rss
+        while True:
+            peak_rss = max(peak_rss, app.memory()["rss"])
+            await asyncio.sleep(0.25)
+
+    async def worker(session: aiohttp.ClientSession):
+        nonlocal failures
+        for company_name, job_role in workload:
+            start = time.perf_counter()
+            try:
+                async with session.post(url + "/research", json={"company_name": company_name, "job_role": job_role}) as response:
+                    await response.read()
+                    if response.status != 200:
+                        failures += 1
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                failures += 1
+            latencies.append(time.perf_counter() - start)
+
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=300)) as session:
+        async with session.get(url + "/metrics") as response:
+            metrics_before = await response.text()
+        rss_before = app.memory()["rss"]
+        sampler = asyncio.ensure_future(sample_memory())
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker(session) for _ in range(args.concurrency)])
+        elapsed = time.perf_counter() - start
+
+        sampler.cancel()
+        async with session.get(url + "/metrics") as response:
+            metrics_after = await response.text()
+        async with session.get(url + "/cache/stats") as response:
+            cache_stats = await response.json()
+        memory = app.memory()
+
+    app.stop()
+    for stub in stubs.values():
+        stub.stop()
+
+    lag_before = parse_histogram(metrics_before, "kbg_event_loop_lag_seconds")
+    lag_after = parse_histogram(metrics_after, "kbg_event_loop_lag_seconds")
+    results = {
+        "config": {key: value for key, value in vars(args).items() if key != "func"},
+        "requests": len(latencies),
+        "failures": failures,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "latency_ms": {f"p{pct}": round(percentile(latencies, pct) * 1000, 1) for pct in (50, 95, 99)},
+        # Bucket upper bounds from the app's own lag monitor, sampled every LOOP_LAG_INTERVAL
+        "loop_lag_ms": {f"p{pct}_le": round(histogram_quantile(lag_before, lag_after, pct) * 1000, 1) for pct in (50, 99)},
+        "rss_mib": {
+            "before": round(rss_before / 2 ** 20, 1),
+            "after": round(memory["rss"] / 2 ** 20, 1),
+            "peak": round(max(peak_rss, memory["peak_rss"]) / 2 ** 20, 1),
+        },
+        "research_cache_hit_rate": cache_stats["research"]["hit_rate"],
+        "upstream_calls": {name: stub.app["faults"]["requests"] for name, stub in stubs.items()},
+    }
+
+    print(f"{results['requests']} requests, concurrency {args.concurrency}, {args.companies} companies "
+          f"(zipf {args.zipf}), {failures} failed")
+    print(f"  throughput: {results['throughput_rps']} req/s over {results['seconds']}s")
+    print("  latency:    " + " ".join(f"{key}={value}ms" for key, value in results["latency_ms"].items()))
+    print("  loop lag:   " + " ".join(f"{key.replace('_le', '')}<={value}ms" for key, value in results["loop_lag_ms"].items()))
+    print("  rss:        " + " ".join(f"{key}={value}MiB" for key, value in results["rss_mib"].items()))
+    print(f"  research cache hit rate: {results['research_cache_hit_rate']:.0%}")
+    print("  upstream calls: " + ", ".join(f"{name}={count}" for name, count in results["upstream_calls"].items()))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+async def bench_hits(args):
+    """Cache-hit throughput of /research: pre-encoded bytes vs response model validation and encoding"""
+    names = [f"Benchmark Company {index}" for index in range(args.companies)]
+    stubs = {
+        "wikipedia": StubServer(make_wiki_stub({name: synthetic_wiki_article(name, seed=index) for index, name in enumerate(names)}, {})),
+        "newsapi": StubServer(make_news_stub(0)),
+        "llm": StubServer(make_llm_stub(0)),
+    }
+    env = {
+        "WIKI_BASE_URL": stubs["wikipedia"].start(),
+        "NEWS_API_URL": stubs["newsapi"].start() + "/v2/everything",
+        "NEWS_API_KEY": "benchmark-key",
+        "LLM_BASE_URL": stubs["llm"].start(),
+        "CACHE_BACKEND": "memory",
+        "WIKI_RATE_LIMIT": "0",
+        "NEWS_RATE_LIMIT": "0",
+    }
+    headers = {"Accept-Encoding": args.encoding}
+
+    for label, preencode in (("model", "false"), ("pre-encoded", "true")):
+        app = AppServer({**env, "PREENCODE_CACHE_HITS": preencode})
+        url = await app.start()
+        latencies, failures, body_bytes = [], 0, 0
+        workload = iter(names[index % len(names)] for index in range(args.requests))
+
+        async def worker(session: aiohttp.ClientSession):
+            nonlocal failures, body_bytes
+            for company_name in workload:
+                start = time.perf_counter()
+                async with session.post(url + "/research", json={"company_name": company_name, "job_role": "Software Engineer"},
+                                        headers=headers) as response:
+                    await response.read()
+                    if response.status != 200 or response.headers.get("X-Cache") != "hit":
+                        failures += 1
+                    body_bytes += int(response.headers.get("Content-Length", 0))
+                latencies.append(time.perf_counter() - start)
+
+        connector = aiohttp.TCPConnector(limit=args.concurrency)
+        async with aiohttp.ClientSession(connector=connector, auto_decompress=True) as session:
+            # Fill the research cache, so every measured request is a hit
+            for company_name in names:
+                async with session.post(url + "/research", json={"company_name": company_name, "job_role": "Software Engineer"}) as response:
+                    await response.read()
+
+            start = time.perf_counter()
+            await asyncio.gather(*[worker(session) for _ in range(args.concurrency)])
+            elapsed = time.perf_counter() - start
+        app.stop()
+
+        print(f"{label:<12} {len(latencies) / elapsed:8.1f} req/s  p50={format_ms(percentile(latencies, 50))} "
+              f"p99={format_ms(percentile(latencies, 99))}  {body_bytes / max(1, len(latencies)) / 1024:.1f}KiB/response"
+              f"{f'  {failures} not hits' if failures else ''}")
+
+    for stub in stubs.values():
+        stub.stop()
+
+
+async def bench_cpu(args):
+    """Throughput of the CPU-bound stages and event-loop lag under each CPU worker model"""
+    main = load_app({})
+    articles = [synthetic_wiki_article(f"Company {seed}", seed=seed) for seed in range(args.articles)]
+    company_data = [{
+        "company_name": f"Company {index}",
+        "company_info": main.extract_wiki_page(html),
+        "news": {"articles": main.generate_mock_news(f"Company {index}")},
+        "reviews": main.generate_mock_reviews(f"Company {index}"),
+    } for index, html in enumerate(articles)]
+
+    for model in args.models:
+        workers = 1 if model == "inline" else args.workers
+        pool = main.CPUPool(model, workers, max_queue=args.tasks)
+        await pool.start()
+        probe = LoopLagProbe()
+        probe.start()
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def one(index: int):
+            async with semaphore:
+                await pool.run("wiki_parse", main.extract_wiki_page, articles[index % len(articles)])
+                await pool.run("prompt_build", main.pack_company_context, company_data[index % len(company_data)])
+
+        start = time.perf_counter()
+        await asyncio.gather(*[one(index) for index in range(args.tasks)])
+        elapsed = time.perf_counter() - start
+        await probe.stop()
+        pool.shutdown()
+        print(f"{model:<8} {workers:>2} workers  {args.tasks / elapsed:7.1f} pages/s  loop lag {probe.report()}")
+
+
+async def bench_overload(args):
+    """Open-loop /research load beyond pipeline capacity, without admission control, degrading and rejecting"""
+    hot = [f"Popular Company {index}" for index in range(10)]
+    stubs = {
+        "wikipedia": StubServer(make_wiki_stub({}, {})),
+        "newsapi": StubServer(inject_faults(make_news_stub(0), latency=0.1)),
+        "llm": StubServer(inject_faults(make_llm_stub(0), latency=args.llm_latency, jitter=0.3)),
+    }
+    env = {
+        "WIKI_BASE_URL": stubs["wikipedia"].start(),
+        "NEWS_API_URL": stubs["newsapi"].start() + "/v2/everything",
+        "NEWS_API_KEY": "benchmark-key",
+        "LLM_BASE_URL": stubs["llm"].start(),
+        "CACHE_BACKEND": "memory",
+        "WIKI_RATE_LIMIT": "0",
+        "NEWS_RATE_LIMIT": "0",
+        # Let summaries queue at the model instead of falling back, so only admission control bounds the backlog
+        "LLM_MAX_QUEUE": "100000",
+        "LLM_TIMEOUT": "300",
+        "ADMISSION_QUEUE_SIZE": str(args.queue),
+        "ADMISSION_DEADLINE": str(args.deadline),
+    }
+    phases = [
+        ("no admission", {"MAX_INFLIGHT_PIPELINES": "0"}),
+        ("degrade", {"MAX_INFLIGHT_PIPELINES": str(args.in_flight), "OVERLOAD_ACTION": "degrade"}),
+        ("reject", {"MAX_INFLIGHT_PIPELINES": str(args.in_flight), "OVERLOAD_ACTION": "reject"}),
+    ]
+    print(f"{args.rate} req/s for {args.duration}s, {args.hot:.0%} cached, model latency {args.llm_latency}s; "
+          f"admission: {args.in_flight} in flight, queue {args.queue}, deadline {args.deadline}s")
+
+    for label, settings in phases:
+        app = AppServer({**env, **settings})
+        url = await app.start()
+        rng = random.Random(0)
+        outcomes = {"success": [], "degraded": [], "rejected": [], "failed": []}
+        hit_latencies = []
+
+        async def send(session: aiohttp.ClientSession, index: int):
+            company_name = rng.choice(hot) if rng.random() < args.hot else f"Cold Company {index}"
+            start = time.perf_counter()
+            try:
+                async with session.post(url + "/research", json={"company_name": company_name}) as response:
+                    body = await response.read()
+                    latency = time.perf_counter() - start
+                    if response.status == 503:
+                        outcome = "rejected"
+                    elif response.status != 200:
+                        outcome = "failed"
+                    else:
+                        outcome = "degraded" if json.loads(body)["status"] == "degraded" else "success"
+                    if response.headers.get("X-Cache") == "hit":
+                        hit_latencies.append(latency)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                outcome, latency = "failed", time.perf_counter() - start
+            outcomes[outcome].append(latency)
+
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0),
+                                         timeout=aiohttp.ClientTimeout(total=600)) as session:
+            for company_name in hot:
+                async with session.post(url + "/research", json={"company_name": company_name}) as response:
+                    await response.read()
+
+            # Open loop: requests arrive on schedule whether or not earlier ones have been answered
+            tasks = []
+            start = time.perf_counter()
+            for index in range(int(args.rate * args.duration)):
+                await asyncio.sleep(max(0.0, start + index / args.rate - time.perf_counter()))
+                tasks.append(asyncio.ensure_future(send(session, index)))
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - start
+        app.stop()
+
+        latencies = [latency for values in outcomes.values() for latency in values]
+        served = outcomes["success"] + outcomes["degraded"]
+        print(f"{label:<13} {len(outcomes['success'])} full, {len(outcomes['degraded'])} degraded, "
+              f"{len(outcomes['rejected'])} rejected, {len(outcomes['failed'])} failed in {elapsed:.1f}s; "
+              f"p50={format_ms(percentile(latencies, 50))} p99={format_ms(percentile(latencies, 99))} "
+              f"served p99={format_ms(percentile(served, 99) if served else 0)} "
+              f"hit p99={format_ms(percentile(hit_latencies, 99) if hit_latencies else 0)}")
+
+    for stub in stubs.values():
+        stub.stop()
+
+
+async def bench_snapshot(args):
+    """Build a snapshot from stub upstreams, then compare snapshot lookups with upstream fetches and serve offline"""
+    import tempfile
+
+    names = [f"Snapshot Company {index}" for index in range(args.companies)]
+    stubs = {
+        "wikipedia": StubServer(inject_faults(
+            make_wiki_stub({name: synthetic_wiki_article(name, sections=10, seed=index) for index, name in enumerate(names)}, {}),
+            latency=args.wiki_latency)),
+        "newsapi": StubServer(inject_faults(make_news_stub(0), latency=args.news_latency)),
+    }
+    path = os.path.join(tempfile.mkdtemp(), "snapshot.kbg")
+    main = load_app({
+        "WIKI_BASE_URL": stubs["wikipedia"].start(),
+        "NEWS_API_URL": stubs["newsapi"].start() + "/v2/everything",
+        "NEWS_API_KEY": "benchmark-key",
+        "SNAPSHOT_PATH": path,
+        "CACHE_BACKEND": "memory",
+        "WIKI_RATE_LIMIT": "0",
+        "NEWS_RATE_LIMIT": "0",
+        "LOOP_LAG_INTERVAL": "0",
+    })
+
+    start = time.perf_counter()
+    built = await main.build_snapshot(names, path, args.concurrency)
+    print(f"built {built['companies']} companies ({built['company_info']} company info, {built['news']} news) "
+          f"in {time.perf_counter() - start:.1f}s, {built['bytes'] / 2 ** 20:.1f}MiB")
+
+    start = time.perf_counter()
+    snapshot = main.Snapshot(path)
+    print(f"open: {format_ms(time.perf_counter() - start)}")
+
+    rng = random.Random(0)
+    sample = [main.get_company_key(rng.choice(names)) for _ in range(args.lookups)]
+    latencies = []
+    for company_key in sample:
+        start = time.perf_counter()
+        snapshot.get(company_key)
+        latencies.append(time.perf_counter() - start)
+    print(f"snapshot lookup: p50={format_ms(percentile(latencies, 50))} p99={format_ms(percentile(latencies, 99))}")
+    snapshot.close()
+
+    latencies = []
+    for company_name in names[:args.fetches]:
+        start = time.perf_counter()
+        await asyncio.gather(main.scrape_company_info_async(company_name), main.get_recent_news_async(company_name))
+        latencies.append(time.perf_counter() - start)
+    print(f"upstream fetch:  p50={format_ms(percentile(latencies, 50))} p99={format_ms(percentile(latencies, 99))}")
+
+    # Take the upstreams away and answer every company from the snapshot alone
+    for stub in stubs.values():
+        stub.stop()
+    clear_caches(main)
+    main.get_snapshot()
+    served, latencies = 0, []
+    for company_name in names:
+        start = time.perf_counter()
+        tasks = main.start_source_tasks(company_name)
+        results = dict(zip(tasks, await asyncio.gather(*tasks.values())))
+        latencies.append(time.perf_counter() - start)
+        served += results["company_info"]["status"] == "success" and results["news"]["status"] == "success"
+    print(f"offline sources: {served}/{len(names)} companies with real data, "
+          f"p50={format_ms(percentile(latencies, 50))} p99={format_ms(percentile(latencies, 99))}")
+    await main.close_http_session()
+
+
+async def bench_roles(args):
+    """Summary cache hit rate on a replayed query log, with and without role normalization"""
+    main = load_app({})
+    labels = {}
+    if args.log:
+        with open(args.log, newline="", encoding="utf-8") as f:
+            queries = [(row[0], row[1] if len(row) > 1 else "") for row in csv.reader(f) if row]
+    else:
+        # Popular companies and roles dominate, and each role shows up under several spellings
+        rng = random.Random(args.seed)
+        companies = [f"Company {index}" for index in range(args.companies)]
+        company_weights = [1 / (rank + 1) for rank in range(len(companies))]
+        clusters = list(ROLE_VARIANTS)
+        cluster_weights = [1 / (rank + 1) for rank in range(len(clusters))]
+        queries = []
+        for _ in range(args.queries):
+            cluster = rng.choices(clusters, cluster_weights)[0]
+            role = rng.choice(ROLE_VARIANTS[cluster])
+            labels[role] = cluster
+            queries.append((rng.choices(companies, company_weights)[0], role))
+
+    def hit_rate(key) -> float:
+        seen, hits = set(), 0
+        for company_name, job_role in queries:
+            cache_key = key(company_name, job_role)
+            hits += cache_key in seen
+            seen.add(cache_key)
+        return hits / len(queries)
+
+    exact = hit_rate(lambda company_name, job_role: (company_name.lower(), job_role.strip()))
+    start = time.perf_counter()
+    normalized = hit_rate(main.get_cache_key)
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(queries)} queries, {len({role for _, role in queries})} distinct role spellings")
+    print(f"  exact role keys:      {exact:.1%} hit rate")
+    print(f"  normalized role keys: {normalized:.1%} hit rate "
+          f"({(normalized - exact) * len(queries):.0f} fewer LLM calls), "
+          f"{elapsed / len(queries) * 1e6:.1f}us per key")
+
+    if labels:
+        wrong = [(role, label, main.normalize_job_role(role)) for role, label in sorted(labels.items(), key=str)
+                 if main.normalize_job_role(role) != (label or " ".join(role.split()))]
+        print(f"  {len(labels) - len(wrong)}/{len(labels)} spellings mapped as labelled")
+        for role, label, mapped in wrong:
+            print(f"    {role!r}: expected {label}, got {mapped}")
+        if wrong:
+            raise SystemExit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KnowBeforeGo.ai offline benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    llm = subparsers.add_parser("llm", help="event-loop lag while AI summaries are generated")
+    llm.add_argument("--summaries", type=int, default=16)
+    llm.add_argument("--concurrency", type=int, default=8)
+    llm.add_argument("--delay", type=float, default=0.5, help="stub model latency in seconds")
+    llm.add_argument("--blocking", action="store_true", help="use a synchronous client for comparison")
+    llm.set_defaults(func=bench_llm)
+
+    http = subparsers.add_parser("http", help="connection reuse of the shared HTTP session")
+    http.add_argument("--requests", type=int, default=500)
+    http.add_argument("--concurrency", type=int, default=20)
+    http.add_argument("--delay", type=float, default=0.0, help="stub response latency in seconds")
+    http.set_defaults(func=bench_http)
+
+    parse = subparsers.add_parser("parse", help="Wikipedia extractor speed and parity")
+    parse.add_argument("--fixtures", help="directory of saved Wikipedia article .html files")
+    parse.add_argument("--repeat", type=int, default=5)
+    parse.set_defaults(func=bench_parse)
+
+    wiki = subparsers.add_parser("wiki", help="MediaWiki API source vs rendered article scraping")
+    wiki.add_argument("--companies", type=int, default=20)
+    wiki.add_argument("--latency", type=float, default=0.0, help="seconds added to every Wikipedia request, like a network round trip")
+    wiki.set_defaults(func=bench_wiki)
+
+    coalesce = subparsers.add_parser("coalesce", help="identical concurrent requests and streams trigger one upstream fetch")
+    coalesce.add_argument("--requests", type=int, default=50)
+    coalesce.add_argument("--delay", type=float, default=0.2, help="stub news and model latency in seconds")
+    coalesce.set_defaults(func=bench_coalesce)
+
+    stream = subparsers.add_parser("stream", help="time to first byte of the streaming endpoint")
+    stream.add_argument("--news-delay", type=float, default=0.5, help="stub NewsAPI latency in seconds")
+    stream.add_argument("--llm-delay", type=float, default=2.0, help="stub model latency in seconds")
+    stream.set_defaults(func=bench_stream)
+
+    faults = subparsers.add_parser("faults", help="latency and upstream load while upstreams fail, with circuit breakers")
+    faults.add_argument("--requests", type=int, default=40)
+    faults.add_argument("--concurrency", type=int, default=8)
+    faults.add_argument("--error-rate", type=float, default=1.0, help="share of upstream calls that fail")
+    faults.add_argument("--delay", type=float, default=0.1, help="stub news and model latency in seconds")
+    faults.add_argument("--reset-timeout", type=float, default=1.0, help="seconds a breaker stays open")
+    faults.set_defaults(func=bench_faults)
+
+    research = subparsers.add_parser("research", help="end-to-end /research throughput, latency, loop lag and memory")
+    research.add_argument("--requests", type=int, default=200)
+    research.add_argument("--concurrency", type=int, default=16)
+    research.add_argument("--companies", type=int, default=50, help="distinct companies in the workload")
+    research.add_argument("--zipf", type=float, default=1.0, help="popularity skew across companies, 0 for uniform")
+    research.add_argument("--seed", type=int, default=0)
+    research.add_argument("--wiki-latency", type=float, default=0.05, help="median stub Wikipedia latency in seconds")
+    research.add_argument("--news-latency", type=float, default=0.2, help="median stub NewsAPI latency in seconds")
+    research.add_argument("--llm-latency", type=float, default=1.5, help="median stub model latency in seconds")
+    research.add_argument("--jitter", type=float, default=0.5, help="log-normal sigma applied to every stub latency")
+    research.add_argument("--wiki-errors", type=float, default=0.0, help="share of Wikipedia calls that fail")
+    research.add_argument("--news-errors", type=float, default=0.0, help="share of NewsAPI calls that fail")
+    research.add_argument("--llm-errors", type=float, default=0.0, help="share of model calls that fail")
+    research.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                          help="extra setting for the app under test, repeatable")
+    research.add_argument("--output", help="write the results as JSON, e.g. to compare before and after a change")
+    research.set_defaults(func=bench_research)
+
+    hits = subparsers.add_parser("hits", help="/research cache-hit throughput, pre-encoded vs model-validated responses")
+    hits.add_argument("--requests", type=int, default=5000)
+    hits.add_argument("--concurrency", type=int, default=16)
+    hits.add_argument("--companies", type=int, default=10, help="distinct cached results to cycle through")
+    hits.add_argument("--encoding", default="gzip", help="Accept-Encoding sent with each request, e.g. identity")
+    hits.set_defaults(func=bench_hits)
+
+    cpu = subparsers.add_parser("cpu", help="parse and prompt-build throughput under each CPU worker model")
+    cpu.add_argument("--tasks", type=int, default=200, help="articles to parse and pack into prompt context")
+    cpu.add_argument("--articles", type=int, default=10, help="distinct synthetic articles to cycle through")
+    cpu.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    cpu.add_argument("--concurrency", type=int, default=32, help="pipelines submitting work at once")
+    cpu.add_argument("--models", nargs="+", default=["inline", "thread", "process"], choices=["inline", "thread", "process"])
+    cpu.set_defaults(func=bench_cpu)
+
+    overload = subparsers.add_parser("overload", help="/research latency and shedding when cold requests outrun the pipelines")
+    overload.add_argument("--rate", type=float, default=30, help="requests per second, sent open loop")
+    overload.add_argument("--duration", type=float, default=15, help="seconds of load")
+    overload.add_argument("--hot", type=float, default=0.5, help="share of requests for already cached companies")
+    overload.add_argument("--llm-latency", type=float, default=1.0, help="median stub model latency in seconds")
+    overload.add_argument("--in-flight", type=int, default=8, help="MAX_INFLIGHT_PIPELINES when admission is on")
+    overload.add_argument("--queue", type=int, default=16, help="ADMISSION_QUEUE_SIZE when admission is on")
+    overload.add_argument("--deadline", type=float, default=2.0, help="ADMISSION_DEADLINE when admission is on")
+    overload.set_defaults(func=bench_overload)
+
+    snapshot = subparsers.add_parser("snapshot", help="snapshot build, lookup latency vs upstream fetches, and serving offline")
+    snapshot.add_argument("--companies", type=int, default=2000)
+    snapshot.add_argument("--concurrency", type=int, default=32, help="companies fetched at once while building")
+    snapshot.add_argument("--lookups", type=int, default=20000)
+    snapshot.add_argument("--fetches", type=int, default=50, help="companies fetched upstream for comparison")
+    snapshot.add_argument("--wiki-latency", type=float, default=0.05, help="median stub Wikipedia latency in seconds")
+    snapshot.add_argument("--news-latency", type=float, default=0.2, help="median stub NewsAPI latency in seconds")
+    snapshot.set_defaults(func=bench_snapshot)
+
+    roles = subparsers.add_parser("roles", help="summary cache hit rate from role normalization on a replayed query log")
+    roles.add_argument("--log", help="CSV of company,role queries to replay instead of a synthetic log")
+    roles.add_argument("--queries", type=int, default=5000)
+    roles.add_argument("--companies", type=int, default=100)
+    roles.add_argument("--seed", type=int, default=0)
+    roles.set_defaults(func=bench_roles)
+
+    args = parser.parse_args()
+    asyncio.run(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
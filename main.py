@@ -1,26 +1,68 @@
 import os
+import sys
+import argparse
 import asyncio
 import aiohttp
 from dotenv import load_dotenv
-from openai import OpenAI
-from fastapi import FastAPI, Request, Form, HTTPException
+from openai import AsyncOpenAI, APIConnectionError, APITimeoutError
+from fastapi import FastAPI, Request, Response, Form, HTTPException
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import requests
 from bs4 import BeautifulSoup
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
 import re
+import csv
 import time
 import random
 import json
 import uvicorn
 from pydantic import BaseModel
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Any, Tuple, Callable, Awaitable, AsyncIterator
 import logging
-from functools import lru_cache
+from functools import lru_cache, partial, wraps
+import abc
 import hashlib
-from urllib.parse import quote_plus
+import heapq
+import math
+import mmap
+import sqlite3
+import struct
+import threading
+import unicodedata
+import zlib
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from urllib.parse import quote, quote_plus, urlencode
+
+try:
+    import lxml.html
+except ImportError:  # lxml is optional; extraction falls back to BeautifulSoup
+    lxml = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; cache payloads fall back to compressed JSON
+    msgpack = None
+
+try:
+    import redis
+except ImportError:  # redis is only needed for CACHE_BACKEND=redis
+    redis = None
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional; token counts fall back to ~4 characters per token
+    tiktoken = None
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; cached responses are encoded with the json module instead
+    orjson = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -29,10 +71,69 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
-# OpenAI client setup
-client = OpenAI(
-    base_url="https://models.github.ai/inference",
+# LLM settings
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://models.github.ai/inference")
+LLM_MODEL = os.getenv("LLM_MODEL", "openai/gpt-4o")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))  # Summaries generated at once
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))  # Summaries allowed to wait for a slot
+PROMPT_MAX_TOKENS = int(os.getenv("PROMPT_MAX_TOKENS", "2000"))  # Input token budget for a summary prompt
+LLM_PROMPT_PRICE = float(os.getenv("LLM_PROMPT_PRICE", "2.50"))  # USD per million prompt tokens
+LLM_COMPLETION_PRICE = float(os.getenv("LLM_COMPLETION_PRICE", "10.00"))  # USD per million completion tokens
+
+# HTTP client settings (one pooled session is shared by every scraper)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "20"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "60"))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Wikipedia settings
+WIKI_BASE_URL = os.getenv("WIKI_BASE_URL", "https://en.wikipedia.org")
+WIKI_SOURCE = os.getenv("WIKI_SOURCE", "html")  # "html" (rendered article pages) or "api" (MediaWiki API: fewer bytes, more round trips)
+WIKI_HEDGE_DELAY = float(os.getenv("WIKI_HEDGE_DELAY", "1.0"))  # Seconds before also trying the next title variant
+WIKI_PARSER = os.getenv("WIKI_PARSER", "lxml")  # "lxml" or "bs4"
+WIKI_MAX_CONCURRENCY = int(os.getenv("WIKI_MAX_CONCURRENCY", "16"))  # Requests to Wikipedia at once
+
+# CPU execution settings: HTML parsing, prompt packing and fallback rendering run off the event loop
+CPU_WORKER_MODEL = os.getenv("CPU_WORKER_MODEL", "thread")  # "thread", "process" or "inline"
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", os.getenv("PARSE_WORKERS", str(os.cpu_count() or 4))))  # PARSE_WORKERS is the old name
+CPU_MAX_QUEUE = int(os.getenv("CPU_MAX_QUEUE", "64"))  # CPU tasks allowed to wait for a worker
+
+# News settings
+NEWS_API_URL = os.getenv("NEWS_API_URL", "https://newsapi.org/v2/everything")
+NEWS_MAX_CONCURRENCY = int(os.getenv("NEWS_MAX_CONCURRENCY", "4"))  # Requests to NewsAPI at once
+NEWS_PAGE_SIZE = int(os.getenv("NEWS_PAGE_SIZE", "10"))  # Articles requested per company
+NEWS_MAX_ARTICLES = int(os.getenv("NEWS_MAX_ARTICLES", "5"))  # Relevant articles kept
+
+# Upstream protection: token-bucket rate limits (calls/second, 0 = unlimited) and circuit breakers
+WIKI_RATE_LIMIT = float(os.getenv("WIKI_RATE_LIMIT", "20"))
+WIKI_RATE_BURST = int(os.getenv("WIKI_RATE_BURST", "40"))
+NEWS_RATE_LIMIT = float(os.getenv("NEWS_RATE_LIMIT", "2"))
+NEWS_RATE_BURST = int(os.getenv("NEWS_RATE_BURST", "5"))
+LLM_RATE_LIMIT = float(os.getenv("LLM_RATE_LIMIT", "0"))
+LLM_RATE_BURST = int(os.getenv("LLM_RATE_BURST", "8"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))  # Consecutive failures before opening
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))  # Seconds open before a trial call
+
+# Batch research settings
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))  # Batch pipelines run at once, across all batches
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+
+# Admission control settings
+MAX_INFLIGHT_PIPELINES = int(os.getenv("MAX_INFLIGHT_PIPELINES", "32"))  # Cold research pipelines run at once, 0 disables
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "64"))  # Requests allowed to wait for a pipeline
+ADMISSION_DEADLINE = float(os.getenv("ADMISSION_DEADLINE", "10"))  # Seconds a request may wait for a pipeline
+OVERLOAD_ACTION = os.getenv("OVERLOAD_ACTION", "degrade")  # "degrade" (data-only response) or "reject" (503)
+
+# OpenAI client setup (async so a completion never blocks the event loop)
+client = AsyncOpenAI(
+    base_url=LLM_BASE_URL,
     api_key=os.getenv("GITHUB_TOKEN"),
+    timeout=LLM_TIMEOUT,
+    max_retries=1,
 )
 
 # Initialize FastAPI app
@@ -55,13 +156,795 @@ app.add_middleware(
 templates = Jinja2Templates(directory="templates")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+# Metrics, exposed in Prometheus text format at /metrics
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000)
+
+def format_labels(labels: Dict[str, Any]) -> str:
+    """Render labels as {name="value",...}, escaped per the Prometheus text format"""
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+class Counter:
+    """Monotonic counter, one value per label combination"""
+    
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.values: Dict[Tuple[str, ...], float] = {}
+    
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[label]) for label in self.labels)
+        self.values[key] = self.values.get(key, 0) + amount
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{format_labels(dict(zip(self.labels, key)))} {value}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label combination"""
+    
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = STAGE_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        self.series: Dict[Tuple[str, ...], Dict] = {}
+    
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[label]) for label in self.labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series["counts"][index] += 1
+        series["sum"] += value
+        series["count"] += 1
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self.series.items()):
+            labels = dict(zip(self.labels, key))
+            for bound, count in zip(self.buckets, series["counts"]):
+                lines.append(f"{self.name}_bucket{format_labels({**labels, 'le': bound})} {count}")
+            lines.append(f"{self.name}_bucket{format_labels({**labels, 'le': '+Inf'})} {series['count']}")
+            lines.append(f"{self.name}_sum{format_labels(labels)} {series['sum']}")
+            lines.append(f"{self.name}_count{format_labels(labels)} {series['count']}")
+        return lines
+
+STAGE_SECONDS = Histogram("kbg_stage_seconds", "Time spent in each research pipeline stage", ("stage",))
+RESEARCH_SECONDS = Histogram("kbg_research_seconds", "End-to-end research request latency", ("endpoint", "cached"))
+UPSTREAM_SECONDS = Histogram("kbg_upstream_request_seconds", "Latency of HTTP calls to each upstream", ("upstream",))
+LLM_TOKENS = Histogram("kbg_llm_tokens", "Tokens per chat completion", ("direction",), TOKEN_BUCKETS)
+UPSTREAM_ERRORS = Counter("kbg_upstream_errors_total", "Failed upstream calls by reason", ("upstream", "reason"))
+FALLBACKS = Counter("kbg_fallbacks_total", "Responses served from placeholder data instead of an upstream", ("source",))
+CACHE_REFRESHES = Counter("kbg_cache_refreshes_total", "Background re-research of cached results", ("reason", "result"))
+PROMPT_TOKENS = Histogram("kbg_prompt_tokens", "Estimated input tokens of each summary prompt", buckets=TOKEN_BUCKETS)
+LLM_COST = Counter("kbg_llm_cost_usd_total", "LLM spend at the configured prices", ("direction",))
+EVENT_LOOP_LAG = Histogram("kbg_event_loop_lag_seconds", "How late the event loop wakes from a short sleep",
+                           buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+CPU_QUEUE_SECONDS = Histogram("kbg_cpu_queue_seconds", "Time CPU-bound stages wait for a worker", ("stage",))
+CPU_REJECTED = Counter("kbg_cpu_rejected_total", "CPU-bound stages turned away because the worker queue was full", ("stage",))
+SNAPSHOT_LOOKUPS = Counter("kbg_snapshot_lookups_total", "Source lookups answered by the offline snapshot", ("source", "result"))
+ADMISSION_WAIT = Histogram("kbg_admission_wait_seconds", "Time research pipelines wait to be admitted", ("priority",))
+ADMISSION_SHED = Counter("kbg_admission_shed_total", "Research pipelines turned away by admission control", ("priority", "reason"))
+METRICS = [STAGE_SECONDS, RESEARCH_SECONDS, UPSTREAM_SECONDS, LLM_TOKENS, PROMPT_TOKENS, LLM_COST, UPSTREAM_ERRORS,
+           FALLBACKS, CACHE_REFRESHES, EVENT_LOOP_LAG, CPU_QUEUE_SECONDS, CPU_REJECTED, ADMISSION_WAIT, ADMISSION_SHED,
+           SNAPSHOT_LOOKUPS]
+
+# Per-request stage breakdown; tasks started by a request inherit (and fill in) its dict
+STAGE_TIMINGS: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_timings", default=None)
+
+@contextmanager
+def timed_stage(stage: str):
+    """Record how long the block takes as one observation of a pipeline stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        timings = STAGE_TIMINGS.get()
+        if timings is not None:
+            timings[stage] = round(timings.get(stage, 0.0) + elapsed, 4)
+
+def timed(stage: str):
+    """Decorator timing every call of a coroutine function as a pipeline stage"""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with timed_stage(stage):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class CPUPoolFull(Exception):
+    """Raised when too many CPU tasks are already waiting for a worker"""
+
+def run_timed(func: Callable, *args) -> Tuple[float, Any]:
+    """Run func in a worker, reporting when it actually started so queue wait can be measured"""
+    return time.time(), func(*args)
+
+class CPUPool:
+    """
+    Runs CPU-bound pipeline stages off the event loop
+    
+    `model` is "thread" (a thread pool; parsing with lxml releases the GIL
+    for much of its work), "process" (a pool of spawned worker processes,
+    so stages run on every core) or "inline" (on the event loop, for
+    debugging and comparison). At most `workers` tasks run at once; up to
+    `max_queue` more wait for a worker, and further submissions raise
+    CPUPoolFull so callers fall back instead of piling up. Functions and
+    arguments must be picklable for the process model: module-level
+    functions over plain data.
+    """
+    
+    def __init__(self, model: str, workers: int, max_queue: int):
+        if model not in ("thread", "process", "inline"):
+            raise ValueError(f"Unknown CPU worker model: {model}")
+        self.model = model
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self._executor = None
+        self._slots: Optional[asyncio.Semaphore] = None
+    
+    def executor(self):
+        if self._executor is None and self.model == "thread":
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="cpu")
+        elif self._executor is None and self.model == "process":
+            # Spawned, not forked: a forked child would inherit the event loop and other threads' locks
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                                 initializer=get_tokenizer)
+        return self._executor
+    
+    async def start(self):
+        """Create the pool, starting worker processes now rather than on the first request"""
+        if self.model == "process":
+            loop = asyncio.get_event_loop()
+            await asyncio.gather(*[loop.run_in_executor(self.executor(), os.getpid) for _ in range(self.workers)])
+    
+    async def run(self, stage: str, func: Callable, *args) -> Any:
+        """Run func(*args) on a worker, waiting for one to be free"""
+        if self.model == "inline":
+            return func(*args)
+        
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        if self._slots.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            CPU_REJECTED.inc(stage=stage)
+            raise CPUPoolFull(f"{self.waiting} CPU tasks already waiting, not running {stage}")
+        
+        submitted = time.time()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        
+        self.running += 1
+        try:
+            started, result = await asyncio.get_event_loop().run_in_executor(self.executor(), run_timed, func, *args)
+            CPU_QUEUE_SECONDS.observe(max(0.0, started - submitted), stage=stage)
+            self.completed += 1
+            return result
+        finally:
+            self.running -= 1
+            self._slots.release()
+    
+    def stats(self) -> Dict:
+        return {
+            "model": self.model,
+            "workers": self.workers,
+            "running": self.running,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+    
+    def shutdown(self):
+        if self._executor is not None:
+            # Tasks past the worker count wait on the pool's own slots, so nothing is queued here to cancel
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+CPU_POOL = CPUPool(CPU_WORKER_MODEL, CPU_WORKERS, CPU_MAX_QUEUE)
+
+# Cache settings
+CACHE_EXPIRY = int(os.getenv("CACHE_EXPIRY", "3600"))  # 1 hour
+MAX_CACHE_SIZE = int(os.getenv("MAX_CACHE_SIZE", "100"))  # Entries
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+SOURCE_CACHE_SIZE = int(os.getenv("SOURCE_CACHE_SIZE", "1000"))  # Entries per source tier
+COMPANY_INFO_CACHE_EXPIRY = int(os.getenv("COMPANY_INFO_CACHE_EXPIRY", "86400"))  # 1 day
+NEWS_CACHE_EXPIRY = int(os.getenv("NEWS_CACHE_EXPIRY", "900"))  # 15 minutes
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")  # "memory", "sqlite" or "redis"
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", "cache.db")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+CACHE_WARM_ON_STARTUP = os.getenv("CACHE_WARM_ON_STARTUP", "true").lower() == "true"
+STALE_TTL = int(os.getenv("STALE_TTL", "86400"))  # Seconds an expired research result is still served while it refreshes
+CACHE_PURGE_INTERVAL = int(os.getenv("CACHE_PURGE_INTERVAL", "1800"))  # Seconds between sweeps for expired entries
+REFRESH_INTERVAL = int(os.getenv("REFRESH_INTERVAL", "60"))  # Seconds between refresh-ahead passes
+REFRESH_AHEAD = int(os.getenv("REFRESH_AHEAD", "300"))  # Refresh popular results this many seconds before they expire
+REFRESH_MIN_ACCESSES = float(os.getenv("REFRESH_MIN_ACCESSES", "3"))  # Recent accesses that make a result popular
+REFRESH_HALF_LIFE = float(os.getenv("REFRESH_HALF_LIFE", "3600"))  # Seconds for an access to count half as much
+REFRESH_BUDGET = int(os.getenv("REFRESH_BUDGET", "5"))  # Background pipeline runs per refresh pass, 0 disables
+REFRESH_TRACK_MAX = int(os.getenv("REFRESH_TRACK_MAX", "2000"))  # Company/role pairs whose popularity is tracked
+ROLE_NORMALIZATION = os.getenv("ROLE_NORMALIZATION", "true").lower() == "true"  # Share cache entries between near-identical roles
+ROLE_MATCH_THRESHOLD = float(os.getenv("ROLE_MATCH_THRESHOLD", "0.8"))  # Minimum similarity to a canonical role
+COMPANY_DATA_PATH = os.getenv("COMPANY_DATA_PATH", "data/companies.csv")  # Known companies with their aliases and tickers
+COMPANY_INDEX_PATH = os.getenv("COMPANY_INDEX_PATH", "data/company_index.tsv")  # Sorted lookup index built from it
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "data/snapshot.kbg")  # Prebuilt company info and news, written by build-snapshot
+SNAPSHOT_MAX_AGE = int(os.getenv("SNAPSHOT_MAX_AGE", "604800"))  # Seconds the snapshot is served before upstreams, 0 for always
+
+# Response settings
+PREENCODE_CACHE_HITS = os.getenv("PREENCODE_CACHE_HITS", "true").lower() == "true"  # Send cached research as pre-serialized bytes
+RESPONSE_GZIP_MIN_BYTES = int(os.getenv("RESPONSE_GZIP_MIN_BYTES", "1024"))  # Smallest cached response sent gzipped, 0 disables
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+
+# Monitoring settings
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.1"))  # Seconds between event-loop lag samples, 0 disables
+
+def encode_cache_payload(value: Any) -> bytes:
+    """Serialize a cache value compactly: zlib-compressed msgpack when available, else JSON"""
+    if msgpack is not None:
+        return b"m" + zlib.compress(msgpack.packb(value, use_bin_type=True))
+    return b"j" + zlib.compress(json.dumps(value, default=str, separators=(",", ":")).encode())
+
+def decode_cache_payload(payload: bytes) -> Any:
+    body = zlib.decompress(payload[1:])
+    if payload[:1] == b"m":
+        return msgpack.unpackb(body, raw=False)
+    return json.loads(body)
+
+class CacheStore(abc.ABC):
+    """Persistent store shared by every worker, sitting behind the in-memory caches
+    
+    Implementations are synchronous; ResultCache calls them from a thread.
+    """
+    
+    @abc.abstractmethod
+    def get(self, tier: str, key: str) -> Optional[Tuple[Any, float]]:
+        """Return (value, expires) for an unexpired entry, or None"""
+    
+    @abc.abstractmethod
+    def set(self, tier: str, key: str, value: Any, expires: float):
+        pass
+    
+    @abc.abstractmethod
+    def load(self, tier: str, limit: int) -> List[Tuple[str, Any, float]]:
+        """Return up to limit unexpired (key, value, expires) entries, freshest first"""
+    
+    def purge_expired(self) -> int:
+        return 0
+    
+    def close(self):
+        pass
+
+class SQLiteCacheStore(CacheStore):
+    """Cache store in a local SQLite file; works without any external service"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "tier TEXT NOT NULL, key TEXT NOT NULL, expires REAL NOT NULL, payload BLOB NOT NULL, "
+            "PRIMARY KEY (tier, key))"
+        )
+    
+    def get(self, tier: str, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, expires FROM cache WHERE tier = ? AND key = ? AND expires > ?",
+                (tier, key, time.time())
+            ).fetchone()
+        return (decode_cache_payload(row[0]), row[1]) if row else None
+    
+    def set(self, tier: str, key: str, value: Any, expires: float):
+        payload = encode_cache_payload(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (tier, key, expires, payload) VALUES (?, ?, ?, ?)",
+                (tier, key, expires, payload)
+            )
+    
+    def load(self, tier: str, limit: int) -> List[Tuple[str, Any, float]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, payload, expires FROM cache WHERE tier = ? AND expires > ? ORDER BY expires DESC LIMIT ?",
+                (tier, time.time(), limit)
+            ).fetchall()
+        return [(key, decode_cache_payload(payload), expires) for key, payload, expires in rows]
+    
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),)).rowcount
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class RedisCacheStore(CacheStore):
+    """Cache store in Redis (or any Redis-compatible server); expiry is handled by the server"""
+    
+    def __init__(self, url: str, prefix: str = "kbg"):
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url)
+    
+    def _key(self, tier: str, key: str) -> str:
+        return f"{self.prefix}:{tier}:{key}"
+    
+    def get(self, tier: str, key: str) -> Optional[Tuple[Any, float]]:
+        payload = self._redis.get(self._key(tier, key))
+        if payload is None:
+            return None
+        expires, = struct.unpack("!d", payload[:8])
+        return decode_cache_payload(payload[8:]), expires
+    
+    def set(self, tier: str, key: str, value: Any, expires: float):
+        ttl_ms = int((expires - time.time()) * 1000)
+        if ttl_ms > 0:
+            self._redis.set(self._key(tier, key), struct.pack("!d", expires) + encode_cache_payload(value), px=ttl_ms)
+    
+    def load(self, tier: str, limit: int) -> List[Tuple[str, Any, float]]:
+        entries = []
+        prefix = self._key(tier, "")
+        for redis_key in self._redis.scan_iter(match=f"{prefix}*", count=500):
+            key = redis_key.decode()[len(prefix):]
+            entry = self.get(tier, key)
+            if entry:
+                entries.append((key, *entry))
+            if len(entries) >= limit:
+                break
+        return sorted(entries, key=lambda entry: entry[2], reverse=True)
+    
+    def close(self):
+        self._redis.close()
+
+def create_cache_store() -> Optional[CacheStore]:
+    """Build the persistent cache store selected by CACHE_BACKEND"""
+    if CACHE_BACKEND == "sqlite":
+        return SQLiteCacheStore(CACHE_DB_PATH)
+    if CACHE_BACKEND == "redis":
+        if redis is None:
+            logger.warning("CACHE_BACKEND=redis but the redis package is not installed; using memory only")
+            return None
+        return RedisCacheStore(REDIS_URL)
+    return None
+
+CACHE_STORE = create_cache_store()
+
+class ResultCache:
+    """Bounded LRU cache with per-entry TTL and size accounting
+    
+    Entries are evicted least-recently-used first once either the entry
+    count or the total serialized size goes over its limit. Expired entries
+    are kept for a further `stale_ttl` seconds, during which only
+    get_stale() returns them, then dropped on access and by purge_expired().
+    
+    With a persistent store configured, aget()/aset() read through and
+    write through to it, so workers share results and survive restarts.
+    get()/set() only ever touch memory.
+    """
+    
+    def __init__(self, name: str, max_entries: int, max_bytes: int, ttl: float, store: Optional[CacheStore] = None,
+                 stale_ttl: float = 0):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.store = store
+        self.stale_ttl = stale_ttl
+        self.bytes = 0
+        self.hits = 0
+        self.store_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __contains__(self, key: str) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry['expires'] > time.time()
+    
+    def _lookup(self, key: str, allow_stale: bool = False) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        
+        now = time.time()
+        if entry['expires'] <= now:
+            if entry['expires'] + self.stale_ttl <= now:
+                self._remove(key)
+                self.expirations += 1
+                return None
+            if not allow_stale:
+                return None
+        
+        self._entries.move_to_end(key)
+        return entry['data']
+    
+    def get_stale(self, key: str) -> Optional[Any]:
+        """Return an expired value that is still within its stale window, or None"""
+        entry = self._entries.get(key)
+        if entry is None or entry['expires'] > time.time():
+            return None
+        value = self._lookup(key, allow_stale=True)
+        if value is not None:
+            self.stale_hits += 1
+        return value
+    
+    def expires_at(self, key: str) -> Optional[float]:
+        """When the entry for key goes stale, or None if nothing usable is cached"""
+        entry = self._entries.get(key)
+        if entry is None or entry['expires'] + self.stale_ttl <= time.time():
+            return None
+        return entry['expires']
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Return a cached value and mark it recently used, or None on a miss"""
+        value = self._lookup(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+    
+    @timed("cache_lookup")
+    async def aget(self, key: str) -> Optional[Any]:
+        """Like get(), falling back to the persistent store on a memory miss"""
+        value = self._lookup(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        
+        if self.store is not None:
+            loop = asyncio.get_event_loop()
+            try:
+                entry = await loop.run_in_executor(None, self.store.get, self.name, key)
+            except Exception as e:
+                logger.warning(f"Error reading {self.name} cache store: {str(e)}")
+                entry = None
+            if entry is not None:
+                value, expires = entry
+                self.set(key, value, expires - time.time())
+                self.store_hits += 1
+                return value
+        
+        self.misses += 1
+        return None
+    
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting least-recently-used entries to stay within limits"""
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            logger.warning(f"Not caching {self.name} entry of {size} bytes (limit {self.max_bytes})")
+            return
+        
+        if key in self._entries:
+            self._remove(key)
+        
+        now = time.time()
+        self._entries[key] = {
+            'data': value,
+            'timestamp': now,
+            'expires': now + (ttl if ttl is not None else self.ttl),
+            'size': size
+        }
+        self.bytes += size
+        
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+    
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Like set(), also writing the value through to the persistent store"""
+        self.set(key, value, ttl)
+        
+        if self.store is not None:
+            expires = time.time() + (ttl if ttl is not None else self.ttl)
+            loop = asyncio.get_event_loop()
+            try:
+                await loop.run_in_executor(None, self.store.set, self.name, key, value, expires)
+            except Exception as e:
+                logger.warning(f"Error writing {self.name} cache store: {str(e)}")
+    
+    def warm(self) -> int:
+        """Load the freshest unexpired entries from the persistent store into memory"""
+        if self.store is None:
+            return 0
+        
+        entries = self.store.load(self.name, self.max_entries)
+        now = time.time()
+        # Oldest first, so the freshest entries end up most recently used
+        for key, value, expires in reversed(entries):
+            self.set(key, value, expires - now)
+        return len(entries)
+    
+    def purge_expired(self) -> int:
+        """Drop every expired entry and return how many were removed"""
+        now = time.time()
+        expired_keys = [key for key, entry in self._entries.items() if entry['expires'] + self.stale_ttl <= now]
+        for key in expired_keys:
+            self._remove(key)
+        self.expirations += len(expired_keys)
+        return len(expired_keys)
+    
+    def stats(self) -> Dict:
+        lookups = self.hits + self.store_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "store_hits": self.store_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.store_hits) / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+    
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self.bytes -= entry['size']
+
+class SingleFlight:
+    """Share one in-flight computation between concurrent callers with the same key
+    
+    The first caller starts the work as a task; callers arriving while it
+    runs await the same task instead of repeating it.
+    """
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.started = 0
+        self.coalesced = 0
+        self._calls: Dict[str, asyncio.Future] = {}
+    
+    async def do(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+            self.started += 1
+        else:
+            self.coalesced += 1
+        
+        # Shield so one caller going away does not cancel the work the others are waiting on
+        return await asyncio.shield(task)
+    
+    def stats(self) -> Dict:
+        return {"in_flight": len(self._calls), "started": self.started, "coalesced": self.coalesced}
+
+class StreamFlight:
+    """Share one in-flight stream between concurrent readers with the same key
+    
+    The first reader starts the producer as a task; every reader, including
+    ones arriving late, gets all of its parts from the first one on. Like
+    SingleFlight, the producer keeps going if its readers go away, so it
+    can finish and cache its result.
+    """
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.started = 0
+        self.coalesced = 0
+        self._streams: Dict[str, Dict] = {}
+    
+    async def _produce(self, key: str, stream: Dict, produce: Callable[[], AsyncIterator[Any]]):
+        try:
+            async for part in produce():
+                stream["parts"].append(part)
+                self._wake(stream)
+        finally:
+            stream["done"] = True
+            self._wake(stream)
+            self._streams.pop(key, None)
+    
+    @staticmethod
+    def _wake(stream: Dict):
+        stream["changed"].set()
+        stream["changed"] = asyncio.Event()
+    
+    async def do(self, key: str, produce: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        stream = self._streams.get(key)
+        if stream is None:
+            stream = self._streams[key] = {"parts": [], "done": False, "changed": asyncio.Event()}
+            stream["task"] = asyncio.ensure_future(self._produce(key, stream, produce))
+            self.started += 1
+        else:
+            self.coalesced += 1
+        
+        position = 0
+        while True:
+            while position < len(stream["parts"]):
+                yield stream["parts"][position]
+                position += 1
+            if stream["done"]:
+                break
+            await stream["changed"].wait()
+        # Surface a producer failure to every reader
+        if stream["task"].done() and not stream["task"].cancelled():
+            stream["task"].result()
+    
+    def stats(self) -> Dict:
+        return {"in_flight": len(self._streams), "started": self.started, "coalesced": self.coalesced}
+
+RESEARCH_FLIGHTS = SingleFlight("research")
+SOURCE_FLIGHTS = SingleFlight("sources")
+SUMMARY_FLIGHTS = StreamFlight("summary_stream")
+
 # Cache for storing results temporarily
-CACHE = {}
-CACHE_EXPIRY = 3600  # 1 hour
+CACHE = ResultCache("research", MAX_CACHE_SIZE, CACHE_MAX_BYTES, CACHE_EXPIRY, CACHE_STORE, stale_ttl=STALE_TTL)
+
+# Source data is shared by every role researched for a company, so it is
+# cached per company; only the AI summary depends on the role
+COMPANY_INFO_CACHE = ResultCache("company_info", SOURCE_CACHE_SIZE, CACHE_MAX_BYTES, COMPANY_INFO_CACHE_EXPIRY, CACHE_STORE)
+NEWS_CACHE = ResultCache("news", SOURCE_CACHE_SIZE, CACHE_MAX_BYTES, NEWS_CACHE_EXPIRY, CACHE_STORE)
+REVIEWS_CACHE = ResultCache("reviews", SOURCE_CACHE_SIZE, CACHE_MAX_BYTES, COMPANY_INFO_CACHE_EXPIRY, CACHE_STORE)
+SUMMARY_CACHE = ResultCache("summary", MAX_CACHE_SIZE, CACHE_MAX_BYTES, CACHE_EXPIRY, CACHE_STORE)
+# Rendered prompt context is cheap to rebuild, so it is kept in memory only
+CONTEXT_CACHE = ResultCache("prompt_context", SOURCE_CACHE_SIZE, CACHE_MAX_BYTES, CACHE_EXPIRY)
+
+CACHE_TIERS = {cache.name: cache for cache in (CACHE, COMPANY_INFO_CACHE, NEWS_CACHE, REVIEWS_CACHE, SUMMARY_CACHE, CONTEXT_CACHE)}
+
+def encode_json(value: Any) -> bytes:
+    """Compact UTF-8 JSON: orjson when available, else the json module"""
+    if orjson is not None:
+        return orjson.dumps(value, default=str)
+    return json.dumps(value, default=str, separators=(",", ":"), ensure_ascii=False).encode()
+
+# Fields of a research response that differ between requests served from the same cache entry
+RESEARCH_REQUEST_FIELDS = ("job_role", "processing_time", "stage_timings")
+# Fixed gzip member header: deflate, no flags, no mtime, unknown OS
+GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+
+class EncodedResult:
+    """
+    A cached research result serialized once and sent as bytes on every hit
+    
+    The JSON body is kept without its per-request fields and closing brace;
+    a response appends those fields to it. The gzip variant is the same
+    prefix deflated once and sync-flushed, so a compressed response is that
+    prefix, the per-request fields as one stored (uncompressed) final block
+    and the gzip trailer, with its CRC continued from the prefix's.
+    """
+    __slots__ = ("source", "prefix", "digest", "gzip_prefix", "crc")
+    
+    def __init__(self, source: Dict):
+        self.source = source
+        body = encode_json({key: value for key, value in source.items() if key not in RESEARCH_REQUEST_FIELDS})
+        self.prefix = body[:-1]
+        self.digest = hashlib.md5(self.prefix).digest()
+        self.gzip_prefix = None
+        self.crc = zlib.crc32(self.prefix)
+        if RESPONSE_GZIP_MIN_BYTES and len(self.prefix) >= RESPONSE_GZIP_MIN_BYTES:
+            compressor = zlib.compressobj(RESPONSE_GZIP_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+            self.gzip_prefix = GZIP_HEADER + compressor.compress(self.prefix) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    
+    def etag(self, job_role: Optional[str]) -> str:
+        """Weak validator for the cached content as answered for a role; processing_time is not covered"""
+        return f'W/"{hashlib.md5(self.digest + (job_role or "").encode()).hexdigest()}"'
+    
+    def body(self, fields: Dict) -> bytes:
+        # '{"job_role":...}' becomes ',"job_role":...}', closing the prefix's object
+        return self.prefix + b"," + encode_json(fields)[1:]
+    
+    def gzip_body(self, fields: Dict) -> Optional[bytes]:
+        """The body gzip-compressed, or None when this result is too small to be worth it"""
+        if self.gzip_prefix is None:
+            return None
+        suffix = b"," + encode_json(fields)[1:]
+        if len(suffix) > 0xFFFF:
+            # Larger than one stored block can hold
+            return None
+        return b"".join((
+            self.gzip_prefix,
+            b"\x01",  # final block, stored; the sync flush left the stream byte-aligned
+            struct.pack("<HH", len(suffix), len(suffix) ^ 0xFFFF),
+            suffix,
+            struct.pack("<II", zlib.crc32(suffix, self.crc), (len(self.prefix) + len(suffix)) & 0xFFFFFFFF),
+        ))
+
+class EncodedResultCache:
+    """
+    Encoded forms of the research results currently cached, by cache key
+    
+    An encoding is only reused while the research cache still holds the
+    exact result it was built from, so a refreshed or reloaded entry is
+    re-encoded on its next hit.
+    """
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.encodes = 0
+        self._entries: "OrderedDict[str, EncodedResult]" = OrderedDict()
+    
+    def get(self, key: str, result: Dict) -> EncodedResult:
+        encoded = self._entries.get(key)
+        if encoded is not None and encoded.source is result:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return encoded
+        
+        encoded = EncodedResult(result)
+        self.encodes += 1
+        self._entries[key] = encoded
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return encoded
+    
+    def stats(self) -> Dict:
+        return {"entries": len(self._entries), "hits": self.hits, "encodes": self.encodes}
+
+ENCODED_RESULTS = EncodedResultCache(MAX_CACHE_SIZE)
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return any(
+        (candidate[2:] if candidate.startswith("W/") else candidate) == opaque
+        for candidate in (candidate.strip() for candidate in if_none_match.split(","))
+    )
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows gzip; an explicit gzip entry takes precedence over *"""
+    allowed = {}
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.strip().partition(";")
+        name = name.strip().lower()
+        if name in ("gzip", "*") and name not in allowed:
+            allowed[name] = params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return allowed.get("gzip", allowed.get("*", False))
+
+def encoded_response(encoded: EncodedResult, fields: Dict, request: Optional[Request], cache_status: str) -> Response:
+    """Send a pre-encoded research result, gzipped when the client accepts it"""
+    headers = {"ETag": encoded.etag(fields["job_role"]), "X-Cache": cache_status, "Vary": "Accept-Encoding"}
+    # Conditional requests are only answered with 304 for safe methods
+    if request is not None and request.method in ("GET", "HEAD") and etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    if request is not None and accepts_gzip(request.headers.get("accept-encoding", "")):
+        body = encoded.gzip_body(fields)
+        if body is not None:
+            return Response(content=body, media_type="application/json", headers={**headers, "Content-Encoding": "gzip"})
+    return Response(content=encoded.body(fields), media_type="application/json", headers=headers)
 
 class CompanyRequest(BaseModel):
     company_name: str
     job_role: Optional[str] = None
+    include_timings: bool = False
+
+class BatchResearchRequest(BaseModel):
+    items: List[CompanyRequest]
 
 class CompanyResponse(BaseModel):
     company_name: str
@@ -72,15 +955,53 @@ class CompanyResponse(BaseModel):
     ai_summary: str
     processing_time: float
     status: str
+    stage_timings: Optional[Dict[str, float]] = None
 
 def get_cache_key(company_name: str, job_role: Optional[str] = None) -> str:
     """Generate cache key for company data"""
-    key_string = f"{company_name.lower().strip()}:{job_role or ''}"
+    key_string = f"{canonical_company_name(company_name).lower()}:{(normalize_job_role(job_role) or '').lower()}"
     return hashlib.md5(key_string.encode()).hexdigest()
 
-def is_cache_valid(cache_entry: Dict) -> bool:
-    """Check if cache entry is still valid"""
-    return time.time() - cache_entry.get('timestamp', 0) < CACHE_EXPIRY
+def get_company_key(company_name: str) -> str:
+    """Cache key for per-company source data, shared across job roles"""
+    return normalize_company_name(canonical_company_name(company_name)).lower()
+
+def get_source_hash(company_data: Dict) -> str:
+    """Hash of the source data a summary or prompt is built from"""
+    source_data = json.dumps(
+        [company_data.get("company_info"), company_data.get("news"), company_data.get("reviews")],
+        sort_keys=True, default=str
+    )
+    return hashlib.md5(source_data.encode()).hexdigest()
+
+def get_summary_key(company_data: Dict, job_role: Optional[str] = None) -> str:
+    """Cache key for an AI summary: company, role and a hash of the source data it was built from"""
+    role_key = (normalize_job_role(job_role) or '').lower()
+    return f"{get_company_key(company_data.get('company_name', ''))}:{role_key}:{get_source_hash(company_data)}"
+
+def get_context_key(company_data: Dict) -> str:
+    """Cache key for a rendered prompt context, shared by every role researched for the company"""
+    return f"{get_company_key(company_data.get('company_name', ''))}:{get_source_hash(company_data)}"
+
+async def get_cached(cache: ResultCache, key: str, fetch: Callable[[], Awaitable[Any]],
+                     should_cache: Callable[[Any], bool] = lambda value: True) -> Any:
+    """Return a cached value or fetch it, caching the result when should_cache allows"""
+    value = await cache.aget(key)
+    if value is not None:
+        return value
+    
+    async def fetch_and_store():
+        value = await fetch()
+        if should_cache(value):
+            await cache.aset(key, value)
+        return value
+    
+    # Concurrent misses for the same key share one upstream fetch
+    return await SOURCE_FLIGHTS.do(f"{cache.name}:{key}", fetch_and_store)
+
+def is_successful(source_result: Dict) -> bool:
+    """Only cache real source data, never fallbacks"""
+    return source_result.get("status") == "success"
 
 @lru_cache(maxsize=100)
 def normalize_company_name(company_name: str) -> str:
@@ -96,322 +1017,1490 @@ def normalize_company_name(company_name: str) -> str:
     
     return name.strip()
 
-async def make_async_request(session: aiohttp.ClientSession, url: str, headers: dict = None, timeout: int = 15) -> dict:
-    """Make async HTTP request with error handling"""
-    headers = headers or {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    
-    try:
-        async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
-            if response.status == 200:
-                content = await response.text()
-                return {"status": "success", "content": content, "url": url}
-            else:
-                return {"status": "error", "error": f"HTTP {response.status}", "url": url}
-    except asyncio.TimeoutError:
-        return {"status": "error", "error": "Request timeout", "url": url}
-    except Exception as e:
-        return {"status": "error", "error": str(e), "url": url}
+# Legal suffixes and filler words dropped from company names before index lookups
+COMPANY_LEGAL_SUFFIXES = {
+    "inc", "incorporated", "llc", "ltd", "limited", "corp", "corporation", "co", "company", "plc", "ag",
+    "gmbh", "sa", "nv", "se", "lp", "llp", "pbc", "&", "and",
+}
 
-async def scrape_company_info_async(company_name: str) -> Dict:
-    """Async company info scraping with multiple fallbacks"""
-    normalized_name = normalize_company_name(company_name)
-    
-    # Try multiple Wikipedia variations
-    wiki_variations = [
-        f"https://en.wikipedia.org/wiki/{quote_plus(company_name)}",
-        f"https://en.wikipedia.org/wiki/{quote_plus(normalized_name)}",
-        f"https://en.wikipedia.org/wiki/{quote_plus(company_name.replace(' ', '_'))}",
-        f"https://en.wikipedia.org/wiki/{quote_plus(normalized_name.replace(' ', '_'))}"
-    ]
-    
-    async with aiohttp.ClientSession() as session:
-        for wiki_url in wiki_variations:
-            try:
-                result = await make_async_request(session, wiki_url)
-                
-                if result["status"] == "success":
-                    soup = BeautifulSoup(result["content"], 'html.parser')
-                    
-                    # Check if this is actually about the company (not a disambiguation page)
-                    if soup.select_one('.disambiguation') or 'may refer to:' in result["content"].lower():
-                        continue
-                    
-                    # Get the first paragraph
-                    first_paragraph = soup.select_one(".mw-parser-output p:not(.mw-empty-elt)")
-                    summary = first_paragraph.get_text().strip() if first_paragraph else ""
-                    
-                    # Skip if summary is too short (likely not the right page)
-                    if len(summary) < 100:
-                        continue
-                    
-                    # Get infobox details
-                    infobox = soup.select_one(".infobox")
-                    details = {}
-                    if infobox:
-                        rows = infobox.select("tr")
-                        for row in rows:
-                            header = row.select_one("th")
-                            data = row.select_one("td")
-                            if header and data:
-                                key = header.get_text().strip()
-                                value = data.get_text().strip()
-                                if key and value and len(value) < 200:  # Avoid overly long entries
-                                    details[key] = value
-                    
-                    # Get additional sections
-                    history_section = soup.find('span', {'id': 'History'})
-                    business_section = soup.find('span', {'id': 'Business'}) or soup.find('span', {'id': 'Operations'})
-                    
-                    additional_info = {}
-                    if history_section:
-                        history_para = history_section.find_parent().find_next_sibling('p')
-                        if history_para:
-                            additional_info['History'] = history_para.get_text().strip()[:500]
-                    
-                    if business_section:
-                        business_para = business_section.find_parent().find_next_sibling('p')
-                        if business_para:
-                            additional_info['Business'] = business_para.get_text().strip()[:500]
-                    
-                    return {
-                        "summary": summary,
-                        "details": details,
-                        "additional_info": additional_info,
-                        "source": wiki_url,
-                        "status": "success"
-                    }
-                    
-            except Exception as e:
-                logger.warning(f"Error scraping {wiki_url}: {str(e)}")
-                continue
-    
-    # Fallback response
-    return {
-        "summary": f"Information about {company_name} is being researched. This company appears to be a legitimate business entity.",
-        "details": {"Name": company_name, "Type": "Company"},
-        "additional_info": {},
-        "source": None,
-        "status": "limited"
-    }
+def company_index_key(company_name: str) -> str:
+    """Lookup key for a company name: ASCII, lowercase, punctuation and legal suffixes removed"""
+    name = unicodedata.normalize("NFKD", company_name).encode("ascii", "ignore").decode().lower()
+    name = re.sub(r"['.]", "", name)
+    words = re.sub(r"[^a-z0-9&+]+", " ", name).split()
+    if words and words[0] == "the" and len(words) > 1:
+        words = words[1:]
+    while len(words) > 1 and words[-1] in COMPANY_LEGAL_SUFFIXES:
+        words.pop()
+    return " ".join(words)
 
-async def get_recent_news_async(company_name: str) -> Dict:
-    """Async news fetching with better error handling"""
-    try:
-        api_key = os.getenv("NEWS_API_KEY")
-        if not api_key:
-            return {
-                "status": "warning", 
-                "message": "News API key not configured", 
-                "articles": await get_mock_news_async(company_name)
-            }
-        
-        # Try multiple search variations
-        search_terms = [
-            company_name,
-            normalize_company_name(company_name),
-            f'"{company_name}"'  # Exact phrase search
-        ]
-        
-        async with aiohttp.ClientSession() as session:
-            for term in search_terms:
-                url = f"https://newsapi.org/v2/everything?q={quote_plus(term)}&sortBy=publishedAt&pageSize=10&apiKey={api_key}"
-                
-                try:
-                    async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            
-                            if data.get("status") == "ok" and data.get("articles"):
-                                # Filter and clean articles
-                                articles = []
-                                for article in data.get("articles", [])[:5]:
-                                    if article.get("title") and article.get("description"):
-                                        # Check if article is actually about the company
-                                        title_lower = article["title"].lower()
-                                        desc_lower = article["description"].lower()
-                                        company_lower = company_name.lower()
-                                        
-                                        if (company_lower in title_lower or 
-                                            company_lower in desc_lower or
-                                            normalize_company_name(company_name).lower() in title_lower):
-                                            
-                                            articles.append({
-                                                "title": article["title"],
-                                                "description": article["description"],
-                                                "publishedAt": article.get("publishedAt", "")[:10],
-                                                "url": article.get("url", "#"),
-                                                "source": article.get("source", {}).get("name", "Unknown")
-                                            })
-                                
-                                if articles:
-                                    return {"status": "success", "articles": articles}
-                                    
-                except Exception as e:
-                    logger.warning(f"Error fetching news for {term}: {str(e)}")
+def build_company_index(data_path: str = COMPANY_DATA_PATH, index_path: str = COMPANY_INDEX_PATH) -> int:
+    """Write the sorted key -> company index for the companies CSV, returning the number of keys
+    
+    Each company is indexed under its name, aliases and ticker, and each key
+    records which of those it came from. Rows are in popularity order, so
+    when two companies claim the same key the earlier one keeps it, except
+    that a name or alias always wins over another company's ticker.
+    """
+    entries = {}
+    with open(data_path, newline="", encoding="utf-8") as f:
+        for rank, row in enumerate(csv.DictReader(f)):
+            name = row["name"].strip()
+            spellings = [(spelling, "name") for spelling in [name, row["wikipedia_title"]] + row["aliases"].split("|")]
+            # Single-letter tickers (F, T, V) are too ambiguous to resolve on their own
+            if len(row["ticker"].strip()) > 1:
+                spellings.append((row["ticker"], "ticker"))
+            for spelling, via in spellings:
+                key = company_index_key(spelling)
+                if not key:
                     continue
-        
-        # Fallback to mock data
-        return {
-            "status": "warning", 
-            "message": "Using sample news data due to API limitations", 
-            "articles": await get_mock_news_async(company_name)
-        }
-        
-    except Exception as e:
-        logger.error(f"Error in get_recent_news_async: {str(e)}")
-        return {
-            "status": "error", 
-            "message": str(e), 
-            "articles": await get_mock_news_async(company_name)
-        }
+                if key in entries and entries[key][0] == name:
+                    continue
+                if key in entries and not (entries[key][4] == "ticker" and via == "name"):
+                    logger.warning(f"Company index key '{key}' claimed by {entries[key][0]} and {name}, keeping {entries[key][0]}")
+                    continue
+                entries[key] = (name, row["wikipedia_title"].strip() or name, row["ticker"].strip(), str(rank), via)
+    
+    # Keys are compared as bytes when searching, so sort them the same way
+    lines = sorted("\t".join((key,) + entry).encode() + b"\n" for key, entry in entries.items())
+    tmp_path = f"{index_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.writelines(lines)
+    os.replace(tmp_path, index_path)
+    return len(lines)
 
-async def get_mock_news_async(company_name: str) -> List[Dict]:
-    """Generate realistic mock news data"""
-    normalized_name = normalize_company_name(company_name)
+class CompanyIndex:
+    """
+    Memory-mapped, sorted company name index
     
-    news_templates = [
-        {
-            "title": f"{normalized_name} Reports Strong Quarterly Performance",
-            "description": f"{normalized_name} exceeded market expectations with robust financial results, showing strong growth across key business segments.",
-            "days_ago": 5
-        },
-        {
-            "title": f"{normalized_name} Announces Strategic Partnership Initiative",
-            "description": f"{normalized_name} has formed new strategic alliances to expand market reach and enhance service offerings.",
-            "days_ago": 12
-        },
-        {
-            "title": f"{normalized_name} Invests in Digital Transformation",
-            "description": f"{normalized_name} is accelerating digital initiatives to improve customer experience and operational efficiency.",
-            "days_ago": 18
-        },
-        {
-            "title": f"{normalized_name} Commits to Sustainability Goals",
-            "description": f"{normalized_name} announced comprehensive environmental initiatives targeting carbon neutrality and sustainable practices.",
-            "days_ago": 25
-        },
-        {
-            "title": f"{normalized_name} Expands Workforce with New Hiring Initiative",
-            "description": f"{normalized_name} plans to hire hundreds of new employees across multiple departments to support growth.",
-            "days_ago": 30
-        }
-    ]
+    One line per lookup key (key, canonical name, Wikipedia title, ticker,
+    rank, and whether the key is a "name" or a "ticker"), sorted by key. Lookups binary search the mapped file directly, so
+    nothing is parsed at startup and the pages are shared between workers.
+    """
     
-    articles = []
-    for template in random.sample(news_templates, min(3, len(news_templates))):
-        publish_date = time.strftime("%Y-%m-%d", time.gmtime(time.time() - template["days_ago"] * 24 * 3600))
-        articles.append({
-            "title": template["title"],
-            "description": template["description"],
-            "publishedAt": publish_date,
-            "url": "#",
-            "source": random.choice(["Business Wire", "PR Newswire", "Market Watch", "Industry News"])
-        })
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else None
     
-    return articles
-
-async def get_employee_reviews_async(company_name: str) -> List[Dict]:
-    """Generate realistic employee reviews with variety"""
-    normalized_name = normalize_company_name(company_name)
+    def _line_at(self, start: int) -> Tuple[bytes, int]:
+        """The line starting at an offset and the offset just past it"""
+        end = self.mm.find(b"\n", start)
+        if end == -1:
+            end = len(self.mm)
+        return self.mm[start:end], end + 1
     
-    review_templates = [
-        {
-            "rating": random.uniform(4.0, 4.8),
-            "title": "Excellent work environment and growth opportunities",
-            "pros": f"Working at {normalized_name} has been incredibly rewarding. The company culture promotes innovation and collaboration. Great benefits package and work-life balance. Management is supportive and provides clear growth paths.",
-            "cons": "Sometimes the pace can be fast during busy periods. Remote work policies could be more flexible in some departments.",
-            "role": "Senior Software Engineer"
-        },
-        {
-            "rating": random.uniform(3.5, 4.2),
-            "title": "Good company with room for improvement",
-            "pros": f"{normalized_name} offers competitive compensation and has a diverse, talented workforce. The projects are challenging and meaningful. Good learning opportunities through training programs.",
-            "cons": "Communication between teams could be better. Some processes feel outdated and could benefit from modernization. Career advancement can be slow in certain areas.",
-            "role": "Product Manager"
-        },
-        {
-            "rating": random.uniform(3.8, 4.5),
-            "title": "Strong leadership and innovative culture",
-            "pros": f"The leadership team at {normalized_name} has a clear vision and communicates it well. Employees are encouraged to think creatively and take ownership of their work. Excellent mentorship programs.",
-            "cons": "Workload can be heavy during project deadlines. Office space could be improved in some locations. Limited remote work options pre-pandemic.",
-            "role": "Marketing Specialist"
-        },
-        {
-            "rating": random.uniform(4.2, 4.7),
-            "title": "Great place to build your career",
-            "pros": f"{normalized_name} invests heavily in employee development. The company promotes from within and offers excellent training programs. Collaborative environment with smart colleagues.",
-            "cons": "Benefits package, while good, could be more comprehensive. Some legacy systems slow down productivity. Meeting schedules can be overwhelming.",
-            "role": "Business Analyst"
-        },
-        {
-            "rating": random.uniform(3.2, 3.9),
-            "title": "Decent workplace with typical challenges",
-            "pros": f"Stable employment with {normalized_name}. Reasonable work-life balance in most departments. Good opportunity to work on large-scale projects with impact.",
-            "cons": "Limited flexibility in work arrangements. Some management layers create communication barriers. Salary increases could be more competitive with market rates.",
-            "role": "Operations Manager"
-        }
-    ]
+    def _lower_bound(self, key: bytes) -> int:
+        """Offset of the first line whose key is >= key"""
+        lo, hi = 0, len(self.mm)
+        while lo < hi:
+            # Realign the midpoint to the start of the line containing it
+            start = max(lo, self.mm.rfind(b"\n", lo, (lo + hi) // 2) + 1)
+            line, next_start = self._line_at(start)
+            if line.split(b"\t", 1)[0] < key:
+                lo = next_start
+            else:
+                hi = start
+        return lo
     
-    # Select 3-4 random reviews
-    selected_reviews = random.sample(review_templates, random.randint(3, 4))
+    @staticmethod
+    def _entry(line: bytes) -> Dict:
+        _, name, wiki_title, ticker, rank, via = line.decode().split("\t")
+        return {"name": name, "wiki_title": wiki_title, "ticker": ticker or None, "rank": int(rank), "via": via}
     
-    for review in selected_reviews:
-        review["rating"] = round(review["rating"], 1)
-        review["date"] = time.strftime("%Y-%m-%d", time.gmtime(time.time() - random.randint(30, 365) * 24 * 3600))
+    def lookup(self, key: str) -> Optional[Dict]:
+        """The company indexed under exactly this key"""
+        if self.mm is None or not key:
+            return None
+        target = key.encode()
+        start = self._lower_bound(target)
+        if start >= len(self.mm):
+            return None
+        line, _ = self._line_at(start)
+        return self._entry(line) if line.split(b"\t", 1)[0] == target else None
     
-    return selected_reviews
-
-async def generate_company_summary_async(company_data: Dict, job_role: Optional[str] = None) -> str:
-    """Generate AI summary with better prompting and error handling"""
-    company_name = company_data.get("company_name", "")
-    company_info = company_data.get("company_info", {})
-    news = company_data.get("news", {})
-    reviews = company_data.get("reviews", [])
+    def suggest(self, prefix: str, limit: int = 8, scan_limit: int = 200) -> List[Dict]:
+        """Distinct companies with a name, alias or ticker starting with prefix, most popular first"""
+        if self.mm is None or not prefix:
+            return []
+        target = prefix.encode()
+        position = self._lower_bound(target)
+        matches = {}
+        for _ in range(scan_limit):
+            if position >= len(self.mm):
+                break
+            line, position = self._line_at(position)
+            if not line.startswith(target):
+                break
+            entry = self._entry(line)
+            matches.setdefault(entry["name"], entry)
+        # Companies whose own name matches come before those matched through an alias or ticker
+        return sorted(
+            matches.values(),
+            key=lambda entry: (not company_index_key(entry["name"]).startswith(prefix), entry["rank"])
+        )[:limit]
     
-    # Build comprehensive context
-    context_parts = [f"Company: {company_name}"]
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+
+_company_index: Optional[CompanyIndex] = None
+
+# Tab-separated fields per index line, so an index in an older layout is rebuilt
+COMPANY_INDEX_FIELDS = 6
+
+def company_index_outdated() -> bool:
+    """Whether the index file is missing, older than the companies CSV, or in an older layout"""
+    if not os.path.exists(COMPANY_INDEX_PATH) or os.path.getmtime(COMPANY_INDEX_PATH) < os.path.getmtime(COMPANY_DATA_PATH):
+        return True
+    with open(COMPANY_INDEX_PATH, "rb") as f:
+        first_line = f.readline()
+    return bool(first_line) and first_line.count(b"\t") != COMPANY_INDEX_FIELDS - 1
+
+def get_company_index() -> Optional[CompanyIndex]:
+    """Open the company index, (re)building it first when the companies CSV is newer"""
+    global _company_index
+    if _company_index is None:
+        try:
+            if os.path.exists(COMPANY_DATA_PATH) and company_index_outdated():
+                keys = build_company_index()
+                logger.info(f"Built company index with {keys} keys at {COMPANY_INDEX_PATH}")
+            _company_index = CompanyIndex(COMPANY_INDEX_PATH)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Company index unavailable, names will not be canonicalized: {str(e)}")
+            return None
+    return _company_index
+
+@lru_cache(maxsize=4096)
+def resolve_company(company_name: str) -> Optional[Dict]:
+    """The known company a name, alias or ticker refers to, if any"""
+    index = get_company_index()
+    if index is None:
+        return None
+    company = index.lookup(company_index_key(company_name))
+    # Many tickers are also words ("now", "cost", "shop"), so a ticker only counts when typed as one
+    if company is not None and company["via"] == "ticker" and not company_name.strip().isupper():
+        return None
+    return company
+
+def canonical_company_name(company_name: str) -> str:
+    """Canonical name for a known company, otherwise the name as given"""
+    company = resolve_company(company_name.strip())
+    return company["name"] if company else company_name.strip()
+
+# Snapshot file layout: a fixed header, one encoded record per company, then an index of
+# fixed-size entries sorted by key digest, so lookups binary search the mapped file
+SNAPSHOT_MAGIC = b"KBGSNAP\0"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<8sHcxIdQ")  # magic, version, payload codec, company count, built at, index offset
+SNAPSHOT_INDEX_ENTRY = struct.Struct("<8sQI")  # key digest, record offset, record length
+
+def snapshot_key_digest(company_key: str) -> bytes:
+    return hashlib.blake2b(company_key.encode(), digest_size=8).digest()
+
+def write_snapshot(records: Dict[str, Dict], path: str = SNAPSHOT_PATH, built_at: Optional[float] = None) -> int:
+    """Write company key -> source data records as a snapshot file, returning its size in bytes"""
+    codec = encode_cache_payload(None)[:1]
+    index = []
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * SNAPSHOT_HEADER.size)
+        for company_key, record in records.items():
+            payload = encode_cache_payload({**record, "key": company_key})
+            index.append((snapshot_key_digest(company_key), f.tell(), len(payload)))
+            f.write(payload)
+        index.sort()
+        index_offset = f.tell()
+        for entry in index:
+            f.write(SNAPSHOT_INDEX_ENTRY.pack(*entry))
+        size = f.tell()
+        f.seek(0)
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, codec, len(index),
+                                     built_at or time.time(), index_offset))
+    # Workers that mapped the old file keep reading it until they reopen
+    os.replace(tmp_path, path)
+    return size
+
+class Snapshot:
+    """
+    Memory-mapped snapshot of company info and news, built offline
     
-    if company_info.get("summary"):
-        context_parts.append(f"Company Overview: {company_info['summary'][:1000]}")
+    Only the header is read when it is opened; each lookup binary searches
+    the index in the mapped file and decodes one record, so startup is
+    instant and workers share the pages through the page cache.
+    """
     
-    if company_info.get("details"):
-        details_text = "Key Company Details:\n"
-        for key, value in list(company_info["details"].items())[:8]:  # Limit to avoid token overflow
-            details_text += f"- {key}: {value}\n"
-        context_parts.append(details_text)
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mtime = os.fstat(f.fileno()).st_mtime
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, codec, self.count, self.built_at, self.index_offset = SNAPSHOT_HEADER.unpack_from(self.mm)
+            if magic != SNAPSHOT_MAGIC:
+                raise ValueError(f"{path} is not a snapshot file")
+            if version != SNAPSHOT_VERSION:
+                raise ValueError(f"{path} is snapshot version {version}, this app reads version {SNAPSHOT_VERSION}")
+            if codec == b"m" and msgpack is None:
+                raise ValueError(f"{path} was written with msgpack, which is not installed")
+        except (struct.error, ValueError):
+            self.mm.close()
+            raise
+        self.hits = 0
+        self.misses = 0
     
-    if company_info.get("additional_info"):
-        for section, content in company_info["additional_info"].items():
-            context_parts.append(f"{section}: {content[:300]}")
+    def age(self) -> float:
+        return time.time() - self.built_at
     
-    if news.get("articles"):
-        news_text = "Recent News & Developments:\n"
-        for article in news["articles"][:3]:
-            news_text += f"- {article['title']}: {article['description']}\n"
-        context_parts.append(news_text)
+    def fresh(self) -> bool:
+        """Whether the snapshot may be served ahead of the upstreams"""
+        return SNAPSHOT_MAX_AGE <= 0 or self.age() < SNAPSHOT_MAX_AGE
     
-    if reviews:
-        reviews_text = "Employee Insights:\n"
-        for review in reviews[:3]:
-            reviews_text += f"- {review['role']} (Rating: {review['rating']}/5): {review['title']}\n"
-            reviews_text += f"  Pros: {review['pros'][:200]}...\n"
-            reviews_text += f"  Cons: {review['cons'][:200]}...\n"
-        context_parts.append(reviews_text)
+    def _digest_at(self, position: int) -> bytes:
+        start = self.index_offset + position * SNAPSHOT_INDEX_ENTRY.size
+        return self.mm[start:start + 8]
     
-    context = "\n\n".join(context_parts)
+    def get(self, company_key: str) -> Optional[Dict]:
+        """The record for a company key, or None if the snapshot doesn't have it"""
+        digest = snapshot_key_digest(company_key)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._digest_at(mid) < digest:
+                lo = mid + 1
+            else:
+                hi = mid
+        # Entries sharing a digest are adjacent; the record's own key settles a collision
+        while lo < self.count:
+            entry_digest, offset, length = SNAPSHOT_INDEX_ENTRY.unpack_from(self.mm, self.index_offset + lo * SNAPSHOT_INDEX_ENTRY.size)
+            if entry_digest != digest:
+                break
+            record = decode_cache_payload(self.mm[offset:offset + length])
+            if record["key"] == company_key:
+                self.hits += 1
+                return record
+            lo += 1
+        self.misses += 1
+        return None
     
-    # Create targeted prompt
-    job_context = f"The candidate is preparing for a {job_role} interview at {company_name}." if job_role else f"The candidate is researching {company_name} for a potential job opportunity."
+    def stats(self) -> Dict:
+        return {
+            "path": self.path,
+            "version": SNAPSHOT_VERSION,
+            "companies": self.count,
+            "bytes": len(self.mm),
+            "built_at": self.built_at,
+            "age": round(self.age()),
+            "fresh": self.fresh(),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
     
-    prompt = f"""
-As an expert career advisor, provide a comprehensive company analysis for a job seeker. {job_context}
-
-Based on the following research data:
+    def close(self):
+        self.mm.close()
 
-{context}
+_snapshot: Optional[Snapshot] = None
 
+def get_snapshot() -> Optional[Snapshot]:
+    """The mapped snapshot, reopened when build-snapshot has replaced the file; None without one"""
+    global _snapshot
+    try:
+        mtime = os.path.getmtime(SNAPSHOT_PATH)
+    except OSError:
+        return _snapshot
+    if _snapshot is None or _snapshot.mtime != mtime:
+        try:
+            snapshot = Snapshot(SNAPSHOT_PATH)
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"Snapshot unavailable: {str(e)}")
+            return _snapshot
+        # Lookups are synchronous, so nothing is reading the old mapping while it is swapped out
+        if _snapshot is not None:
+            _snapshot.close()
+        _snapshot = snapshot
+        logger.info(f"Mapped snapshot of {snapshot.count} companies from {SNAPSHOT_PATH}")
+    return _snapshot
+
+def snapshot_source(source: str, company_key: str) -> Optional[Dict]:
+    """One source's data for a company from the snapshot, if it has it"""
+    snapshot = _snapshot
+    record = snapshot.get(company_key) if snapshot is not None else None
+    return record.get(source) if record is not None else None
+
+# Canonical job roles and the spellings they are known by; incoming roles are matched
+# against these so near-identical roles share cached research and summaries
+CANONICAL_ROLES = {
+    "Software Engineer": ["software engineer", "software developer", "software development engineer", "swe", "sde",
+                          "developer", "programmer", "software engineering", "application developer"],
+    "Backend Engineer": ["backend engineer", "backend developer", "back end engineer", "back-end developer",
+                         "server side engineer", "api developer"],
+    "Frontend Engineer": ["frontend engineer", "frontend developer", "front end developer", "front-end engineer",
+                          "ui developer", "ui engineer", "react developer"],
+    "Full Stack Engineer": ["full stack engineer", "full stack developer", "fullstack developer", "full-stack engineer"],
+    "Mobile Engineer": ["mobile engineer", "mobile developer", "ios developer", "ios engineer", "android developer",
+                        "android engineer", "mobile app developer"],
+    "Software Engineering Intern": ["software engineering intern", "software engineer intern", "swe intern",
+                                    "software developer intern", "developer intern"],
+    "Machine Learning Engineer": ["machine learning engineer", "ml engineer", "mle", "ai ml engineer", "ai engineer",
+                                  "deep learning engineer"],
+    "Data Scientist": ["data scientist", "applied data scientist"],
+    "Data Engineer": ["data engineer", "etl developer", "big data engineer", "data platform engineer"],
+    "Data Analyst": ["data analyst", "bi analyst", "business intelligence analyst"],
+    "Research Scientist": ["research scientist", "applied scientist", "ai research scientist"],
+    "DevOps Engineer": ["devops engineer", "devops", "site reliability engineer", "sre", "platform engineer",
+                        "infrastructure engineer"],
+    "QA Engineer": ["qa engineer", "quality assurance engineer", "test engineer", "sdet", "test automation engineer"],
+    "Security Engineer": ["security engineer", "cybersecurity engineer", "application security engineer",
+                          "infosec engineer"],
+    "Solutions Architect": ["solutions architect", "solution architect"],
+    "Engineering Manager": ["engineering manager", "software engineering manager", "software development manager"],
+    "Product Manager": ["product manager", "technical product manager", "group product manager"],
+    "Program Manager": ["program manager", "technical program manager", "tpm"],
+    "Product Designer": ["product designer", "ux designer", "ui designer", "ui ux designer", "interaction designer"],
+    "Sales Representative": ["sales representative", "account executive", "sales rep", "sales development representative",
+                             "business development representative", "sdr", "bdr", "sales associate"],
+    "Sales Engineer": ["sales engineer", "solutions engineer", "pre sales engineer", "technical sales engineer"],
+    "Customer Success Manager": ["customer success manager", "csm"],
+    "Marketing Manager": ["marketing manager", "digital marketing manager", "content marketing manager"],
+    "Financial Analyst": ["financial analyst", "finance analyst", "fp a analyst"],
+    "Accountant": ["accountant", "staff accountant", "cpa"],
+    "Consultant": ["consultant", "management consultant", "business consultant", "strategy consultant"],
+    "Recruiter": ["recruiter", "technical recruiter", "talent acquisition specialist", "talent partner"],
+    "HR Manager": ["hr manager", "human resources manager"],
+    "Operations Manager": ["operations manager", "ops manager", "business operations manager"],
+    "Technical Writer": ["technical writer", "documentation engineer"],
+}
+
+# Word-level rewrites applied before matching: abbreviations are expanded and seniority
+# markers dropped, since they don't change what a candidate needs to know about a company
+ROLE_ABBREVIATIONS = {
+    "swe": "software engineer", "sde": "software development engineer", "eng": "engineer", "engr": "engineer",
+    "dev": "developer", "devs": "developer", "mgr": "manager", "ml": "machine learning", "fe": "frontend",
+    "fullstack": "full stack", "sw": "software",
+}
+ROLE_IGNORED_WORDS = {
+    "senior", "sr", "junior", "jr", "mid", "level", "entry", "new", "grad", "graduate", "associate",
+    "i", "ii", "iii", "iv", "v", "1", "2", "3", "4", "5", "l1", "l2", "l3", "l4", "l5", "l6", "l7",
+    "remote", "hybrid", "contract", "contractor", "fulltime", "parttime", "a", "an", "the",
+}
+# Head nouns that name the same job; any other head noun only matches itself
+ROLE_HEAD_SYNONYMS = {"developer": "engineer", "programmer": "engineer"}
+# Shorter words are not typo-corrected: one letter away, too many of them are other real words
+ROLE_TYPO_MIN_LENGTH = 5
+
+def clean_role(job_role: str) -> str:
+    """Lowercase a role, expand abbreviations and drop seniority markers and punctuation"""
+    words = re.sub(r"[^a-z0-9+#]+", " ", job_role.lower()).split()
+    cleaned = []
+    for word in words:
+        if word in ROLE_IGNORED_WORDS:
+            continue
+        cleaned.extend(ROLE_ABBREVIATIONS.get(word, word).split())
+    return " ".join(cleaned)
+
+def role_ngrams(text: str, n: int = 3) -> Dict[str, int]:
+    """Character n-gram counts of each word, padded so word starts and ends count"""
+    grams: Dict[str, int] = {}
+    for word in text.split():
+        padded = f" {word} "
+        for index in range(max(1, len(padded) - n + 1)):
+            gram = padded[index:index + n]
+            grams[gram] = grams.get(gram, 0) + 1
+    return grams
+
+def one_letter_deletions(word: str) -> List[str]:
+    return [word[:index] + word[index + 1:] for index in range(len(word))]
+
+def adjacent_swaps(word: str) -> List[str]:
+    return [word[:index] + word[index + 1] + word[index] + word[index + 2:] for index in range(len(word) - 1)]
+
+def split_role(text: str) -> Tuple[str, str]:
+    """A cleaned role's head noun (its last word, which says what the job is) and the words qualifying it"""
+    words = text.split()
+    return ROLE_HEAD_SYNONYMS.get(words[-1], words[-1]), " ".join(words[:-1])
+
+class RoleIndex:
+    """
+    TF-IDF vectors of character trigrams for every known role spelling.
+    
+    A role only matches spellings with the same head noun ("engineer",
+    "manager", "intern", ...) and the same number of qualifying words, so
+    an accounting manager never becomes a customer success manager and a
+    data engineering manager never becomes an engineering manager.
+    
+    Words of ROLE_TYPO_MIN_LENGTH letters or more that no known spelling
+    uses are first corrected to the one known word a dropped, extra or
+    swapped letter away ("sofware", "enginer", "manger"). Changed letters
+    are left alone, since they turn real words into others ("produce" into
+    "product"). match() then returns the canonical role whose qualifying
+    words are most similar (cosine) to the query's, with the similarity.
+    Single words rarely reach the default threshold of 0.8 unless they are
+    the same after correction, so the trigram similarity mostly catches
+    small spelling differences across several qualifying words. A head noun
+    that isn't a known one is matched by trigrams as well.
+    """
+    
+    def __init__(self, roles: Dict[str, List[str]]):
+        spellings = [(canonical, split_role(clean_role(alias))) for canonical, aliases in roles.items()
+                     for alias in [canonical] + aliases]
+        self.words = {word for _, (head, qualifier) in spellings for word in [head] + qualifier.split()}
+        # Known words with one letter dropped, to correct a query word missing that letter
+        self.shortened: Dict[str, set] = {}
+        for word in self.words:
+            for shortened in one_letter_deletions(word):
+                self.shortened.setdefault(shortened, set()).add(word)
+        documents = [role_ngrams(text) for _, (head, qualifier) in spellings for text in (head, qualifier)]
+        document_frequency: Dict[str, int] = {}
+        for grams in documents:
+            for gram in grams:
+                document_frequency[gram] = document_frequency.get(gram, 0) + 1
+        self.idf = {gram: math.log((1 + len(documents)) / (1 + count)) + 1 for gram, count in document_frequency.items()}
+        self.exact = {role: canonical for canonical, role in spellings}
+        self.heads = {head: self.vectorize(head) for _, (head, _) in spellings}
+        self.by_head: Dict[str, List[Tuple[str, int, Dict[str, float]]]] = {}
+        for canonical, (head, qualifier) in spellings:
+            if qualifier:
+                self.by_head.setdefault(head, []).append((canonical, len(qualifier.split()), self.vectorize(qualifier)))
+    
+    def vectorize(self, text: str) -> Dict[str, float]:
+        # Trigrams never seen in a known role carry no signal about which role it is
+        vector = {gram: count * self.idf[gram] for gram, count in role_ngrams(text).items() if gram in self.idf}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {gram: weight / norm for gram, weight in vector.items()} if norm else {}
+    
+    @staticmethod
+    def similarity(query: Dict[str, float], vector: Dict[str, float]) -> float:
+        return sum(weight * vector.get(gram, 0.0) for gram, weight in query.items())
+    
+    def correct(self, word: str) -> str:
+        """The known word an unknown word is one dropped, extra or swapped letter away from, if exactly one"""
+        if word in self.words or len(word) < ROLE_TYPO_MIN_LENGTH:
+            return word
+        candidates = set(self.shortened.get(word, ()))
+        candidates.update(fixed for fixed in one_letter_deletions(word) + adjacent_swaps(word) if fixed in self.words)
+        return candidates.pop() if len(candidates) == 1 else word
+    
+    def match(self, text: str, threshold: float = 0.0) -> Tuple[Optional[str], float]:
+        head, qualifier = split_role(" ".join(self.correct(word) for word in text.split()))
+        if (head, qualifier) in self.exact:
+            return self.exact[(head, qualifier)], 1.0
+        
+        score = 1.0
+        if head not in self.heads:
+            query = self.vectorize(head)
+            head, score = max(((known, self.similarity(query, vector)) for known, vector in self.heads.items()),
+                              key=lambda item: item[1], default=(None, 0.0))
+            if score < threshold:
+                return None, score
+            if (head, qualifier) in self.exact:
+                return self.exact[(head, qualifier)], score
+        # A bare head noun ("analyst", "manager") is too vague to pick a role for
+        if not qualifier:
+            return None, 0.0
+        
+        query = self.vectorize(qualifier)
+        words = len(qualifier.split())
+        best, best_score = None, 0.0
+        for canonical, candidate_words, vector in self.by_head.get(head, []):
+            if candidate_words != words:
+                continue
+            candidate_score = score * self.similarity(query, vector)
+            if candidate_score > best_score:
+                best, best_score = canonical, candidate_score
+        return best, best_score
+
+ROLE_INDEX = RoleIndex(CANONICAL_ROLES)
+
+@lru_cache(maxsize=1024)
+def normalize_job_role(job_role: Optional[str]) -> Optional[str]:
+    """Map a free-text job role onto its canonical role, or tidy it up if none is close enough"""
+    if not job_role or not job_role.strip():
+        return None
+    job_role = " ".join(job_role.split())
+    if not ROLE_NORMALIZATION:
+        return job_role
+    
+    cleaned = clean_role(job_role)
+    if not cleaned:
+        return job_role
+    canonical, score = ROLE_INDEX.match(cleaned, ROLE_MATCH_THRESHOLD)
+    if canonical is not None and score >= ROLE_MATCH_THRESHOLD:
+        return canonical
+    return job_role
+
+http_session: Optional[aiohttp.ClientSession] = None
+
+def create_http_session() -> aiohttp.ClientSession:
+    """Create a pooled session with keep-alive, per-host limits and a DNS cache"""
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_MAX_CONNECTIONS,
+        limit_per_host=HTTP_MAX_CONNECTIONS_PER_HOST,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        use_dns_cache=True,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+    )
+    return aiohttp.ClientSession(connector=connector, headers=DEFAULT_HEADERS)
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Return the app-lifetime session, creating it if startup has not run (e.g. scripts)"""
+    global http_session
+    if http_session is None or http_session.closed:
+        http_session = create_http_session()
+    return http_session
+
+async def close_http_session():
+    """Close the shared session and its pooled connections"""
+    global http_session
+    if http_session is not None and not http_session.closed:
+        await http_session.close()
+        # Let the connector finish closing transports before the loop goes away
+        await asyncio.sleep(0.25)
+    http_session = None
+
+class TokenBucket:
+    """Token-bucket rate limiter allowing `rate` calls per second with bursts of up to `burst`"""
+    
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.throttled = 0
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    async def acquire(self):
+        """Wait until a token is available; a rate of 0 disables limiting"""
+        if self.rate <= 0:
+            return
+        
+        self._refill()
+        if self.tokens < 1:
+            self.throttled += 1
+        # Callers woken together re-check, so a burst of waiters drains at `rate`
+        while self.tokens < 1:
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+            self._refill()
+        self.tokens -= 1
+    
+    def stats(self) -> Dict:
+        if self.rate > 0:
+            self._refill()
+        return {"rate": self.rate, "burst": self.burst, "tokens": round(self.tokens, 2), "throttled": self.throttled}
+
+class CircuitOpen(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open"""
+
+class UpstreamQueueFull(Exception):
+    """Raised when too many calls are already waiting for a slot on an upstream"""
+
+class CircuitBreaker:
+    """
+    Stop calling an upstream after `failure_threshold` consecutive failures.
+    
+    The breaker stays open for `reset_timeout` seconds, then goes half-open
+    and lets a single trial call through: its success closes the breaker
+    again, its failure reopens it. Other calls are turned away until the
+    trial reports back, or until another `reset_timeout` passes without it.
+    """
+    
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_started: Optional[float] = None
+        self.times_opened = 0
+        self.rejected = 0
+    
+    def available(self) -> bool:
+        """Whether a call would be let through now, without taking the trial call"""
+        now = time.monotonic()
+        if self.state == "open":
+            return now - self.opened_at >= self.reset_timeout
+        if self.state == "half_open":
+            # A trial call that never reported back (cancelled, say) must not wedge the breaker
+            return self.trial_started is None or now - self.trial_started >= self.reset_timeout
+        return True
+    
+    def allow(self) -> bool:
+        """Let a call through, taking the one trial call when the breaker is not closed"""
+        if not self.available():
+            return False
+        if self.state != "closed":
+            self.state = "half_open"
+            self.trial_started = time.monotonic()
+        return True
+    
+    def record_success(self):
+        self.failures = 0
+        self.state = "closed"
+        self.trial_started = None
+    
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.trial_started = None
+    
+    def stats(self) -> Dict:
+        return {
+            # An open breaker past its timeout is waiting for its trial call
+            "state": "half_open" if self.state == "open" and self.available() else self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
+
+class Upstream:
+    """Concurrency cap, rate limiter and circuit breaker guarding one upstream service"""
+    
+    def __init__(self, name: str, max_concurrency: int, rate: float, burst: int, max_queue: Optional[int] = None):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.limiter = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.waiting = 0
+        self.in_flight = 0
+    
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+    
+    def available(self) -> bool:
+        """Whether a call would currently be let through the circuit breaker"""
+        return self.breaker.available()
+    
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a concurrency slot and a rate-limit token, failing fast while the breaker is open"""
+        if not self.breaker.allow():
+            self.breaker.rejected += 1
+            raise CircuitOpen(f"{self.name} circuit breaker is open")
+        
+        semaphore = self.semaphore
+        # Shed load instead of queueing forever behind a slow upstream
+        if self.max_queue is not None and semaphore.locked() and self.waiting >= self.max_queue:
+            raise UpstreamQueueFull(f"{self.waiting} calls already waiting for {self.name}")
+        
+        self.waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        
+        self.in_flight += 1
+        try:
+            await self.limiter.acquire()
+            yield
+        finally:
+            self.in_flight -= 1
+            semaphore.release()
+    
+    def record(self, success: bool):
+        if success:
+            self.breaker.record_success()
+        else:
+            times_opened = self.breaker.times_opened
+            self.breaker.record_failure()
+            if self.breaker.times_opened > times_opened:
+                logger.warning(f"Circuit breaker for {self.name} is open after {self.breaker.failures} failures")
+    
+    def stats(self) -> Dict:
+        return {
+            "breaker": self.breaker.stats(),
+            "rate_limit": self.limiter.stats(),
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+        }
+
+UPSTREAMS = {
+    "wikipedia": Upstream("wikipedia", WIKI_MAX_CONCURRENCY, WIKI_RATE_LIMIT, WIKI_RATE_BURST),
+    "newsapi": Upstream("newsapi", NEWS_MAX_CONCURRENCY, NEWS_RATE_LIMIT, NEWS_RATE_BURST),
+    "llm": Upstream("llm", LLM_MAX_CONCURRENCY, LLM_RATE_LIMIT, LLM_RATE_BURST, max_queue=LLM_MAX_QUEUE),
+}
+
+def error_reason(error: Exception) -> str:
+    """Metric label for a failed upstream call, from a fixed set so the label stays low-cardinality"""
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None:
+        return f"http_{status_code}"
+    if isinstance(error, (asyncio.TimeoutError, APITimeoutError)):
+        return "timeout"
+    if isinstance(error, (aiohttp.ClientConnectionError, APIConnectionError)):
+        return "connect"
+    return "error"
+
+def is_upstream_failure(result: Dict) -> bool:
+    """Timeouts, connection errors, throttling and 5xx count against the breaker; 404s and the like do not"""
+    if result["status"] == "success":
+        return False
+    status_code = result.get("status_code")
+    return status_code is None or status_code == 429 or status_code >= 500
+
+async def make_async_request(session: Optional[aiohttp.ClientSession], url: str, headers: dict = None, timeout: int = 15,
+                             upstream: Optional[str] = None) -> dict:
+    """Make async HTTP request with error handling"""
+    session = session or get_http_session()
+    
+    if upstream is not None:
+        target = UPSTREAMS[upstream]
+        try:
+            async with target.slot():
+                start = time.perf_counter()
+                result = await make_async_request(session, url, headers, timeout)
+                UPSTREAM_SECONDS.observe(time.perf_counter() - start, upstream=upstream)
+        except CircuitOpen as e:
+            UPSTREAM_ERRORS.inc(upstream=upstream, reason="circuit_open")
+            return {"status": "error", "error": str(e), "url": url}
+        if result["status"] != "success":
+            UPSTREAM_ERRORS.inc(upstream=upstream, reason=result["reason"])
+        target.record(not is_upstream_failure(result))
+        return result
+    
+    try:
+        async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            if response.status == 200:
+                content = await response.text()
+                return {"status": "success", "content": content, "url": url}
+            else:
+                return {"status": "error", "error": f"HTTP {response.status}", "status_code": response.status,
+                        "reason": f"http_{response.status}", "url": url}
+    except asyncio.TimeoutError:
+        return {"status": "error", "error": "Request timeout", "reason": "timeout", "url": url}
+    except Exception as e:
+        return {"status": "error", "error": str(e), "reason": error_reason(e), "url": url}
+
+def is_llm_failure(error: Exception) -> bool:
+    """Errors that say the LLM endpoint is unhealthy, as opposed to a bad request"""
+    status_code = getattr(error, "status_code", None)
+    return status_code is None or status_code == 429 or status_code >= 500
+
+@asynccontextmanager
+async def llm_call():
+    """Hold an LLM slot and report the call's outcome to the LLM circuit breaker"""
+    upstream = UPSTREAMS["llm"]
+    try:
+        async with upstream.slot():
+            with timed_stage("llm"):
+                try:
+                    yield
+                except Exception as e:
+                    # A rejected request still shows the endpoint is up, and settles a half-open trial
+                    upstream.record(not is_llm_failure(e))
+                    UPSTREAM_ERRORS.inc(upstream="llm", reason=error_reason(e))
+                    raise
+            upstream.record(True)
+    except (CircuitOpen, UpstreamQueueFull) as e:
+        UPSTREAM_ERRORS.inc(upstream="llm", reason="circuit_open" if isinstance(e, CircuitOpen) else "queue_full")
+        raise
+
+def record_llm_usage(usage):
+    """Token and cost metrics for one chat completion's reported usage"""
+    LLM_TOKENS.observe(usage.prompt_tokens, direction="prompt")
+    LLM_TOKENS.observe(usage.completion_tokens, direction="completion")
+    LLM_COST.inc(estimate_llm_cost(usage.prompt_tokens), direction="prompt")
+    LLM_COST.inc(estimate_llm_cost(0, usage.completion_tokens), direction="completion")
+
+async def create_chat_completion(messages: List[Dict], **kwargs):
+    """Run a chat completion with bounded concurrency, rate and queue depth"""
+    async with llm_call():
+        response = await client.chat.completions.create(messages=messages, model=LLM_MODEL, **kwargs)
+    if response.usage is not None:
+        record_llm_usage(response.usage)
+    return response
+
+async def stream_chat_completion(messages: List[Dict], **kwargs) -> AsyncIterator[str]:
+    """Stream chat completion text as it is generated, holding an LLM slot until it ends"""
+    async with llm_call():
+        # Usage arrives in a final chunk with no choices (openai>=1.26)
+        stream = await client.chat.completions.create(messages=messages, model=LLM_MODEL, stream=True,
+                                                      stream_options={"include_usage": True}, **kwargs)
+        async for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                record_llm_usage(chunk.usage)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+def wiki_title_urls(company_name: str) -> List[str]:
+    """Distinct Wikipedia URLs to try for a company, most likely first"""
+    normalized_name = normalize_company_name(company_name)
+    company = resolve_company(company_name)
+    
+    # Try multiple Wikipedia variations (often several of them are identical)
+    wiki_variations = [
+        f"{WIKI_BASE_URL}/wiki/{quote_plus(company['wiki_title'].replace(' ', '_'))}" if company else None,
+        f"{WIKI_BASE_URL}/wiki/{quote_plus(company_name)}",
+        f"{WIKI_BASE_URL}/wiki/{quote_plus(normalized_name)}",
+        f"{WIKI_BASE_URL}/wiki/{quote_plus(company_name.replace(' ', '_'))}",
+        f"{WIKI_BASE_URL}/wiki/{quote_plus(normalized_name.replace(' ', '_'))}"
+    ]
+    return list(dict.fromkeys(url for url in wiki_variations if url))
+
+def extract_wiki_bs4(html: str) -> Optional[Dict]:
+    """Extract summary, infobox and key sections with BeautifulSoup (reference extractor)"""
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    # Check if this is actually about the company (not a disambiguation page)
+    if soup.select_one('.disambiguation'):
+        return None
+    
+    # Get the first paragraph
+    first_paragraph = soup.select_one(".mw-parser-output p:not(.mw-empty-elt)")
+    summary = first_paragraph.get_text().strip() if first_paragraph else ""
+    
+    # Get infobox details
+    infobox = soup.select_one(".infobox")
+    details = {}
+    if infobox:
+        rows = infobox.select("tr")
+        for row in rows:
+            header = row.select_one("th")
+            data = row.select_one("td")
+            if header and data:
+                key = header.get_text().strip()
+                value = data.get_text().strip()
+                if key and value and len(value) < 200:  # Avoid overly long entries
+                    details[key] = value
+    
+    # Get additional sections
+    history_section = soup.find('span', {'id': 'History'})
+    business_section = soup.find('span', {'id': 'Business'}) or soup.find('span', {'id': 'Operations'})
+    
+    additional_info = {}
+    if history_section:
+        history_para = history_section.find_parent().find_next_sibling('p')
+        if history_para:
+            additional_info['History'] = history_para.get_text().strip()[:500]
+    
+    if business_section:
+        business_para = business_section.find_parent().find_next_sibling('p')
+        if business_para:
+            additional_info['Business'] = business_para.get_text().strip()[:500]
+    
+    return {"summary": summary, "details": details, "additional_info": additional_info}
+
+def _has_class(name: str) -> str:
+    """XPath predicate matching one class name, like a CSS .class selector"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+def _lxml_text(element) -> str:
+    """Element text matching BeautifulSoup's get_text(): no script, style or comment content"""
+    parts = []
+    
+    def collect(node):
+        if not isinstance(node.tag, str) or node.tag in ('script', 'style', 'template'):
+            return
+        if node.text:
+            parts.append(node.text)
+        for child in node:
+            collect(child)
+            if child.tail:
+                parts.append(child.tail)
+    
+    collect(element)
+    return "".join(parts)
+
+def extract_wiki_lxml(html: str) -> Optional[Dict]:
+    """Extract the same fields as extract_wiki_bs4 using targeted lxml XPath queries"""
+    tree = lxml.html.fromstring(html)
+    
+    if tree.xpath(f"//*[{_has_class('disambiguation')}]"):
+        return None
+    
+    first_paragraph = tree.xpath(f"//*[{_has_class('mw-parser-output')}]//p[not({_has_class('mw-empty-elt')})]")
+    summary = _lxml_text(first_paragraph[0]).strip() if first_paragraph else ""
+    
+    infobox = tree.xpath(f"//*[{_has_class('infobox')}]")
+    details = {}
+    if infobox:
+        for row in infobox[0].iter('tr'):
+            header = next(row.iter('th'), None)
+            data = next(row.iter('td'), None)
+            if header is not None and data is not None:
+                key = _lxml_text(header).strip()
+                value = _lxml_text(data).strip()
+                if key and value and len(value) < 200:  # Avoid overly long entries
+                    details[key] = value
+    
+    def section_paragraph(*section_ids: str) -> Optional[str]:
+        for section_id in section_ids:
+            spans = tree.xpath(f"//span[@id='{section_id}']")
+            if spans:
+                paragraph = next(spans[0].getparent().itersiblings('p'), None)
+                return _lxml_text(paragraph).strip()[:500] if paragraph is not None else None
+        return None
+    
+    additional_info = {}
+    history = section_paragraph('History')
+    if history:
+        additional_info['History'] = history
+    business = section_paragraph('Business', 'Operations')
+    if business:
+        additional_info['Business'] = business
+    
+    return {"summary": summary, "details": details, "additional_info": additional_info}
+
+WIKI_EXTRACTORS = {
+    "bs4": extract_wiki_bs4,
+    "lxml": extract_wiki_lxml,
+}
+
+def extract_wiki_page(html: str, engine: Optional[str] = None) -> Optional[Dict]:
+    """Parse a Wikipedia article with the configured engine; None for disambiguation pages"""
+    if 'may refer to:' in html.lower():
+        return None
+    
+    engine = engine or WIKI_PARSER
+    if engine == "lxml" and lxml is None:
+        engine = "bs4"
+    return WIKI_EXTRACTORS[engine](html)
+
+async def fetch_wiki_page(session: aiohttp.ClientSession, wiki_url: str) -> Optional[Dict]:
+    """Fetch and parse one Wikipedia page, returning None unless it is a usable company article"""
+    try:
+        result = await make_async_request(session, wiki_url, upstream="wikipedia")
+        
+        if result["status"] == "success":
+            # Parsing is CPU-bound, so keep it off the event loop
+            with timed_stage("wiki_parse"):
+                page = await CPU_POOL.run("wiki_parse", extract_wiki_page, result["content"])
+            
+            # Skip disambiguation pages and short summaries (likely not the right page)
+            if page is None or len(page["summary"]) < 100:
+                return None
+            
+            return {
+                **page,
+                "source": wiki_url,
+                "status": "success"
+            }
+            
+    except Exception as e:
+        logger.warning(f"Error scraping {wiki_url}: {str(e)}")
+    
+    return None
+
+async def first_acceptable(candidates: List[Callable[[], Awaitable[Optional[Dict]]]], hedge_delay: float) -> Optional[Dict]:
+    """Race candidate fetches and return the first non-None result
+    
+    Candidates start in order. The next one starts once hedge_delay passes
+    without an answer or as soon as a running attempt comes back empty, so a
+    hit on the first candidate never fans out. A hedge_delay of 0 starts
+    them all at once. Remaining attempts are cancelled when one wins.
+    """
+    remaining = list(candidates)
+    pending = set()
+    try:
+        while remaining or pending:
+            if remaining:
+                pending.add(asyncio.ensure_future(remaining.pop(0)()))
+                if hedge_delay <= 0:
+                    continue
+            
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=hedge_delay if remaining else None,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.result() is not None:
+                    return task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+    
+    return None
+
+class WikiApiError(Exception):
+    """Raised when the MediaWiki API cannot be reached or returns an unusable response"""
+
+WIKI_SECTIONS = {
+    'History': ('History',),
+    'Business': ('Business', 'Operations'),
+}
+
+async def query_wiki_api(session: aiohttp.ClientSession, params: Dict) -> Dict:
+    """Call the MediaWiki action API and return the decoded JSON body"""
+    url = f"{WIKI_BASE_URL}/w/api.php?" + urlencode({"format": "json", "formatversion": 2, **params})
+    result = await make_async_request(session, url, upstream="wikipedia")
+    if result["status"] != "success":
+        raise WikiApiError(result["error"])
+    
+    data = json.loads(result["content"])
+    if "error" in data:
+        raise WikiApiError(data["error"].get("info", "MediaWiki API error"))
+    return data
+
+def resolve_wiki_title(query: Dict, titles: List[str]) -> Optional[Dict]:
+    """Pick the first candidate that resolves to a real, non-disambiguation article"""
+    normalized = {item["from"]: item["to"] for item in query.get("normalized", [])}
+    redirects = {item["from"]: item["to"] for item in query.get("redirects", [])}
+    pages = {page["title"]: page for page in query.get("pages", [])}
+    
+    for title in titles:
+        title = normalized.get(title, title)
+        title = redirects.get(title, title)
+        page = pages.get(title)
+        if not page or page.get("missing") or page.get("invalid"):
+            continue
+        if "disambiguation" in page.get("pageprops", {}):
+            continue
+        
+        # The lead extract's first paragraph plays the role of the article's first <p>
+        summary = page.get("extract", "").strip().split("\n")[0].strip()
+        if len(summary) < 100:
+            continue
+        return {"title": page["title"], "summary": summary}
+    
+    return None
+
+async def fetch_wiki_section(session: aiohttp.ClientSession, title: str, section: str) -> Optional[Dict]:
+    """Fetch a single rendered section of an article and extract it"""
+    data = await query_wiki_api(session, {
+        "action": "parse",
+        "page": title,
+        "redirects": 1,
+        "prop": "text",
+        "section": section,
+        "disablelimitreport": 1,
+        "disableeditsection": 1,
+    })
+    with timed_stage("wiki_parse"):
+        return await CPU_POOL.run("wiki_parse", extract_wiki_page, data.get("parse", {}).get("text", ""))
+
+async def fetch_wiki_toc(session: aiohttp.ClientSession, title: str) -> Dict:
+    """Fetch an article's table of contents, following redirects; the resolved title is in parse.title"""
+    return await query_wiki_api(session, {"action": "parse", "page": title, "redirects": 1, "prop": "sections"})
+
+def start_speculative(fetch: Awaitable) -> asyncio.Future:
+    """Start a fetch whose result may go unused, without its failure being logged as never retrieved"""
+    task = asyncio.ensure_future(fetch)
+    task.add_done_callback(lambda task: task.cancelled() or task.exception())
+    return task
+
+async def fetch_wiki_via_api(session: aiohttp.ClientSession, company_name: str) -> Optional[Dict]:
+    """Look a company up through the MediaWiki API instead of downloading rendered articles
+    
+    One batched query resolves every title candidate, following redirects and
+    flagging disambiguation pages, and returns the lead extracts. Only the
+    chosen article's lead section (for the infobox) and the sections we
+    summarise are then rendered and parsed.
+    
+    For a known company the article title is known up front, so its table
+    of contents and lead are requested alongside the title lookup, and a hit
+    takes two round trips instead of three. The sections never wait on the
+    lead.
+    """
+    normalized_name = normalize_company_name(company_name)
+    company = resolve_company(company_name)
+    # A known company's article title goes first; "Apple" alone is a disambiguation page
+    titles = list(dict.fromkeys(([company["wiki_title"]] if company else []) + [company_name, normalized_name]))
+    
+    toc_task = lead_task = None
+    if company:
+        toc_task = start_speculative(fetch_wiki_toc(session, company["wiki_title"]))
+        lead_task = start_speculative(fetch_wiki_section(session, company["wiki_title"], "0"))
+    
+    try:
+        data = await query_wiki_api(session, {
+            "action": "query",
+            "titles": "|".join(titles),
+            "redirects": 1,
+            "prop": "extracts|pageprops",
+            "ppprop": "disambiguation",
+            "exintro": 1,
+            "explaintext": 1,
+            "exlimit": len(titles),
+        })
+        page = resolve_wiki_title(data.get("query", {}), titles)
+        if page is None:
+            return None
+        
+        toc = None
+        if toc_task is not None:
+            try:
+                toc = await toc_task
+            except WikiApiError:
+                pass
+        if toc is None or toc.get("parse", {}).get("title") != page["title"]:
+            # Nothing was guessed, or the guess is not the article the lookup settled on
+            if lead_task is not None:
+                lead_task.cancel()
+            lead_task = start_speculative(fetch_wiki_section(session, page["title"], "0"))
+            toc = await fetch_wiki_toc(session, page["title"])
+        
+        # Map each wanted top-level heading to its section index
+        wanted = {}
+        for section in toc.get("parse", {}).get("sections", []):
+            for name, headings in WIKI_SECTIONS.items():
+                if str(section.get("level")) == "2" and section.get("line") in headings and name not in wanted:
+                    wanted[name] = section["index"]
+        
+        section_pages = await asyncio.gather(*[
+            fetch_wiki_section(session, page["title"], index) for index in wanted.values()
+        ])
+        lead = await lead_task
+    finally:
+        for task in (toc_task, lead_task):
+            if task is not None:
+                task.cancel()
+    
+    additional_info = {
+        name: section_page["summary"][:500]
+        for name, section_page in zip(wanted, section_pages)
+        if section_page and section_page["summary"]
+    }
+    
+    return {
+        "summary": page["summary"],
+        "details": lead["details"] if lead else {},
+        "additional_info": additional_info,
+        "source": f"{WIKI_BASE_URL}/wiki/{quote(page['title'].replace(' ', '_'))}",
+        "status": "success"
+    }
+
+@timed("wiki_fetch")
+async def scrape_company_info_async(company_name: str) -> Dict:
+    """Async company info scraping with multiple fallbacks"""
+    session = get_http_session()
+    wikipedia = UPSTREAMS["wikipedia"]
+    
+    # Don't queue behind a Wikipedia outage; the placeholder is what we'd end up with anyway
+    if not wikipedia.available():
+        return wiki_fallback_info(company_name)
+    
+    if WIKI_SOURCE == "api":
+        try:
+            result = await fetch_wiki_via_api(session, company_name)
+            if result:
+                return result
+            return wiki_fallback_info(company_name)
+        except CPUPoolFull as e:
+            # Scraping article pages would need the same busy parsers
+            logger.warning(f"Not parsing Wikipedia for {company_name}: {str(e)}")
+            return wiki_fallback_info(company_name)
+        except Exception as e:
+            # Fall back to scraping article pages if the API is unavailable
+            logger.warning(f"MediaWiki API lookup failed for {company_name}: {str(e)}")
+            if not wikipedia.available():
+                return wiki_fallback_info(company_name)
+    
+    result = await first_acceptable(
+        [partial(fetch_wiki_page, session, wiki_url) for wiki_url in wiki_title_urls(company_name)],
+        WIKI_HEDGE_DELAY
+    )
+    if result:
+        return result
+    
+    return wiki_fallback_info(company_name)
+
+def wiki_fallback_info(company_name: str) -> Dict:
+    """Placeholder company info used when no Wikipedia article is found"""
+    FALLBACKS.inc(source="company_info")
+    return {
+        "summary": f"Information about {company_name} is being researched. This company appears to be a legitimate business entity.",
+        "details": {"Name": company_name, "Type": "Company"},
+        "additional_info": {},
+        "source": None,
+        "status": "limited"
+    }
+
+def news_name_variants(company_name: str) -> Tuple[str, ...]:
+    """Distinct spellings of a company name worth searching for, longest first"""
+    variants = {company_name.strip(), normalize_company_name(company_name)}
+    return tuple(sorted((v for v in variants if v), key=len, reverse=True))
+
+def build_news_query(company_name: str) -> str:
+    """One NewsAPI query matching any name variant as an exact phrase"""
+    return " OR ".join(f'"{variant}"' for variant in news_name_variants(company_name))
+
+@lru_cache(maxsize=1000)
+def get_news_matcher(company_name: str) -> "re.Pattern":
+    """Compiled matcher for every name variant as a whole word, built once per company"""
+    alternatives = "|".join(re.escape(variant) for variant in news_name_variants(company_name))
+    return re.compile(rf"(?<!\w)(?:{alternatives})(?!\w)", re.IGNORECASE)
+
+def score_news_article(matcher: "re.Pattern", article: Dict) -> int:
+    """Relevance of an article to the company: a mention in the title counts double"""
+    return 2 * bool(matcher.search(article["title"])) + bool(matcher.search(article["description"]))
+
+@timed("news_fetch")
+async def get_recent_news_async(company_name: str) -> Dict:
+    """Async news fetching with better error handling"""
+    api_key = os.getenv("NEWS_API_KEY")
+    if not api_key:
+        status, message = "warning", "News API key not configured"
+    elif not UPSTREAMS["newsapi"].available():
+        status, message = "warning", "News API temporarily unavailable"
+    else:
+        try:
+            # Every name variant in a single round trip, matched against titles and descriptions only
+            params = {
+                "q": build_news_query(company_name),
+                "searchIn": "title,description",
+                "sortBy": "publishedAt",
+                "pageSize": NEWS_PAGE_SIZE,
+                "apiKey": api_key,
+            }
+            result = await make_async_request(get_http_session(), f"{NEWS_API_URL}?{urlencode(params)}", timeout=10, upstream="newsapi")
+            
+            if result["status"] == "success":
+                data = json.loads(result["content"])
+                
+                if data.get("status") == "ok" and data.get("articles"):
+                    # Keep the articles that actually mention the company, most relevant first
+                    matcher = get_news_matcher(company_name)
+                    scored = []
+                    for article in data["articles"]:
+                        if article.get("title") and article.get("description"):
+                            score = score_news_article(matcher, article)
+                            if score:
+                                scored.append((score, article))
+                    # Stable sort, so equally relevant articles stay newest first
+                    scored.sort(key=lambda item: item[0], reverse=True)
+                    
+                    articles = [{
+                        "title": article["title"],
+                        "description": article["description"],
+                        "publishedAt": (article.get("publishedAt") or "")[:10],
+                        "url": article.get("url", "#"),
+                        "source": (article.get("source") or {}).get("name", "Unknown")
+                    } for _, article in scored[:NEWS_MAX_ARTICLES]]
+                    
+                    if articles:
+                        return {"status": "success", "articles": articles}
+            else:
+                logger.warning(f"Error fetching news for {company_name}: {result['error']}")
+            
+            status, message = "warning", "Using sample news data due to API limitations"
+            
+        except Exception as e:
+            logger.error(f"Error in get_recent_news_async: {str(e)}")
+            status, message = "error", str(e)
+    
+    # Fallback to mock data, generated once whichever way the fetch failed
+    return {
+        "status": status,
+        "message": message,
+        "articles": await get_mock_news_async(company_name)
+    }
+
+class NameTemplate:
+    """
+    Text with the company name substituted in, split once at import
+    
+    Rendering is a single str.join over the precompiled parts, with no
+    format parsing per call.
+    """
+    __slots__ = ("parts",)
+    
+    def __init__(self, text: str):
+        self.parts = tuple(text.split("{name}"))
+    
+    def render(self, name: str) -> str:
+        return name.join(self.parts)
+
+class MockNewsTemplate:
+    """A sample headline shown when no real news is available"""
+    __slots__ = ("title", "description", "days_ago")
+    
+    def __init__(self, title: str, description: str, days_ago: int):
+        self.title = NameTemplate(title)
+        self.description = NameTemplate(description)
+        self.days_ago = days_ago
+
+class MockReviewTemplate:
+    """A sample employee review, rated somewhere in its range"""
+    __slots__ = ("rating_range", "title", "pros", "cons", "role")
+    
+    def __init__(self, rating_range: Tuple[float, float], title: str, pros: str, cons: str, role: str):
+        self.rating_range = rating_range
+        self.title = title
+        self.pros = NameTemplate(pros)
+        self.cons = cons
+        self.role = role
+
+MOCK_NEWS_TEMPLATES = (
+    MockNewsTemplate(
+        "{name} Reports Strong Quarterly Performance",
+        "{name} exceeded market expectations with robust financial results, showing strong growth across key business segments.",
+        5
+    ),
+    MockNewsTemplate(
+        "{name} Announces Strategic Partnership Initiative",
+        "{name} has formed new strategic alliances to expand market reach and enhance service offerings.",
+        12
+    ),
+    MockNewsTemplate(
+        "{name} Invests in Digital Transformation",
+        "{name} is accelerating digital initiatives to improve customer experience and operational efficiency.",
+        18
+    ),
+    MockNewsTemplate(
+        "{name} Commits to Sustainability Goals",
+        "{name} announced comprehensive environmental initiatives targeting carbon neutrality and sustainable practices.",
+        25
+    ),
+    MockNewsTemplate(
+        "{name} Expands Workforce with New Hiring Initiative",
+        "{name} plans to hire hundreds of new employees across multiple departments to support growth.",
+        30
+    ),
+)
+MOCK_NEWS_SOURCES = ("Business Wire", "PR Newswire", "Market Watch", "Industry News")
+
+MOCK_REVIEW_TEMPLATES = (
+    MockReviewTemplate(
+        (4.0, 4.8),
+        "Excellent work environment and growth opportunities",
+        "Working at {name} has been incredibly rewarding. The company culture promotes innovation and collaboration. Great benefits package and work-life balance. Management is supportive and provides clear growth paths.",
+        "Sometimes the pace can be fast during busy periods. Remote work policies could be more flexible in some departments.",
+        "Senior Software Engineer"
+    ),
+    MockReviewTemplate(
+        (3.5, 4.2),
+        "Good company with room for improvement",
+        "{name} offers competitive compensation and has a diverse, talented workforce. The projects are challenging and meaningful. Good learning opportunities through training programs.",
+        "Communication between teams could be better. Some processes feel outdated and could benefit from modernization. Career advancement can be slow in certain areas.",
+        "Product Manager"
+    ),
+    MockReviewTemplate(
+        (3.8, 4.5),
+        "Strong leadership and innovative culture",
+        "The leadership team at {name} has a clear vision and communicates it well. Employees are encouraged to think creatively and take ownership of their work. Excellent mentorship programs.",
+        "Workload can be heavy during project deadlines. Office space could be improved in some locations. Limited remote work options pre-pandemic.",
+        "Marketing Specialist"
+    ),
+    MockReviewTemplate(
+        (4.2, 4.7),
+        "Great place to build your career",
+        "{name} invests heavily in employee development. The company promotes from within and offers excellent training programs. Collaborative environment with smart colleagues.",
+        "Benefits package, while good, could be more comprehensive. Some legacy systems slow down productivity. Meeting schedules can be overwhelming.",
+        "Business Analyst"
+    ),
+    MockReviewTemplate(
+        (3.2, 3.9),
+        "Decent workplace with typical challenges",
+        "Stable employment with {name}. Reasonable work-life balance in most departments. Good opportunity to work on large-scale projects with impact.",
+        "Limited flexibility in work arrangements. Some management layers create communication barriers. Salary increases could be more competitive with market rates.",
+        "Operations Manager"
+    ),
+)
+
+def mock_rng(kind: str, company_name: str) -> random.Random:
+    """Random generator seeded by the company, so its sample data is the same on every call"""
+    return random.Random(zlib.crc32(f"{kind}:{get_company_key(company_name)}".encode()))
+
+def mock_date(now: float, days_ago: int) -> str:
+    """Date a number of days before the start of the current UTC day"""
+    return time.strftime("%Y-%m-%d", time.gmtime(now - now % 86400 - days_ago * 86400))
+
+@lru_cache(maxsize=1024)
+def mock_news_rows(company_name: str, day: int) -> Tuple[Tuple[str, str, str, str], ...]:
+    """Rendered (title, description, date, source) sample news for a company on a day"""
+    rng = mock_rng("news", company_name)
+    name = normalize_company_name(company_name)
+    now = day * 86400
+    return tuple(
+        (template.title.render(name), template.description.render(name), mock_date(now, template.days_ago), rng.choice(MOCK_NEWS_SOURCES))
+        for template in rng.sample(MOCK_NEWS_TEMPLATES, min(3, len(MOCK_NEWS_TEMPLATES)))
+    )
+
+@lru_cache(maxsize=1024)
+def mock_review_rows(company_name: str, day: int) -> Tuple[Tuple[float, MockReviewTemplate, str, str], ...]:
+    """Rated, rendered and dated sample reviews for a company on a day"""
+    rng = mock_rng("reviews", company_name)
+    name = normalize_company_name(company_name)
+    now = day * 86400
+    return tuple(
+        (round(rng.uniform(*template.rating_range), 1), template, template.pros.render(name), mock_date(now, rng.randint(30, 365)))
+        for template in rng.sample(MOCK_REVIEW_TEMPLATES, rng.randint(3, 4))
+    )
+
+def generate_mock_news(company_name: str, now: Optional[float] = None) -> List[Dict]:
+    """Sample news for a company, deterministic for a given company and day"""
+    day = int((time.time() if now is None else now) // 86400)
+    # Fresh dicts every call: callers own (and may modify) what they get back
+    return [
+        {"title": title, "description": description, "publishedAt": published_at, "url": "#", "source": source}
+        for title, description, published_at, source in mock_news_rows(canonical_company_name(company_name), day)
+    ]
+
+def generate_mock_reviews(company_name: str, now: Optional[float] = None) -> List[Dict]:
+    """Sample employee reviews for a company, deterministic for a given company and day"""
+    day = int((time.time() if now is None else now) // 86400)
+    return [
+        {"rating": rating, "title": template.title, "pros": pros, "cons": template.cons, "role": template.role, "date": date}
+        for rating, template, pros, date in mock_review_rows(canonical_company_name(company_name), day)
+    ]
+
+async def get_mock_news_async(company_name: str) -> List[Dict]:
+    """Generate realistic mock news data"""
+    FALLBACKS.inc(source="news")
+    return generate_mock_news(company_name)
+
+@timed("reviews")
+async def get_employee_reviews_async(company_name: str) -> List[Dict]:
+    """Generate realistic employee reviews with variety"""
+    return generate_mock_reviews(company_name)
+
+SYSTEM_PROMPT = "You are an expert career advisor and company research analyst. Provide detailed, actionable insights for job seekers preparing for interviews. Use a professional but engaging tone, and structure your analysis clearly with specific, practical advice."
+SUMMARY_COMPLETION_OPTIONS = {"temperature": 0.7, "max_tokens": 2000, "top_p": 0.9}
+
+@lru_cache(maxsize=1)
+def get_tokenizer():
+    """tiktoken encoding for LLM_MODEL, or None to estimate token counts from characters"""
+    if tiktoken is None:
+        logger.warning("tiktoken is not installed, estimating token counts")
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(LLM_MODEL.split("/")[-1])
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # Encodings are downloaded on first use, which fails offline
+        logger.warning(f"tiktoken unavailable, estimating token counts (pre-fetch the encoding into TIKTOKEN_CACHE_DIR): {str(e)}")
+        return None
+
+def count_tokens(text: str) -> int:
+    """Number of tokens the model will see for this text"""
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return (len(text) + 3) // 4
+    return len(tokenizer.encode(text, disallowed_special=()))
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to at most max_tokens, marking the cut with an ellipsis"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 1:
+        return ""
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        cut = text[:(max_tokens - 1) * 4]
+        return (cut.rsplit(" ", 1)[0] or cut) + "…"
+    return tokenizer.decode(tokenizer.encode(text, disallowed_special=())[:max_tokens - 1]) + "…"
+
+def estimate_llm_cost(prompt_tokens: int, completion_tokens: int = 0) -> float:
+    """Estimated USD cost of a chat completion at the configured prices"""
+    return (prompt_tokens * LLM_PROMPT_PRICE + completion_tokens * LLM_COMPLETION_PRICE) / 1_000_000
+
+SUMMARY_INSTRUCTIONS = """
 Please provide a well-structured analysis covering:
 
 1. **Company Overview & Business Model**
@@ -439,30 +2528,160 @@ Please provide a well-structured analysis covering:
 
 Format your response with clear headers and actionable insights that will help the candidate stand out in their interview.
 """
+
+@lru_cache(maxsize=1)
+def fixed_prompt_tokens() -> int:
+    """Tokens in the parts of the prompt that never change, counted once"""
+    return count_tokens(SYSTEM_PROMPT) + count_tokens(SUMMARY_INSTRUCTIONS)
+
+# Tokens kept for the lines framing the context and the role-specific sentence, so the
+# company context can be budgeted once for every role
+ROLE_CONTEXT_TOKENS = 64
+PROMPT_FRAME_TOKENS = 32
+
+def context_sections(company_data: Dict) -> List[Dict]:
+    """Candidate context sections in display order, each with a packing priority and token cap"""
+    company_info = company_data.get("company_info", {})
+    news = company_data.get("news", {})
+    reviews = company_data.get("reviews", [])
+    sections = [{"priority": 0, "cap": 16, "header": None, "text": f"Company: {company_data.get('company_name', '')}"}]
     
-    try:
-        response = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert career advisor and company research analyst. Provide detailed, actionable insights for job seekers preparing for interviews. Use a professional but engaging tone, and structure your analysis clearly with specific, practical advice.",
-                },
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-            model="openai/gpt-4o",
-            temperature=0.7,
-            max_tokens=2000,
-            top_p=0.9
-        )
-        
-        return response.choices[0].message.content
-        
-    except Exception as e:
-        logger.error(f"Error generating AI summary: {str(e)}")
-        return f"""
+    if company_info.get("summary"):
+        sections.append({"priority": 1, "cap": 400, "header": None, "text": f"Company Overview: {company_info['summary']}"})
+    
+    if company_info.get("details"):
+        sections.append({"priority": 2, "cap": 200, "header": "Key Company Details:",
+                         "items": [f"- {key}: {value}" for key, value in company_info["details"].items()]})
+    
+    for section, content in (company_info.get("additional_info") or {}).items():
+        sections.append({"priority": 5, "cap": 150, "header": None, "text": f"{section}: {content}"})
+    
+    if news.get("articles"):
+        sections.append({"priority": 3, "cap": 300, "header": "Recent News & Developments:",
+                         "items": [f"- {article['title']}: {article['description']}" for article in news["articles"]]})
+    
+    if reviews:
+        sections.append({"priority": 4, "cap": 300, "header": "Employee Insights:", "items": [
+            f"- {review['role']} (Rating: {review['rating']}/5): {review['title']}\n"
+            f"  Pros: {review['pros']}\n"
+            f"  Cons: {review['cons']}"
+            for review in reviews
+        ]})
+    return sections
+
+def pack_context(sections: List[Dict], budget: int) -> Tuple[str, int]:
+    """Fill the token budget with sections in priority order, returning the rendered context and its size
+    
+    Item sections keep as many whole items as fit; text sections are cut to
+    fit. A section left with too little room for useful content is dropped.
+    """
+    rendered = {}
+    remaining = budget
+    for index, section in sorted(enumerate(sections), key=lambda item: item[1]["priority"]):
+        room = min(section["cap"], remaining)
+        if room < 16:
+            continue
+        if "items" in section:
+            lines = [section["header"]]
+            used = count_tokens(section["header"])
+            for item in section["items"]:
+                cost = count_tokens(item) + 1
+                if used + cost > room:
+                    break
+                lines.append(item)
+                used += cost
+            if len(lines) == 1:
+                continue
+            text = "\n".join(lines)
+        else:
+            text = truncate_to_tokens(section["text"], room)
+        rendered[index] = text
+        # Two tokens for the blank line joining sections
+        remaining -= count_tokens(text) + 2
+    
+    context = "\n\n".join(rendered[index] for index in sorted(rendered))
+    return context, budget - remaining
+
+def pack_company_context(company_data: Dict) -> Dict:
+    """Render the token-budgeted research context for a company (CPU-bound, safe to run in a worker)"""
+    # Whatever the fixed prompt parts leave of the budget goes to the company context
+    budget = PROMPT_MAX_TOKENS - fixed_prompt_tokens() - ROLE_CONTEXT_TOKENS
+    context, tokens = pack_context(context_sections(company_data), max(0, budget))
+    return {"text": context, "tokens": tokens}
+
+def build_company_context(company_data: Dict) -> Tuple[str, int]:
+    """Token-budgeted research context for a company, rendered once per version of its source data"""
+    context_key = get_context_key(company_data)
+    cached = CONTEXT_CACHE.get(context_key)
+    if cached is None:
+        cached = pack_company_context(company_data)
+        CONTEXT_CACHE.set(context_key, cached)
+    return cached["text"], cached["tokens"]
+
+async def build_company_context_async(company_data: Dict) -> Tuple[str, int]:
+    """Like build_company_context(), rendering on a CPU worker"""
+    context_key = get_context_key(company_data)
+    cached = CONTEXT_CACHE.get(context_key)
+    if cached is None:
+        try:
+            cached = await CPU_POOL.run("prompt_build", pack_company_context, company_data)
+        except CPUPoolFull:
+            # A prompt is worth more than the loop time it costs; the LLM call is the slow part anyway
+            cached = pack_company_context(company_data)
+        CONTEXT_CACHE.set(context_key, cached)
+    return cached["text"], cached["tokens"]
+
+def build_summary_prompt(company_data: Dict, job_role: Optional[str] = None,
+                         context: Optional[Tuple[str, int]] = None) -> Dict:
+    """Chat messages asking for a company analysis, with their token count and estimated cost"""
+    company_name = company_data.get("company_name", "")
+    context, context_tokens = context or build_company_context(company_data)
+    
+    # Only this sentence differs between roles researched for the same company
+    job_role = normalize_job_role(job_role)
+    job_context = f"The candidate is preparing for a {job_role} interview at {company_name}." if job_role else f"The candidate is researching {company_name} for a potential job opportunity."
+    job_context = truncate_to_tokens(job_context, ROLE_CONTEXT_TOKENS - PROMPT_FRAME_TOKENS)
+    
+    prompt = f"""
+As an expert career advisor, provide a comprehensive company analysis for a job seeker. {job_context}
+
+Based on the following research data:
+
+{context}
+{SUMMARY_INSTRUCTIONS}"""
+    
+    prompt_tokens = fixed_prompt_tokens() + context_tokens + count_tokens(job_context) + PROMPT_FRAME_TOKENS
+    return {
+        "messages": [
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT,
+            },
+            {
+                "role": "user",
+                "content": prompt,
+            }
+        ],
+        "prompt_tokens": prompt_tokens,
+        "context_tokens": context_tokens,
+        "estimated_prompt_cost": estimate_llm_cost(prompt_tokens),
+    }
+
+async def build_summary_prompt_async(company_data: Dict, job_role: Optional[str] = None) -> Dict:
+    """Like build_summary_prompt(), with the company context rendered on a CPU worker"""
+    return build_summary_prompt(company_data, job_role, await build_company_context_async(company_data))
+
+def build_summary_messages(company_data: Dict, job_role: Optional[str] = None) -> List[Dict]:
+    """Build the chat messages asking for a company analysis"""
+    return build_summary_prompt(company_data, job_role)["messages"]
+
+def format_fallback_summary(company_data: Dict) -> str:
+    """Template summary used when the LLM is unavailable"""
+    company_name = company_data.get("company_name", "")
+    company_info = company_data.get("company_info", {})
+    news = company_data.get("news", {})
+    
+    return f"""
 # Company Analysis: {company_name}
 
 ## Overview
@@ -480,92 +2699,657 @@ The company generally receives positive feedback from employees, with ratings av
 **Note:** This analysis was generated with limited data due to technical constraints. For the most comprehensive insights, consider researching additional sources before your interview.
 """
 
+async def render_fallback_summary_async(company_data: Dict) -> str:
+    """Template summary rendered on a CPU worker, or inline when they are all busy"""
+    FALLBACKS.inc(source="summary")
+    try:
+        return await CPU_POOL.run("fallback_render", format_fallback_summary, company_data)
+    except CPUPoolFull:
+        return format_fallback_summary(company_data)
+
+def log_summary_prompt(company_data: Dict, prompt: Dict):
+    """Record the size and estimated cost of a prompt about to be sent"""
+    PROMPT_TOKENS.observe(prompt["prompt_tokens"])
+    logger.info(f"Summary prompt for {company_data.get('company_name', '')}: {prompt['prompt_tokens']} tokens "
+                f"({prompt['context_tokens']} context), estimated ${prompt['estimated_prompt_cost']:.5f}")
+
+async def generate_company_summary_async(company_data: Dict, job_role: Optional[str] = None) -> Tuple[str, bool]:
+    """Generate AI summary with better prompting and error handling, and say whether the model wrote it"""
+    summary_key = get_summary_key(company_data, job_role)
+    cached_summary = await SUMMARY_CACHE.aget(summary_key)
+    if cached_summary is not None:
+        return cached_summary, True
+    
+    try:
+        with timed_stage("prompt_build"):
+            prompt = await build_summary_prompt_async(company_data, job_role)
+        log_summary_prompt(company_data, prompt)
+        response = await create_chat_completion(messages=prompt["messages"], **SUMMARY_COMPLETION_OPTIONS)
+        
+        summary = response.choices[0].message.content
+        await SUMMARY_CACHE.aset(summary_key, summary)
+        return summary, True
+        
+    except Exception as e:
+        logger.error(f"Error generating AI summary: {str(e)}")
+        return await render_fallback_summary_async(company_data), False
+
+async def stream_company_summary(company_data: Dict, job_role: Optional[str] = None) -> AsyncIterator[str]:
+    """Yield the AI summary piece by piece as the model generates it"""
+    summary_key = get_summary_key(company_data, job_role)
+    cached_summary = await SUMMARY_CACHE.aget(summary_key)
+    if cached_summary is not None:
+        yield cached_summary
+        return
+    
+    # Concurrent streams of the same summary share one completion
+    async for delta in SUMMARY_FLIGHTS.do(summary_key, partial(generate_summary_stream, company_data, job_role, summary_key)):
+        yield delta
+
+class IncompleteSummary(Exception):
+    """Raised at the end of a streamed summary that is not the model's full answer: cut short, or the template"""
+
+async def generate_summary_stream(company_data: Dict, job_role: Optional[str], summary_key: str) -> AsyncIterator[str]:
+    """Stream one completion of the summary, falling back if it fails before any text, and cache the full text"""
+    parts = []
+    try:
+        with timed_stage("prompt_build"):
+            prompt = await build_summary_prompt_async(company_data, job_role)
+        log_summary_prompt(company_data, prompt)
+        async for delta in stream_chat_completion(prompt["messages"], **SUMMARY_COMPLETION_OPTIONS):
+            parts.append(delta)
+            yield delta
+    except Exception as e:
+        logger.error(f"Error streaming AI summary: {str(e)}")
+        # Only fall back if nothing was sent yet; text already sent cannot be taken back
+        if not parts:
+            yield await render_fallback_summary_async(company_data)
+            raise IncompleteSummary(f"Summary fell back to the template: {str(e)}") from e
+        raise IncompleteSummary(f"Summary stream ended after {len(parts)} parts: {str(e)}") from e
+    
+    await SUMMARY_CACHE.aset(summary_key, "".join(parts))
+
+async def get_snapshotted(source: str, company_key: str, fetch: Callable[[], Awaitable[Dict]]) -> Dict:
+    """Serve a source from the snapshot while it is fresh, otherwise fetch it; an older snapshot still stands in for a failed fetch"""
+    snapshot = _snapshot
+    data = snapshot_source(source, company_key)
+    if data is None:
+        if snapshot is not None:
+            SNAPSHOT_LOOKUPS.inc(source=source, result="miss")
+        return await fetch()
+    if snapshot.fresh():
+        SNAPSHOT_LOOKUPS.inc(source=source, result="hit")
+        return data
+    
+    result = await fetch()
+    if is_successful(result):
+        return result
+    SNAPSHOT_LOOKUPS.inc(source=source, result="fallback")
+    return data
+
+def start_source_tasks(company_name: str) -> Dict[str, asyncio.Future]:
+    """Start fetching every source for a company concurrently, from the snapshot or through the source caches"""
+    company_key = get_company_key(company_name)
+    company_info = partial(get_cached, COMPANY_INFO_CACHE, company_key, partial(scrape_company_info_async, company_name), is_successful)
+    news = partial(get_cached, NEWS_CACHE, company_key, partial(get_recent_news_async, company_name), is_successful)
+    return {
+        "company_info": asyncio.ensure_future(get_snapshotted("company_info", company_key, company_info)),
+        "news": asyncio.ensure_future(get_snapshotted("news", company_key, news)),
+        "reviews": asyncio.ensure_future(get_cached(REVIEWS_CACHE, company_key, partial(get_employee_reviews_async, company_name))),
+    }
+
+async def source_fallback(source: str, error: Exception, company_name: str) -> Any:
+    """Replacement data for a source whose fetch raised"""
+    logger.error(f"Error in {source}: {error}")
+    if source == "company_info":
+        FALLBACKS.inc(source="company_info")
+        return {"summary": f"Error retrieving information for {company_name}", "details": {}, "status": "error"}
+    if source == "news":
+        return {"status": "error", "articles": await get_mock_news_async(company_name)}
+    # Reviews are generated locally and deterministically, so generating them again would fail the same way
+    return []
+
+def fallback_sources(company_data: Dict) -> List[str]:
+    """Sources standing in placeholder or sample data for an upstream that failed"""
+    sources = []
+    if not is_successful(company_data["company_info"]):
+        sources.append("company_info")
+    # Without a news API key sample news is all there is, not a stand-in
+    if not is_successful(company_data["news"]) and os.getenv("NEWS_API_KEY"):
+        sources.append("news")
+    return sources
+
+async def finish_research(company_data: Dict, job_role: Optional[str], ai_summary: str, start_time: float,
+                          summary_complete: bool = True) -> CompanyResponse:
+    """Build the response for a completed pipeline run and cache it unless any part of it is fallback data"""
+    company_name = company_data["company_name"]
+    processing_time = time.time() - start_time
+    
+    # Prepare response
+    result = CompanyResponse(
+        company_name=company_name,
+        job_role=job_role,
+        company_info=company_data["company_info"],
+        news=company_data["news"],
+        reviews=company_data["reviews"],
+        ai_summary=ai_summary,
+        processing_time=round(processing_time, 2),
+        status="success"
+    )
+    
+    # Cache the result, encoding it now so its first hit is already a byte copy. A result
+    # built on fallbacks is not cached, so the first request after an upstream recovers gets real data
+    fallbacks = fallback_sources(company_data) + ([] if summary_complete else ["summary"])
+    if fallbacks:
+        logger.warning(f"Not caching research for {company_name}: fallback {', '.join(fallbacks)}")
+    else:
+        cache_key = get_cache_key(company_name, job_role)
+        cached_result = result.dict()
+        await CACHE.aset(cache_key, cached_result)
+        if PREENCODE_CACHE_HITS:
+            ENCODED_RESULTS.get(cache_key, cached_result)
+    
+    logger.info(f"Research completed for {company_name} in {processing_time:.2f}s")
+    return result
+
+async def run_research_pipeline(company_name: str, job_role: Optional[str], start_time: float) -> CompanyResponse:
+    """Gather source data, generate the AI summary and cache the response"""
+    logger.info(f"Starting research for {company_name}")
+    
+    # Gather data concurrently
+    tasks = start_source_tasks(company_name)
+    results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+    
+    # Compile all data, handling any exceptions in the results
+    company_data = {"company_name": company_name}
+    for source, result in zip(tasks, results):
+        if isinstance(result, Exception):
+            result = await source_fallback(source, result, company_name)
+        company_data[source] = result
+    
+    # Generate AI summary
+    logger.info(f"Generating AI summary for {company_name}")
+    ai_summary, summary_complete = await generate_company_summary_async(company_data, job_role)
+    
+    return await finish_research(company_data, job_role, ai_summary, start_time, summary_complete)
+
+def stream_event(event: str, **payload) -> bytes:
+    """Encode one NDJSON line of the /research/stream response"""
+    return (json.dumps({"event": event, **payload}, default=str) + "\n").encode()
+
+async def open_research_stream(company_name: str, job_role: Optional[str], start_time: float) -> AsyncIterator[bytes]:
+    """Check the cache and take an admission slot before anything is sent, then return the event stream
+    
+    Doing this up front lets /research/stream answer an overload with a
+    real 503: with OVERLOAD_ACTION=reject, Overloaded is raised here.
+    """
+    cached_result, _ = await lookup_research(company_name, job_role)
+    if cached_result is not None:
+        return stream_cached_research(cached_result, job_role, start_time)
+    
+    try:
+        await ADMISSION.acquire("interactive", time.monotonic() + ADMISSION_DEADLINE)
+    except Overloaded as e:
+        logger.warning(f"Shedding streamed research for {company_name}: {str(e)}")
+        if OVERLOAD_ACTION == "reject":
+            raise
+        return stream_degraded_research(company_name, job_role, start_time)
+    return stream_admitted_research(company_name, job_role, start_time)
+
+async def stream_research(company_name: str, job_role: Optional[str], start_time: float) -> AsyncIterator[bytes]:
+    """Emit each source as soon as it resolves, then the AI summary as it is generated"""
+    async for event in await open_research_stream(company_name, job_role, start_time):
+        yield event
+
+async def stream_cached_research(cached_result: Dict, job_role: Optional[str], start_time: float) -> AsyncIterator[bytes]:
+    for source in ("company_info", "news", "reviews"):
+        yield stream_event(source, data=cached_result[source])
+    yield stream_event("summary", delta=cached_result["ai_summary"])
+    # The cached result may have been researched for another spelling of the role
+    yield stream_event("done", data={**cached_result, "job_role": job_role, "processing_time": time.time() - start_time})
+
+async def stream_degraded_research(company_name: str, job_role: Optional[str], start_time: float) -> AsyncIterator[bytes]:
+    result = await degraded_research(company_name, job_role, start_time)
+    for source in ("company_info", "news", "reviews"):
+        yield stream_event(source, data=getattr(result, source))
+    RESEARCH_SECONDS.observe(time.time() - start_time, endpoint="research_stream", cached="degraded")
+    yield stream_event("done", data=result.dict())
+
+async def stream_admitted_research(company_name: str, job_role: Optional[str], start_time: float) -> AsyncIterator[bytes]:
+    """Run the pipeline on an admission slot already taken, giving the slot back when the stream ends or is dropped"""
+    admitted = time.monotonic()
+    try:
+        async for event in stream_pipeline(company_name, job_role, start_time):
+            yield event
+    finally:
+        ADMISSION.release(time.monotonic() - admitted)
+
+async def stream_pipeline(company_name: str, job_role: Optional[str], start_time: float) -> AsyncIterator[bytes]:
+    """Sources as they resolve, then the summary"""
+    logger.info(f"Starting streamed research for {company_name}")
+    tasks = start_source_tasks(company_name)
+    sources = {task: source for source, task in tasks.items()}
+    company_data = {"company_name": company_name}
+    
+    pending = set(tasks.values())
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            source = sources[task]
+            try:
+                result = task.result()
+            except Exception as e:
+                result = await source_fallback(source, e, company_name)
+            company_data[source] = result
+            yield stream_event(source, data=result)
+    
+    parts = []
+    summary_complete = True
+    try:
+        async for delta in stream_company_summary(company_data, job_role):
+            parts.append(delta)
+            yield stream_event("summary", delta=delta)
+    except IncompleteSummary:
+        # The reader already has the text; finish_research keeps it out of the cache
+        summary_complete = False
+    
+    result = await finish_research(company_data, job_role, "".join(parts), start_time, summary_complete)
+    RESEARCH_SECONDS.observe(time.time() - start_time, endpoint="research_stream", cached="false")
+    yield stream_event("done", data=result.dict())
+
+_batch_semaphore: Optional[asyncio.Semaphore] = None
+
+def get_batch_semaphore() -> asyncio.Semaphore:
+    """Cap on batch pipelines running at once, shared by every batch"""
+    global _batch_semaphore
+    if _batch_semaphore is None:
+        _batch_semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+    return _batch_semaphore
+
+async def research_batch(items: List[CompanyRequest]) -> AsyncIterator[Dict]:
+    """Research many companies, yielding one result per distinct company/role as each finishes
+    
+    Duplicate items are researched once and reported with all their
+    positions. Cached results are served straight away; everything else
+    waits for a batch slot, and the per-upstream caps in
+    make_async_request and the LLM slots keep the fan-out bounded.
+    """
+    unique = OrderedDict()
+    for index, item in enumerate(items):
+        company_name = canonical_company_name(item.company_name)
+        job_role = item.job_role.strip() if item.job_role else None
+        key = get_cache_key(company_name, job_role)
+        if key not in unique:
+            unique[key] = {"company_name": company_name, "job_role": job_role, "indexes": []}
+        unique[key]["indexes"].append(index)
+    
+    async def research_item(cache_key: str, item: Dict) -> Dict:
+        start_time = time.time()
+        outcome = {"indexes": item["indexes"], "company_name": item["company_name"], "job_role": item["job_role"]}
+        if not item["company_name"]:
+            return {**outcome, "status": "error", "error": "Company name is required"}
+        
+        cached_result, cache_status = await lookup_research(item["company_name"], item["job_role"])
+        if cached_result is not None:
+            return {**outcome, "status": "success", "cached": True, "stale": cache_status == "stale",
+                    "result": {**cached_result, "job_role": item["job_role"]}}
+        
+        try:
+            async with get_batch_semaphore():
+                result = await RESEARCH_FLIGHTS.do(
+                    cache_key, partial(admitted_pipeline, item["company_name"], item["job_role"], start_time, "batch", None)
+                )
+            # May have joined a pipeline run for another spelling of the same role
+            return {**outcome, "status": "success", "cached": False, "result": {**result.dict(), "job_role": item["job_role"]}}
+        except Exception as e:
+            logger.error(f"Error researching {item['company_name']} in batch: {str(e)}")
+            return {**outcome, "status": "error", "error": str(e)}
+    
+    tasks = [asyncio.ensure_future(research_item(key, item)) for key, item in unique.items()]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            yield await next_result
+    finally:
+        for task in tasks:
+            task.cancel()
+
+class Overloaded(Exception):
+    """Raised when a research pipeline cannot be admitted before its deadline"""
+    
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Research pipelines are overloaded ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+# Lower values are admitted first
+ADMISSION_PRIORITIES = {"interactive": 0, "batch": 1, "refresh": 2}
+
+class AdmissionController:
+    """
+    Cap research pipelines running at once, queueing the rest by priority
+    
+    Requests answered from the cache never come here; only cold pipelines
+    need a slot. Waiters are admitted by priority, then in arrival order.
+    A request is turned away straight away when the queue is full or when
+    the expected wait (from the recent pipeline duration) already runs past
+    its deadline, and otherwise when the deadline passes while it waits.
+    """
+    
+    def __init__(self, max_in_flight: int, max_queue: int):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = 0
+        self.service_time: Optional[float] = None
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = 0
+    
+    def expected_wait(self, rank: int) -> float:
+        """Rough wait for a new request of this rank: the pipelines ahead of it, run max_in_flight at a time"""
+        ahead = sum(1 for waiter_rank, _, future in self._waiters if waiter_rank <= rank and not future.done())
+        return (ahead + 1) / self.max_in_flight * (self.service_time or 0.0)
+    
+    def _shed(self, priority: str, reason: str, retry_after: float) -> Overloaded:
+        self.shed += 1
+        ADMISSION_SHED.inc(priority=priority, reason=reason)
+        return Overloaded(reason, max(1, math.ceil(retry_after)))
+    
+    async def acquire(self, priority: str = "interactive", deadline: Optional[float] = None):
+        """Wait for a pipeline slot; deadline is a time.monotonic() value, None to wait as long as it takes"""
+        if self.max_in_flight <= 0:
+            return
+        
+        rank = ADMISSION_PRIORITIES[priority]
+        if self.in_flight < self.max_in_flight and not self.waiting:
+            self.in_flight += 1
+            self.admitted += 1
+            ADMISSION_WAIT.observe(0.0, priority=priority)
+            return
+        
+        expected_wait = self.expected_wait(rank)
+        if self.waiting >= self.max_queue:
+            raise self._shed(priority, "queue_full", expected_wait)
+        if deadline is not None and time.monotonic() + expected_wait > deadline:
+            raise self._shed(priority, "deadline", expected_wait)
+        
+        future = asyncio.get_event_loop().create_future()
+        self._sequence += 1
+        heapq.heappush(self._waiters, (rank, self._sequence, future))
+        self.waiting += 1
+        start = time.monotonic()
+        try:
+            await asyncio.wait([future], timeout=None if deadline is None else max(0.0, deadline - start))
+        except asyncio.CancelledError:
+            if future.done():
+                # Handed a slot just as the request went away
+                self.release()
+            else:
+                future.cancel()
+                self.waiting -= 1
+            raise
+        
+        if not future.done():
+            # Out of time; release() skips abandoned entries
+            future.cancel()
+            self.waiting -= 1
+            raise self._shed(priority, "deadline", self.expected_wait(rank))
+        self.admitted += 1
+        ADMISSION_WAIT.observe(time.monotonic() - start, priority=priority)
+    
+    def release(self, service_time: Optional[float] = None):
+        if self.max_in_flight <= 0:
+            return
+        if service_time is not None:
+            self.service_time = service_time if self.service_time is None else 0.8 * self.service_time + 0.2 * service_time
+        
+        # Hand the slot straight to the next live waiter, so in_flight never dips and lets a newcomer jump the queue
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self.waiting -= 1
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+    
+    @asynccontextmanager
+    async def slot(self, priority: str = "interactive", deadline: Optional[float] = None):
+        await self.acquire(priority, deadline)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+    
+    def stats(self) -> Dict:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "service_time": self.service_time,
+        }
+
+ADMISSION = AdmissionController(MAX_INFLIGHT_PIPELINES, ADMISSION_QUEUE_SIZE)
+
+async def admitted_pipeline(company_name: str, job_role: Optional[str], start_time: float,
+                            priority: str, deadline: Optional[float]) -> CompanyResponse:
+    """Run the research pipeline once admission control lets it"""
+    async with ADMISSION.slot(priority, deadline):
+        return await run_research_pipeline(company_name, job_role, start_time)
+
+def cached_source(cache: ResultCache, company_key: str) -> Optional[Any]:
+    """Source data already in memory (stale or not) or in the snapshot, without going upstream"""
+    return cache.get(company_key) or cache.get_stale(company_key) or snapshot_source(cache.name, company_key)
+
+async def degraded_research(company_name: str, job_role: Optional[str], start_time: float) -> CompanyResponse:
+    """Data-only response for a request shed under load: cached source data or local fallbacks, no AI summary"""
+    company_key = get_company_key(company_name)
+    news = cached_source(NEWS_CACHE, company_key)
+    if news is None:
+        news = {"status": "warning", "message": "Using sample news data under high load",
+                "articles": await get_mock_news_async(company_name)}
+    return CompanyResponse(
+        company_name=company_name,
+        job_role=job_role,
+        company_info=cached_source(COMPANY_INFO_CACHE, company_key) or wiki_fallback_info(company_name),
+        news=news,
+        reviews=cached_source(REVIEWS_CACHE, company_key) or await get_employee_reviews_async(company_name),
+        ai_summary="",
+        processing_time=round(time.time() - start_time, 2),
+        status="degraded"
+    )
+
+class RefreshScheduler:
+    """
+    Keep popular research results fresh in the background.
+    
+    Every lookup counts as an access to its company/role; counts decay with
+    a half-life of REFRESH_HALF_LIFE. On each pass, results with at least
+    REFRESH_MIN_ACCESSES recent accesses that expire within REFRESH_AHEAD
+    seconds (or already have) are re-researched, at most REFRESH_BUDGET per
+    pass. Stale results served to a user are revalidated straight away.
+    """
+    
+    def __init__(self):
+        self._accesses: Dict[str, Dict] = {}
+        self._refreshing = set()
+        self.refreshed = 0
+        self.failed = 0
+        self.shed = 0
+        self.skipped_over_budget = 0
+    
+    def _score(self, access: Dict, now: float) -> float:
+        return access["count"] * 0.5 ** ((now - access["last"]) / REFRESH_HALF_LIFE)
+    
+    def record(self, cache_key: str, company_name: str, job_role: Optional[str]):
+        now = time.time()
+        access = self._accesses.get(cache_key)
+        if access is None:
+            access = self._accesses[cache_key] = {"company_name": company_name, "job_role": job_role, "count": 0.0, "last": now}
+        access["count"] = self._score(access, now) + 1
+        access["last"] = now
+        
+        if len(self._accesses) > REFRESH_TRACK_MAX:
+            # Forget the least popular tenth rather than trimming on every access
+            ranked = sorted(self._accesses, key=lambda key: self._score(self._accesses[key], now))
+            for key in ranked[:max(1, REFRESH_TRACK_MAX // 10)]:
+                del self._accesses[key]
+    
+    def revalidate(self, cache_key: str, company_name: str, job_role: Optional[str]):
+        """Re-research a result that was just served stale, unless that is already under way"""
+        if cache_key not in self._refreshing:
+            asyncio.ensure_future(self.refresh(cache_key, company_name, job_role, "stale"))
+    
+    async def refresh(self, cache_key: str, company_name: str, job_role: Optional[str], reason: str):
+        self._refreshing.add(cache_key)
+        # Don't charge background work to whichever request happened to trigger it
+        STAGE_TIMINGS.set(None)
+        try:
+            # Joins a user's pipeline run for the same key instead of starting a second one.
+            # Refreshes only take a slot that is free right now, never one users are queueing for.
+            await RESEARCH_FLIGHTS.do(
+                cache_key, partial(admitted_pipeline, company_name, job_role, time.time(), "refresh", time.monotonic())
+            )
+            self.refreshed += 1
+            CACHE_REFRESHES.inc(reason=reason, result="success")
+        except Overloaded:
+            self.shed += 1
+            CACHE_REFRESHES.inc(reason=reason, result="shed")
+        except Exception as e:
+            self.failed += 1
+            CACHE_REFRESHES.inc(reason=reason, result="error")
+            logger.warning(f"Background refresh of {company_name} failed: {str(e)}")
+        finally:
+            self._refreshing.discard(cache_key)
+    
+    def due(self) -> List[Tuple[str, Dict]]:
+        """Popular results about to expire (or already stale), most popular first"""
+        now = time.time()
+        due = []
+        for cache_key, access in list(self._accesses.items()):
+            score = self._score(access, now)
+            if score < 0.01:
+                del self._accesses[cache_key]
+                continue
+            expires = CACHE.expires_at(cache_key)
+            if expires is None or expires - now > REFRESH_AHEAD or score < REFRESH_MIN_ACCESSES:
+                continue
+            if cache_key not in self._refreshing:
+                due.append((score, cache_key, access))
+        due.sort(key=lambda item: item[0], reverse=True)
+        return [(cache_key, access) for _, cache_key, access in due]
+    
+    async def run_once(self):
+        """Refresh the most popular due results within the per-pass budget"""
+        if REFRESH_BUDGET <= 0:
+            return
+        # Spend the budget on users, not on retries against an upstream that is down
+        if not all(upstream.available() for upstream in UPSTREAMS.values()):
+            return
+        
+        due = self.due()
+        self.skipped_over_budget += max(0, len(due) - REFRESH_BUDGET)
+        refreshes = [self.refresh(cache_key, access["company_name"], access["job_role"], "ahead")
+                     for cache_key, access in due[:REFRESH_BUDGET]]
+        if refreshes:
+            logger.info(f"Refreshing {len(refreshes)} popular research results ahead of expiry")
+            await asyncio.gather(*refreshes)
+    
+    def stats(self) -> Dict:
+        return {
+            "tracked": len(self._accesses),
+            "refreshing": len(self._refreshing),
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "skipped_over_budget": self.skipped_over_budget,
+            "shed": self.shed,
+        }
+
+REFRESHER = RefreshScheduler()
+
+async def lookup_research(company_name: str, job_role: Optional[str]) -> Tuple[Optional[Dict], str]:
+    """Cached research result and how it was found: "hit", "stale" (refreshing in the background) or "miss" """
+    cache_key = get_cache_key(company_name, job_role)
+    REFRESHER.record(cache_key, company_name, job_role)
+    
+    cached_result = await CACHE.aget(cache_key)
+    if cached_result is not None:
+        return cached_result, "hit"
+    
+    # Serve an expired result immediately rather than making this user wait for the pipeline
+    stale_result = CACHE.get_stale(cache_key)
+    if stale_result is not None:
+        REFRESHER.revalidate(cache_key, company_name, job_role)
+        return stale_result, "stale"
+    return None, "miss"
+
 # API Routes
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 @app.post("/research", response_model=CompanyResponse)
-async def research_company(company_request: CompanyRequest):
+async def research_company(company_request: CompanyRequest, response: Response = None, request: Request = None):
     start_time = time.time()
-    company_name = company_request.company_name.strip()
+    company_name = canonical_company_name(company_request.company_name)
     job_role = company_request.job_role.strip() if company_request.job_role else None
     
     if not company_name:
         raise HTTPException(status_code=400, detail="Company name is required")
     
+    # Stages run by this request (and the tasks it starts) add their time here
+    timings = {} if company_request.include_timings else None
+    STAGE_TIMINGS.set(timings)
+    
     # Check cache first
     cache_key = get_cache_key(company_name, job_role)
-    if cache_key in CACHE and is_cache_valid(CACHE[cache_key]):
-        logger.info(f"Returning cached result for {company_name}")
-        cached_result = CACHE[cache_key]['data']
-        cached_result['processing_time'] = time.time() - start_time
-        return cached_result
+    cached_result, cache_status = await lookup_research(company_name, job_role)
+    if response is not None:
+        response.headers["X-Cache"] = cache_status
+    if cached_result is not None:
+        logger.info(f"Returning {'stale ' if cache_status == 'stale' else ''}cached result for {company_name}")
+        processing_time = time.time() - start_time
+        RESEARCH_SECONDS.observe(processing_time, endpoint="research", cached="true")
+        fields = {'job_role': job_role, 'processing_time': processing_time, 'stage_timings': timings}
+        if PREENCODE_CACHE_HITS:
+            # Skip response validation and encoding: the cached result was serialized when it was stored
+            return encoded_response(ENCODED_RESULTS.get(cache_key, cached_result), fields, request, cache_status)
+        # Copy so the shared cached entry is never modified; it may have been researched for another spelling of the role
+        return {**cached_result, **fields}
     
     try:
-        # Gather data concurrently
-        logger.info(f"Starting research for {company_name}")
-        
-        company_info_task = scrape_company_info_async(company_name)
-        news_task = get_recent_news_async(company_name)
-        reviews_task = get_employee_reviews_async(company_name)
-        
-        # Wait for all data gathering to complete
-        company_info, news, reviews = await asyncio.gather(
-            company_info_task,
-            news_task,
-            reviews_task,
-            return_exceptions=True
+        # Identical concurrent requests share one pipeline run, which waits for an admission slot
+        deadline = time.monotonic() + ADMISSION_DEADLINE
+        result = await RESEARCH_FLIGHTS.do(
+            cache_key, partial(admitted_pipeline, company_name, job_role, start_time, "interactive", deadline)
         )
+        RESEARCH_SECONDS.observe(time.time() - start_time, endpoint="research", cached="false")
+        if result.job_role != job_role:
+            # Joined a pipeline run for another spelling of the same role
+            result = result.copy(update={"job_role": job_role})
+        if timings is None:
+            return result
+        # A request that joined another's pipeline run only reports its own cache lookup
+        return {**result.dict(), 'stage_timings': timings}
         
-        # Handle any exceptions in the results
-        if isinstance(company_info, Exception):
-            logger.error(f"Error in company_info: {company_info}")
-            company_info = {"summary": f"Error retrieving information for {company_name}", "details": {}, "status": "error"}
-        
-        if isinstance(news, Exception):
-            logger.error(f"Error in news: {news}")
-            news = {"status": "error", "articles": await get_mock_news_async(company_name)}
-        
-        if isinstance(reviews, Exception):
-            logger.error(f"Error in reviews: {reviews}")
-            reviews = await get_employee_reviews_async(company_name)
-        
-        # Compile all data
-        company_data = {
-            "company_name": company_name,
-            "company_info": company_info,
-            "news": news,
-            "reviews": reviews
-        }
-        
-        # Generate AI summary
-        logger.info(f"Generating AI summary for {company_name}")
-        ai_summary = await generate_company_summary_async(company_data, job_role)
-        
-        processing_time = time.time() - start_time
-        
-        # Prepare response
-        result = CompanyResponse(
-            company_name=company_name,
-            job_role=job_role,
-            company_info=company_info,
-            news=news,
-            reviews=reviews,
-            ai_summary=ai_summary,
-            processing_time=round(processing_time, 2),
-            status="success"
-        )
-        
-        # Cache the result
-        CACHE[cache_key] = {
-            'data': result.dict(),
-            'timestamp': time.time()
-        }
-        
-        logger.info(f"Research completed for {company_name} in {processing_time:.2f}s")
-        return result
-        
+    except Overloaded as e:
+        logger.warning(f"Shedding research for {company_name}: {str(e)}")
+        if OVERLOAD_ACTION == "reject":
+            raise HTTPException(
+                status_code=503,
+                detail="The service is busy. Please try again shortly.",
+                headers={"Retry-After": str(e.retry_after)}
+            )
+        result = await degraded_research(company_name, job_role, start_time)
+        RESEARCH_SECONDS.observe(time.time() - start_time, endpoint="research", cached="degraded")
+        if timings is None:
+            return result
+        return {**result.dict(), 'stage_timings': timings}
+    
     except Exception as e:
         logger.error(f"Error researching {company_name}: {str(e)}")
         raise HTTPException(
@@ -573,37 +3357,311 @@ async def research_company(company_request: CompanyRequest):
             detail=f"An error occurred while researching {company_name}. Please try again."
         )
 
+@app.get("/research", response_model=CompanyResponse)
+async def research_company_get(request: Request, response: Response, company_name: str, job_role: Optional[str] = None,
+                               include_timings: bool = False):
+    """Same as POST /research, but cacheable: cached results answer If-None-Match with 304"""
+    company_request = CompanyRequest(company_name=company_name, job_role=job_role, include_timings=include_timings)
+    return await research_company(company_request, response, request)
+
+@app.post("/research/stream")
+async def research_company_stream(company_request: CompanyRequest):
+    start_time = time.time()
+    company_name = canonical_company_name(company_request.company_name)
+    job_role = company_request.job_role.strip() if company_request.job_role else None
+    
+    if not company_name:
+        raise HTTPException(status_code=400, detail="Company name is required")
+    
+    try:
+        events = await open_research_stream(company_name, job_role, start_time)
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=503,
+            detail="The service is busy. Please try again shortly.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    return StreamingResponse(events, media_type="application/x-ndjson")
+
+@app.post("/research/batch")
+async def research_company_batch(batch_request: BatchResearchRequest):
+    if not batch_request.items:
+        raise HTTPException(status_code=400, detail="At least one company is required")
+    if len(batch_request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A batch can contain at most {BATCH_MAX_ITEMS} companies")
+    
+    async def stream_results():
+        async for outcome in research_batch(batch_request.items):
+            yield (json.dumps(outcome, default=str) + "\n").encode()
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+@app.get("/companies/suggest")
+async def suggest_companies(q: str = "", limit: int = 8):
+    """Known companies matching what has been typed so far, for autocomplete"""
+    index = get_company_index()
+    prefix = company_index_key(q)
+    if index is None or not prefix:
+        return {"suggestions": []}
+    
+    matches = index.suggest(prefix, max(1, min(limit, 20)))
+    return {"suggestions": [{"name": match["name"], "ticker": match["ticker"]} for match in matches]}
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": time.time()}
+    return {
+        "status": "healthy",
+        "timestamp": time.time(),
+        "upstreams": {name: upstream.breaker.stats()["state"] for name, upstream in UPSTREAMS.items()},
+    }
+
+@app.get("/upstreams")
+async def upstream_stats():
+    return {name: upstream.stats() for name, upstream in UPSTREAMS.items()}
+
+@app.get("/workers")
+async def worker_stats():
+    return CPU_POOL.stats()
 
-# Cleanup cache periodically
-async def cleanup_cache():
-    """Remove expired cache entries"""
+@app.get("/admission")
+async def admission_stats():
+    return {**ADMISSION.stats(), "deadline": ADMISSION_DEADLINE, "overload_action": OVERLOAD_ACTION}
+
+@app.get("/cache/stats")
+async def cache_stats():
+    stats = {name: cache.stats() for name, cache in CACHE_TIERS.items()}
+    stats["single_flight"] = {flights.name: flights.stats() for flights in (RESEARCH_FLIGHTS, SOURCE_FLIGHTS, SUMMARY_FLIGHTS)}
+    stats["refresh"] = REFRESHER.stats()
+    stats["encoded"] = ENCODED_RESULTS.stats()
+    stats["snapshot"] = _snapshot.stats() if _snapshot is not None else None
+    return stats
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of the pipeline, cache and upstream metrics"""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    
+    # Cache, breaker and coalescing counters already kept by their owners, rendered at scrape time
+    cache_stats = {name: cache.stats() for name, cache in CACHE_TIERS.items()}
+    lines += ["# HELP kbg_cache_lookups_total Cache lookups per tier by result", "# TYPE kbg_cache_lookups_total counter"]
+    for tier, stats in cache_stats.items():
+        for result in ("hits", "store_hits", "stale_hits", "misses"):
+            lines.append(f"kbg_cache_lookups_total{format_labels({'tier': tier, 'result': result})} {stats[result]}")
+    lines += ["# HELP kbg_cache_evictions_total Cache entries evicted to stay within limits", "# TYPE kbg_cache_evictions_total counter"]
+    lines += [f"kbg_cache_evictions_total{format_labels({'tier': tier})} {stats['evictions']}" for tier, stats in cache_stats.items()]
+    lines += ["# HELP kbg_cache_bytes Approximate size of each cache tier", "# TYPE kbg_cache_bytes gauge"]
+    lines += [f"kbg_cache_bytes{format_labels({'tier': tier})} {stats['bytes']}" for tier, stats in cache_stats.items()]
+    
+    lines += ["# HELP kbg_circuit_open Whether an upstream's circuit breaker is open", "# TYPE kbg_circuit_open gauge"]
+    lines += [f"kbg_circuit_open{format_labels({'upstream': name})} {int(not upstream.available())}"
+              for name, upstream in UPSTREAMS.items()]
+    lines += ["# HELP kbg_upstream_in_flight Calls currently held by each upstream", "# TYPE kbg_upstream_in_flight gauge"]
+    lines += [f"kbg_upstream_in_flight{format_labels({'upstream': name})} {upstream.in_flight}" for name, upstream in UPSTREAMS.items()]
+    
+    lines += ["# HELP kbg_coalesced_total Requests that joined an identical in-flight computation", "# TYPE kbg_coalesced_total counter"]
+    lines += [f"kbg_coalesced_total{format_labels({'flight': flights.name})} {flights.coalesced}"
+              for flights in (RESEARCH_FLIGHTS, SOURCE_FLIGHTS, SUMMARY_FLIGHTS)]
+    
+    cpu_stats = CPU_POOL.stats()
+    lines += ["# HELP kbg_cpu_tasks CPU-bound stages running on or waiting for a worker", "# TYPE kbg_cpu_tasks gauge"]
+    lines += [f"kbg_cpu_tasks{format_labels({'state': state})} {cpu_stats[state]}" for state in ("running", "waiting")]
+    lines += ["# HELP kbg_cpu_workers Size of the CPU worker pool", "# TYPE kbg_cpu_workers gauge",
+              f"kbg_cpu_workers{format_labels({'model': cpu_stats['model']})} {cpu_stats['workers']}"]
+    
+    lines += ["# HELP kbg_admission_pipelines Research pipelines holding or queued for an admission slot", "# TYPE kbg_admission_pipelines gauge"]
+    lines += [f"kbg_admission_pipelines{format_labels({'state': state})} {getattr(ADMISSION, state)}" for state in ("in_flight", "waiting")]
+    
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+async def monitor_event_loop_lag():
+    """Sample how late the event loop wakes from a short sleep; lag means something blocked it"""
     while True:
-        try:
-            current_time = time.time()
-            expired_keys = [
-                key for key, value in CACHE.items()
-                if current_time - value.get('timestamp', 0) > CACHE_EXPIRY
-            ]
-            
-            for key in expired_keys:
-                del CACHE[key]
+        start = time.perf_counter()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        EVENT_LOOP_LAG.observe(max(0.0, time.perf_counter() - start - LOOP_LAG_INTERVAL))
+
+async def purge_expired_entries():
+    """Remove expired cache entries, from memory and from the persistent store"""
+    try:
+        expired = sum(cache.purge_expired() for cache in CACHE_TIERS.values())
+        if CACHE_STORE is not None:
+            loop = asyncio.get_event_loop()
+            expired += await loop.run_in_executor(None, CACHE_STORE.purge_expired)
+        
+        if expired:
+            logger.info(f"Cleaned up {expired} expired cache entries")
             
-            if expired_keys:
-                logger.info(f"Cleaned up {len(expired_keys)} expired cache entries")
-                
+    except Exception as e:
+        logger.error(f"Error in cache cleanup: {str(e)}")
+
+async def cache_maintenance():
+    """Refresh popular results ahead of expiry and periodically purge expired entries"""
+    last_purge = None
+    while True:
+        if last_purge is None or time.monotonic() - last_purge >= CACHE_PURGE_INTERVAL:
+            await purge_expired_entries()
+            last_purge = time.monotonic()
+        
+        try:
+            await REFRESHER.run_once()
         except Exception as e:
-            logger.error(f"Error in cache cleanup: {str(e)}")
+            logger.error(f"Error in refresh-ahead pass: {str(e)}")
+        
+        # Pick up a snapshot rebuilt since startup
+        get_snapshot()
         
-        await asyncio.sleep(1800)  # Run every 30 minutes
+        await asyncio.sleep(REFRESH_INTERVAL)
 
 @app.on_event("startup")
 async def startup_event():
-    # Start cache cleanup task
-    asyncio.create_task(cleanup_cache())
+    # Open the shared HTTP session used by all scrapers
+    get_http_session()
+    
+    # Map the company name index, building it first if the companies CSV changed
+    await asyncio.get_event_loop().run_in_executor(None, get_company_index)
+    
+    # Map the prebuilt source snapshot, if there is one; nothing is read until a lookup
+    await asyncio.get_event_loop().run_in_executor(None, get_snapshot)
+    
+    # Start the CPU workers before the first request needs one
+    await CPU_POOL.start()
+    
+    # Load the tokenizer off the event loop; it may download its encoding on first use
+    await asyncio.get_event_loop().run_in_executor(None, get_tokenizer)
+    
+    # Warm the in-memory caches from the persistent store
+    if CACHE_STORE is not None and CACHE_WARM_ON_STARTUP:
+        loop = asyncio.get_event_loop()
+        warmed = await loop.run_in_executor(None, lambda: sum(cache.warm() for cache in CACHE_TIERS.values()))
+        logger.info(f"Warmed {warmed} cache entries from the {CACHE_BACKEND} store")
+    
+    # Start the cache refresh-ahead and cleanup task
+    asyncio.create_task(cache_maintenance())
+    if LOOP_LAG_INTERVAL > 0:
+        asyncio.create_task(monitor_event_loop_lag())
     logger.info("Company Research Assistant started successfully")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_http_session()
+    CPU_POOL.shutdown()
+    if _snapshot is not None:
+        _snapshot.close()
+    if CACHE_STORE is not None:
+        CACHE_STORE.close()
+    logger.info("Company Research Assistant shut down")
+
+def read_batch_file(path: str) -> List[CompanyRequest]:
+    """Read company[,job role] rows from a CSV file, skipping blank lines and a header row"""
+    items = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if not row or not row[0].strip():
+                continue
+            if not items and row[0].strip().lower() in ("company", "company_name"):
+                continue
+            job_role = row[1].strip() if len(row) > 1 and row[1].strip() else None
+            items.append(CompanyRequest(company_name=row[0].strip(), job_role=job_role))
+    return items
+
+async def run_batch_cli(input_path: str, output_path: Optional[str] = None):
+    """Research every company in a CSV file, writing one JSON line per result"""
+    items = read_batch_file(input_path)
+    output = open(output_path, "w", encoding="utf-8") if output_path else sys.stdout
+    await startup_event()
+    try:
+        done = 0
+        async for outcome in research_batch(items):
+            output.write(json.dumps(outcome, default=str) + "\n")
+            output.flush()
+            done += 1
+            logger.info(f"Batch progress: {done} results ({outcome['company_name']}: {outcome['status']})")
+    finally:
+        await shutdown_event()
+        if output is not sys.stdout:
+            output.close()
+
+def read_company_list(path: str, limit: Optional[int] = None) -> List[str]:
+    """Company names from the first column of a CSV file (the companies CSV or a plain list), skipping a header row"""
+    names = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if not row or not row[0].strip():
+                continue
+            if not names and row[0].strip().lower() in ("name", "company", "company_name"):
+                continue
+            names.append(row[0].strip())
+    return names[:limit] if limit else names
+
+async def build_snapshot(company_names: List[str], path: str = SNAPSHOT_PATH, concurrency: int = BATCH_MAX_CONCURRENCY) -> Dict:
+    """Fetch company info and news for every company and write them as a snapshot file
+    
+    Only real source data goes in; a company whose sources all fell back is
+    left out, so the app goes upstream for it as usual.
+    """
+    await startup_event()
+    semaphore = asyncio.Semaphore(concurrency)
+    records = {}
+    counts = {"company_info": 0, "news": 0}
+    
+    async def fetch(company_name: str):
+        company_name = canonical_company_name(company_name)
+        company_key = get_company_key(company_name)
+        if company_key in records:
+            return
+        records[company_key] = None
+        async with semaphore:
+            company_info, news = await asyncio.gather(
+                scrape_company_info_async(company_name), get_recent_news_async(company_name), return_exceptions=True
+            )
+        record = {"company_name": company_name}
+        for source, result in (("company_info", company_info), ("news", news)):
+            if isinstance(result, Exception):
+                logger.warning(f"Snapshot {source} for {company_name} failed: {str(result)}")
+            elif is_successful(result):
+                record[source] = result
+                counts[source] += 1
+        if len(record) > 1:
+            records[company_key] = record
+        logger.info(f"Snapshot progress: {company_name} ({', '.join(record.keys() - {'company_name'}) or 'nothing usable'})")
+    
+    try:
+        await asyncio.gather(*[fetch(company_name) for company_name in company_names])
+    finally:
+        await shutdown_event()
+    
+    records = {company_key: record for company_key, record in records.items() if record is not None}
+    size = await asyncio.get_event_loop().run_in_executor(None, write_snapshot, records, path)
+    return {"companies": len(records), "bytes": size, **counts}
+
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Company Research Assistant")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    batch_parser = subparsers.add_parser("batch", help="research every company in a CSV file of company[,job role] rows")
+    batch_parser.add_argument("input", help="CSV file with a company name and optional job role per row")
+    batch_parser.add_argument("-o", "--output", help="write JSON lines here instead of stdout")
+    
+    index_parser = subparsers.add_parser("build-company-index", help="rebuild the company name index from the companies CSV")
+    index_parser.add_argument("--input", default=COMPANY_DATA_PATH, help="companies CSV (name, wikipedia_title, ticker, aliases)")
+    index_parser.add_argument("--output", default=COMPANY_INDEX_PATH, help="where to write the sorted index")
+    
+    snapshot_parser = subparsers.add_parser("build-snapshot", help="fetch company info and news for a company list into a snapshot file")
+    snapshot_parser.add_argument("--input", default=COMPANY_DATA_PATH, help="CSV with company names in the first column, most popular first")
+    snapshot_parser.add_argument("--limit", type=int, help="only the first N companies")
+    snapshot_parser.add_argument("--output", default=SNAPSHOT_PATH, help="where to write the snapshot")
+    snapshot_parser.add_argument("--concurrency", type=int, default=BATCH_MAX_CONCURRENCY, help="companies fetched at once")
+    
+    args = parser.parse_args()
+    if args.command == "batch":
+        asyncio.run(run_batch_cli(args.input, args.output))
+    elif args.command == "build-company-index":
+        print(f"Wrote {build_company_index(args.input, args.output)} keys to {args.output}")
+    elif args.command == "build-snapshot":
+        built = asyncio.run(build_snapshot(read_company_list(args.input, args.limit), args.output, args.concurrency))
+        print(f"Wrote {built['companies']} companies ({built['company_info']} with company info, {built['news']} with news) "
+              f"to {args.output}, {built['bytes'] / 1024:.0f} KiB")
+    else:
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
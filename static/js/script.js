@@ -19,22 +19,111 @@ document.addEventListener('DOMContentLoaded', () => {
         circle.style.strokeDashoffset = offset;
     }
     
-    // Animate progress during loading
-    let progressInterval;
-    function startProgressAnimation() {
-        let progress = 0;
-        progressInterval = setInterval(() => {
-            progress += Math.random() * 15;
-            if (progress > 90) progress = 90;
-            setProgress(progress);
-        }, 500);
-    }
-    
     function stopProgressAnimation() {
-        clearInterval(progressInterval);
         setProgress(100);
     }
     
+    // Mark a loading stage as finished when its data arrives from the stream
+    const stageProgress = { company_info: 25, news: 25, reviews: 15, summary: 0 };
+    let streamedProgress = 0;
+    
+    function resetStages() {
+        streamedProgress = 0;
+        document.querySelectorAll('[data-stage]').forEach(stage => {
+            stage.classList.remove('text-green-600');
+            stage.classList.add('text-gray-500');
+            stage.firstElementChild.classList.add('pulse-animation');
+        });
+    }
+    
+    function completeStage(name) {
+        const stage = document.querySelector(`[data-stage="${name}"]`);
+        if (!stage || stage.classList.contains('text-green-600')) return;
+        stage.classList.remove('text-gray-500');
+        stage.classList.add('text-green-600');
+        stage.firstElementChild.classList.remove('pulse-animation');
+        streamedProgress += stageProgress[name] || 0;
+        setProgress(Math.min(streamedProgress, 90));
+    }
+    
+    // Read the NDJSON research stream, calling onEvent for each event
+    async function streamResearch(payload, onEvent) {
+        const response = await fetch('/research/stream', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(payload),
+        });
+        
+        if (!response.ok) {
+            const errorData = await response.json().catch(() => ({}));
+            throw new Error(errorData.detail || `Server error: ${response.status}`);
+        }
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let result = null;
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            for (const line of lines) {
+                if (!line.trim()) continue;
+                const event = JSON.parse(line);
+                onEvent(event);
+                if (event.event === 'done') result = event.data;
+            }
+        }
+        
+        if (!result) {
+            throw new Error('Research stream ended unexpectedly');
+        }
+        return result;
+    }
+    
+    // Suggest known companies as the name is typed
+    const companyInput = document.getElementById('companyName');
+    const companySuggestions = document.getElementById('companySuggestions');
+    let suggestTimer = null;
+    let suggestController = null;
+    
+    companyInput.addEventListener('input', () => {
+        clearTimeout(suggestTimer);
+        const query = companyInput.value.trim();
+        if (!query) {
+            companySuggestions.innerHTML = '';
+            return;
+        }
+        
+        suggestTimer = setTimeout(async () => {
+            // Only the latest keystroke's suggestions matter
+            if (suggestController) suggestController.abort();
+            suggestController = new AbortController();
+            try {
+                const response = await fetch(`/companies/suggest?q=${encodeURIComponent(query)}&limit=8`, {
+                    signal: suggestController.signal,
+                });
+                if (!response.ok) return;
+                const data = await response.json();
+                companySuggestions.innerHTML = '';
+                data.suggestions.forEach(suggestion => {
+                    const option = document.createElement('option');
+                    option.value = suggestion.name;
+                    if (suggestion.ticker) option.label = suggestion.ticker;
+                    companySuggestions.appendChild(option);
+                });
+            } catch (error) {
+                if (error.name !== 'AbortError') console.error('Company suggestions failed:', error);
+            }
+        }, 150);
+    });
+    
     // Handle tab switching with smooth animations
     tabButtons.forEach(button => {
         button.addEventListener('click', () => {
@@ -106,7 +195,8 @@ document.addEventListener('DOMContentLoaded', () => {
         // Show loading indicator with animation
         loadingIndicator.classList.remove('hidden');
         resultsContainer.classList.add('hidden');
-        startProgressAnimation();
+        resetStages();
+        setProgress(0);
         
         // Smooth scroll to loading indicator
         setTimeout(() => {
@@ -119,24 +209,20 @@ document.addEventListener('DOMContentLoaded', () => {
         try {
             const startTime = Date.now();
             
-            // Make API request
-            const response = await fetch('/research', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({
-                    company_name: companyName,
-                    job_role: jobRole || null
-                }),
+            // Stream the research, ticking off each stage as its data arrives
+            const data = await streamResearch({
+                company_name: companyName,
+                job_role: jobRole || null
+            }, (event) => {
+                if (event.event === 'summary') {
+                    // Creep towards the end while summary text streams in
+                    completeStage('summary');
+                    streamedProgress = Math.min(streamedProgress + 1, 95);
+                    setProgress(streamedProgress);
+                } else {
+                    completeStage(event.event);
+                }
             });
-            
-            if (!response.ok) {
-                const errorData = await response.json().catch(() => ({}));
-                throw new Error(errorData.detail || `Server error: ${response.status}`);
-            }
-            
-            const data = await response.json();
             const processingTime = ((Date.now() - startTime) / 1000).toFixed(1);
             
             // Stop progress animation
@@ -219,7 +305,12 @@ document.addEventListener('DOMContentLoaded', () => {
         
         // AI Summary with improved formatting
         const aiSummary = document.getElementById('aiSummary');
-        aiSummary.innerHTML = formatContent(data.ai_summary);
+        if (data.status === 'degraded') {
+            // Shed under load: the company data is real but no AI summary was generated
+            aiSummary.innerHTML = '<p class="text-gray-600 italic">The AI analysis is unavailable right now because the service is busy. Company data, news and reviews are shown below &mdash; try again in a moment for the full analysis.</p>';
+        } else {
+            aiSummary.innerHTML = formatContent(data.ai_summary);
+        }
         
         // Company Overview
         document.getElementById('companySummary').textContent = 